@@ -24,10 +24,13 @@
 #include "shared_util.h"
 #include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
 #include <getopt.h>
 
 #include <time.h>
 #include <unistd.h>
+#include <sys/types.h>
+#include <sys/wait.h>
 
 #include <float.h>
 
@@ -95,8 +98,6 @@ static char *frame = NULL;
 static int frame_len = 0;
 char *frame_b = NULL;
 
-static float total_time = 0.0; // TODO:  Static?
-
 // Flag Values - Used to set true values (get opt does not play well with uint8/16)
 static int sadb_type_flag = SA_TYPE_MARIADB;
 static int cryptography_type_flag = CRYPTOGRAPHY_TYPE_KMCCRYPTO;
@@ -116,105 +117,293 @@ static int has_fecf_flag = 1;
 static int has_segmentation_hdr_flag = 0;
 
 static int num_loops = 1000;
-static int apply_or_process = 0;
+static int num_warmup_loops = 0;
+static int num_processes = 1;
+static char *json_path = NULL;
+
+// Test Modes - The frame type is test_mode / 2, even modes apply security and odd modes process it
+#define TEST_MODE_TC_APPLY 0
+#define TEST_MODE_TC_PROCESS 1
+#define TEST_MODE_TM_APPLY 2
+#define TEST_MODE_TM_PROCESS 3
+#define TEST_MODE_AOS_APPLY 4
+#define TEST_MODE_AOS_PROCESS 5
+static int test_mode = TEST_MODE_TC_APPLY;
+static const char *test_mode_names[] = {"TC_APPLY", "TC_PROCESS", "TM_APPLY", "TM_PROCESS", "AOS_APPLY", "AOS_PROCESS"};
+static const char *frame_type_names[] = {"TC", "TM", "AOS"};
 
 static int cam_flag = 0;
 
-void test_information();
+// Latency histogram buckets - Bucket i counts latencies from 2^(i-1) up to 2^i - 1 ns, bucket 0 counts 0 ns
+#define NUM_HISTOGRAM_BUCKETS 64
+static const double report_percentiles[] = {50.0, 90.0, 99.0, 99.9};
+#define NUM_REPORT_PERCENTILES (sizeof(report_percentiles) / sizeof(report_percentiles[0]))
 
-// Function to loop over Apply Security Functionality
-double Apply_Security_Loop(uint8_t *frame, int frame_length, uint8_t *enc_frame, uint16_t *enc_frame_len, int num_loops, double *time_max, double *time_min)
+// Results of the timed loop of one CryptoLib instance
+typedef struct
 {
-    struct timespec begin, end;
-    double total_time;
-    total_time = 0.0;
+    int32_t status;       // First error returned, CRYPTO_LIB_SUCCESS if every frame went through
+    int frames_done;      // Timed frames that completed before any error
+    int frame_bytes;      // Bytes per frame output by the security function, used for the Kbps figures
+    uint64_t wall_ns;     // From the start of the first timed call to the end of the last one
+    uint64_t *latency_ns; // One entry per timed frame, num_loops long
+} Run_Result_t;
 
-    frame = frame;
-    frame_length = frame_length;
-    enc_frame_len = enc_frame_len;
+void test_information();
 
+// Function to get the nanoseconds between two CLOCK_MONOTONIC readings
+static uint64_t elapsed_ns(struct timespec *begin, struct timespec *end)
+{
+    return (uint64_t)(end->tv_sec - begin->tv_sec) * 1000000000ULL + (uint64_t)end->tv_nsec - (uint64_t)begin->tv_nsec;
+}
+
+// Function to loop over the Security Function selected by test_mode
+// The frame is copied into a scratch buffer before every call, outside of the timed region, since TM and AOS
+// ApplySecurity secure the frame in place and processing may decrypt it in place.
+void Security_Loop(uint8_t *frame_b, int frame_l, Run_Result_t *result)
+{
+    struct timespec begin, end, run_begin;
+    uint8_t *work_frame = malloc(frame_l);
+    uint8_t *enc_frame = NULL;
+    uint16_t enc_frame_len = 0;
+    int work_len = 0;
+    TC_t *tc_frame = malloc(sizeof(TC_t));
+    TM_t *tm_frame = malloc(sizeof(TM_t));
+    AOS_t *aos_frame = malloc(sizeof(AOS_t));
     int32_t status = CRYPTO_LIB_SUCCESS;
 
-    for (int i = 0; i < num_loops; i++)
+    result->status = CRYPTO_LIB_SUCCESS;
+    result->frames_done = 0;
+    result->frame_bytes = 0;
+    result->wall_ns = 0;
+    run_begin.tv_sec = 0;
+    run_begin.tv_nsec = 0;
+
+    // Negative iterations are the untimed warmup
+    for (int i = -num_warmup_loops; i < num_loops; i++)
     {
-        clock_gettime(CLOCK_REALTIME, &begin);
-        status = Crypto_TC_ApplySecurity(frame, frame_length, &enc_frame, enc_frame_len);
-        clock_gettime(CLOCK_REALTIME, &end);
+        memcpy(work_frame, frame_b, frame_l);
+        work_len = frame_l;
+        enc_frame = NULL;
+        if (test_mode == TEST_MODE_TC_PROCESS)
+            memset(tc_frame, 0, sizeof(TC_t));
+        else if (test_mode == TEST_MODE_TM_PROCESS)
+            memset(tm_frame, 0, sizeof(TM_t));
+        else if (test_mode == TEST_MODE_AOS_PROCESS)
+            memset(aos_frame, 0, sizeof(AOS_t));
+
+        clock_gettime(CLOCK_MONOTONIC, &begin);
+        switch (test_mode)
+        {
+        case TEST_MODE_TC_APPLY:
+            status = Crypto_TC_ApplySecurity(work_frame, frame_l, &enc_frame, &enc_frame_len);
+            break;
+        case TEST_MODE_TC_PROCESS:
+            status = Crypto_TC_ProcessSecurity(work_frame, &work_len, tc_frame);
+            break;
+        case TEST_MODE_TM_APPLY:
+            status = Crypto_TM_ApplySecurity(work_frame, (uint16_t)frame_l);
+            break;
+        case TEST_MODE_TM_PROCESS:
+            status = Crypto_TM_ProcessSecurity(work_frame, (uint16_t)frame_l, tm_frame, &enc_frame_len);
+            break;
+        case TEST_MODE_AOS_APPLY:
+            status = Crypto_AOS_ApplySecurity(work_frame, (uint16_t)frame_l);
+            break;
+        default:
+            status = Crypto_AOS_ProcessSecurity(work_frame, (uint16_t)frame_l, aos_frame, &enc_frame_len);
+            break;
+        }
+        clock_gettime(CLOCK_MONOTONIC, &end);
         free(enc_frame);
 
-        long seconds = end.tv_sec - begin.tv_sec;
-        long nanoseconds = end.tv_nsec - begin.tv_nsec;
-        double elapsed = seconds + nanoseconds * 1e-9;
-
         if (status != CRYPTO_LIB_SUCCESS)
         {
-            total_time = -1.0;
+            result->status = status;
             printf("ERROR: %d\n", status);
             break;
         }
-        if (elapsed > *time_max)
-            *time_max = elapsed;
-        if (*time_min > elapsed)
-            *time_min = elapsed;
-
-        total_time += elapsed;
+        if (i < 0)
+            continue;
+
+        if (i == 0)
+            run_begin = begin;
+        result->latency_ns[i] = elapsed_ns(&begin, &end);
+        result->wall_ns = elapsed_ns(&run_begin, &end);
+        result->frames_done++;
     }
-    return total_time;
+
+    if (test_mode == TEST_MODE_TC_PROCESS)
+        result->frame_bytes = tc_frame->tc_pdu_len;
+    else if (test_mode == TEST_MODE_TM_APPLY || test_mode == TEST_MODE_AOS_APPLY)
+        result->frame_bytes = frame_l;
+    else
+        result->frame_bytes = enc_frame_len;
+
+    free(work_frame);
+    free(tc_frame);
+    free(tm_frame);
+    free(aos_frame);
 }
 
-void Process_Security_Loop(char *data_b, int *data_l, int num_loops)
+static int compare_latency(const void *a, const void *b)
 {
-    struct timespec begin, end;
-    double total_time;
-    double time_max = 0.0;
-    double time_min = DBL_MAX;
-    total_time = 0.0;
+    uint64_t left = *(const uint64_t *)a;
+    uint64_t right = *(const uint64_t *)b;
+    return (left > right) - (left < right);
+}
 
-    int32_t status = CRYPTO_LIB_SUCCESS;
+// Function to get the nearest rank percentile of sorted latencies
+static uint64_t latency_percentile(const uint64_t *sorted_ns, int count, double percentile)
+{
+    int rank = (int)((percentile / 100.0) * count + 0.999999);
+
+    if (count == 0)
+        return 0;
+    if (rank < 1)
+        rank = 1;
+    if (rank > count)
+        rank = count;
+    return sorted_ns[rank - 1];
+}
 
-    for (int i = 0; i < num_loops; i++)
+static int histogram_bucket(uint64_t latency_ns)
+{
+    int bucket = 0;
+    while (latency_ns > 0 && bucket < NUM_HISTOGRAM_BUCKETS - 1)
     {
-        TC_t *processed_frame;
-        processed_frame = calloc(1, sizeof(uint8_t) * TC_SIZE);
-        // printf("LOOP NUMBER: %d\n", i+1);
-        clock_gettime(CLOCK_REALTIME, &begin);
-        status = Crypto_TC_ProcessSecurity((uint8_t *)data_b, data_l, processed_frame);
-        clock_gettime(CLOCK_REALTIME, &end);
+        latency_ns >>= 1;
+        bucket++;
+    }
+    return bucket;
+}
 
-        long seconds = end.tv_sec - begin.tv_sec;
-        long nanoseconds = end.tv_nsec - begin.tv_nsec;
-        double elapsed = seconds + nanoseconds * 1e-9;
+// Function to gather and sort the latencies of every run, returns the number of latencies
+static int merge_latencies(Run_Result_t *results, int num_results, uint64_t **sorted_ns)
+{
+    int count = 0;
+    for (int p = 0; p < num_results; p++)
+        count += results[p].frames_done;
 
-        if (status != CRYPTO_LIB_SUCCESS)
-        {
-            total_time = -1.0;
-            printf("ERROR: %d\n", status);
-            break;
-        }
+    *sorted_ns = malloc(sizeof(uint64_t) * (count > 0 ? count : 1));
+    count = 0;
+    for (int p = 0; p < num_results; p++)
+    {
+        memcpy(*sorted_ns + count, results[p].latency_ns, sizeof(uint64_t) * results[p].frames_done);
+        count += results[p].frames_done;
+    }
+    qsort(*sorted_ns, count, sizeof(uint64_t), compare_latency);
+    return count;
+}
 
-        if (elapsed > time_max)
-            time_max = elapsed;
-        if (time_min > elapsed)
-            time_min = elapsed;
+static void print_latency_json(FILE *out, const uint64_t *sorted_ns, int count)
+{
+    double sum_ns = 0.0;
+    for (int i = 0; i < count; i++)
+        sum_ns += sorted_ns[i];
+
+    fprintf(out, "{\"min\": %.3f, \"mean\": %.3f", (count ? sorted_ns[0] : 0) / 1e3, (count ? sum_ns / count : 0.0) / 1e3);
+    for (size_t i = 0; i < NUM_REPORT_PERCENTILES; i++)
+        fprintf(out, ", \"p%g\": %.3f", report_percentiles[i], latency_percentile(sorted_ns, count, report_percentiles[i]) / 1e3);
+    fprintf(out, ", \"max\": %.3f}", (count ? sorted_ns[count - 1] : 0) / 1e3);
+}
 
-        total_time += elapsed;
-        if (i == (num_loops - 1))
-        {
-            printf("\nPerformance Test Complete:\n");
-            test_information();
-            printf("\nPERFORMANCE DATA:\n");
-            printf("TC Method: %s\n", (apply_or_process == 0) ? "TC_APPLY" : "TC_PROCESS");
-            printf("\tNumber of Frames Sent: %d\n", num_loops);
-            printf("\t\tEncrypted Bytes Per Frame: %d\n", processed_frame->tc_pdu_len);
-            printf("\t\tTotal Time: %f\n", total_time);
-            printf("\tMin Kbps: %f\n", (((processed_frame->tc_pdu_len * 8) / (time_max)) / 1024));
-            printf("\tAvg Kbps: %f\n", (((processed_frame->tc_pdu_len * 8 * num_loops) / total_time) / 1024));
-            printf("\tMax Kbps: %f\n", (((processed_frame->tc_pdu_len * 8) / (time_min)) / 1024));
-            printf("\n");
-        }
+// Function to write the machine readable report of a test, one entry in results per CryptoLib instance
+void write_json_report(FILE *out, Run_Result_t *results, int num_results)
+{
+    uint64_t *sorted_ns = NULL;
+    uint64_t histogram[NUM_HISTOGRAM_BUCKETS] = {0};
+    uint64_t wall_ns = 0;
+    int32_t status = CRYPTO_LIB_SUCCESS;
+    int count = merge_latencies(results, num_results, &sorted_ns);
+    int first = 1;
 
-        free(processed_frame);
+    for (int p = 0; p < num_results; p++)
+    {
+        if (results[p].wall_ns > wall_ns)
+            wall_ns = results[p].wall_ns;
+        if (status == CRYPTO_LIB_SUCCESS)
+            status = results[p].status;
+    }
+    for (int i = 0; i < count; i++)
+        histogram[histogram_bucket(sorted_ns[i])]++;
+
+    fprintf(out, "{\n  \"schema\": 1,\n  \"mode\": \"%s\",\n", test_mode_names[test_mode]);
+    fprintf(out, "  \"frame_bytes\": %d,\n  \"output_frame_bytes\": %d,\n", frame_len, results[0].frame_bytes);
+    fprintf(out, "  \"num_loops\": %d,\n  \"warmup_loops\": %d,\n  \"processes\": %d,\n", num_loops, num_warmup_loops, num_results);
+    fprintf(out, "  \"status\": %d,\n  \"frames\": %d,\n  \"wall_s\": %.9f,\n", status, count, wall_ns / 1e9);
+    fprintf(out, "  \"throughput_fps\": %.3f,\n", wall_ns ? count / (wall_ns / 1e9) : 0.0);
+    fprintf(out, "  \"throughput_kbps\": %.3f,\n", wall_ns ? ((results[0].frame_bytes * 8.0 * count) / (wall_ns / 1e9)) / 1024 : 0.0);
+    fprintf(out, "  \"latency_us\": ");
+    print_latency_json(out, sorted_ns, count);
+    fprintf(out, ",\n  \"histogram\": [");
+    for (int b = 0; b < NUM_HISTOGRAM_BUCKETS; b++)
+    {
+        if (histogram[b] == 0)
+            continue;
+        fprintf(out, "%s\n    {\"lower_ns\": %llu, \"upper_ns\": %llu, \"count\": %llu}", first ? "" : ",",
+                (unsigned long long)(b ? 1ULL << (b - 1) : 0), (unsigned long long)((1ULL << b) - 1),
+                (unsigned long long)histogram[b]);
+        first = 0;
     }
+    fprintf(out, "\n  ],\n  \"per_process\": [");
+    for (int p = 0; p < num_results; p++)
+    {
+        uint64_t *process_sorted_ns = NULL;
+        int process_count = merge_latencies(&results[p], 1, &process_sorted_ns);
+        fprintf(out, "%s\n    {\"status\": %d, \"frames\": %d, \"wall_s\": %.9f, \"throughput_fps\": %.3f, \"latency_us\": ",
+                p ? "," : "", results[p].status, process_count, results[p].wall_ns / 1e9,
+                results[p].wall_ns ? process_count / (results[p].wall_ns / 1e9) : 0.0);
+        print_latency_json(out, process_sorted_ns, process_count);
+        fprintf(out, "}");
+        free(process_sorted_ns);
+    }
+    fprintf(out, "\n  ]\n}\n");
+    free(sorted_ns);
+}
+
+// Function to print out the performance data of a test, one entry in results per CryptoLib instance
+void print_performance_data(Run_Result_t *results, int num_results)
+{
+    uint64_t *sorted_ns = NULL;
+    uint64_t wall_ns = 0;
+    double total_time = 0.0;
+    int count = merge_latencies(results, num_results, &sorted_ns);
+    int frame_bytes = results[0].frame_bytes;
+
+    for (int p = 0; p < num_results; p++)
+    {
+        if (results[p].wall_ns > wall_ns)
+            wall_ns = results[p].wall_ns;
+    }
+    for (int i = 0; i < count; i++)
+        total_time += sorted_ns[i] / 1e9;
+
+    printf("\nPerformance Test Complete:\n");
+    test_information();
+    printf("\nPERFORMANCE DATA:\n");
+    printf("%s Method: %s\n", frame_type_names[test_mode / 2], test_mode_names[test_mode]);
+    printf("\tNumber of Frames Sent: %d\n", count);
+    printf("\t\tEncrypted Bytes Per Frame: %d\n", frame_bytes);
+    printf("\t\tTotal Time: %f\n", total_time);
+    if (count > 0)
+    {
+        printf("\tMin Kbps: %f\n", (((frame_bytes * 8) / (sorted_ns[count - 1] / 1e9)) / 1024));
+        printf("\tAvg Kbps: %f\n", (((frame_bytes * 8.0 * count) / total_time) / 1024));
+        printf("\tMax Kbps: %f\n", (((frame_bytes * 8) / ((sorted_ns[0] ? sorted_ns[0] : 1) / 1e9)) / 1024));
+        printf("\tLatency (us):");
+        for (size_t i = 0; i < NUM_REPORT_PERCENTILES; i++)
+            printf(" p%g %.3f", report_percentiles[i], latency_percentile(sorted_ns, count, report_percentiles[i]) / 1e3);
+        printf(" max %.3f\n", sorted_ns[count - 1] / 1e3);
+    }
+    if (num_results > 1 && wall_ns > 0)
+    {
+        printf("\tProcesses: %d\n", num_results);
+        printf("\tAggregate Frames Per Second: %f\n", count / (wall_ns / 1e9));
+        printf("\tAggregate Kbps: %f\n", (((frame_bytes * 8.0 * count) / (wall_ns / 1e9)) / 1024));
+    }
+    printf("\n");
+    free(sorted_ns);
 }
 
 void help_message()
@@ -286,7 +475,7 @@ void help_message()
     printf("--tfvn | Sets the GVCID TFVN (0 DEFAULT)\n");
     printf("--scid | Sets the GVCID SCID (0x002C (44) DEFAULT)\n");
     printf("--vcid | Sets the GVCID VCID\n");
-    printf("--max_tc_frame_size | Sets the GVCID Max TC Frame Size (1024 Max)\n");
+    printf("--max_tc_frame_size | Sets the GVCID Max Frame Size of the frame type under test (1024 Max for TC)\n");
 
     printf("\nCAM CONFIG FLAGS:\n");
     printf("--cam_enabled | Alerts configuration that frames WILL utilize CAM.  If this is not set all other configurations will be ignored\n");
@@ -304,6 +493,13 @@ void help_message()
     printf("--numloops | Sets the number of loops in the performance test\n");
     printf("--tc_apply | (DEFAULT) Sets the testing to use TC_APPLY\n");
     printf("--tc_process | Sets testing to use TC_PROCESS\n");
+    printf("--tm_apply | Sets testing to use TM_APPLY, frames are secured in place\n");
+    printf("--tm_process | Sets testing to use TM_PROCESS, the frame must already be secured\n");
+    printf("--aos_apply | Sets testing to use AOS_APPLY, frames are secured in place\n");
+    printf("--aos_process | Sets testing to use AOS_PROCESS, the frame must already be secured\n");
+    printf("--warmup | Sets the number of untimed loops run before the timed ones (0 DEFAULT)\n");
+    printf("--processes | Runs the test in this many processes at once, each with its own CryptoLib instance (1 DEFAULT)\n");
+    printf("--json | Writes latency percentiles, a histogram and throughput as JSON to this file\n");
 
     printf("\nExample Command:\n\nperformance_test --frame \"202C0C6100ABCDEF0123456789ABCDEF0123456789ABCDEF0123456789ABCDEF0123456789ABCDEF0123456789ABCDEF0123456789ABCDEF0123456789ABCDEF0123456789ABCDEF0123456789ABCDEF0123456789ABCDEF0123456789ABCDEFF01C\" --sql_host \"atb-ocio-12a.jpl.nasa.gov\" --sql_username \"mcstest\" --sql_tls_ca \"/home/robbrown/jpl_certs/ammos-ca-bundle.crt\" --sql_mtls_cert \"/home/robbrown/jpl_certs/mcstest.crt\" --sql_mtls_key \"/home/robbrown/jpl_certs/mcstest.key\" --kmc_crypto_hostname \"asec-cmdenc-srv1.jpl.nasa.gov\"  --vcid 3 --tc_apply\n");
 
@@ -429,6 +625,156 @@ void test_information()
     printf(" %s\n\n", frame);
 }
 
+// Function to configure & initialize CryptoLib with the parsed parameters, each process gets its own instance
+int32_t init_cryptolib()
+{
+    // The FECF flags are TRUE/FALSE, CryptoLib wants the FALSE/TRUE enum value of the frame type under test
+    uint8_t fecf_present_base[] = {TC_NO_FECF, TM_NO_FECF, AOS_NO_FECF};
+    uint8_t create_fecf_base[] = {CRYPTO_TC_CREATE_FECF_FALSE, CRYPTO_TM_CREATE_FECF_FALSE, CRYPTO_AOS_CREATE_FECF_FALSE};
+    uint8_t check_fecf_base[] = {TC_CHECK_FECF_FALSE, TM_CHECK_FECF_FALSE, AOS_CHECK_FECF_FALSE};
+
+    sdls_config_cryptolib(sadb_type, cryptography_type, create_fecf_base[test_mode / 2] + create_fecf, process_sdls_pdus,
+                          has_pus_hdr, ignore_sa_state, ignore_anti_replay, unique_sa_per_mapid,
+                          check_fecf_base[test_mode / 2] + check_fecf, vcid_bitmask, increment_nontransmitted_iv);
+    sdls_config_mariadb(mysql_hostname, mysql_database, mysql_port, mysql_require_secure_transport, mysql_tls_verify_server, mysql_tls_ca, mysql_tls_ca_path, mysql_mtls_cert, mysql_mtls_key, mysql_mtls_client_key_password, mysql_username, mysql_password);
+    sdls_config_kmc_crypto_service(protocol, kmc_crypto_hostname, kmc_crypto_port, kmc_crypto_app, kmc_tls_ca_bundle, kmc_tls_ca_path, kmc_ignore_ssl_hostname_validation, mtls_client_cert_path, mtls_client_cert_type, mtls_client_key_path, mtls_client_key_pass, mtls_issuer_cert);
+    sdls_config_add_gvcid_managed_parameter(tfvn, scid, vcid, fecf_present_base[test_mode / 2] + has_fecf, has_segmentation_hdr, max_tc_frame_size);
+
+    if (cam_enabled)
+    {
+        sdls_config_cam(cam_enabled, cam_cookie_path, cam_keytab_path, cam_login_method, cam_manager_uri, cam_username, cam_home);
+    }
+
+    return sdls_init();
+}
+
+static int read_fully(int fd, void *buffer, size_t length)
+{
+    size_t done = 0;
+    while (done < length)
+    {
+        ssize_t n = read(fd, (char *)buffer + done, length - done);
+        if (n <= 0)
+            return -1;
+        done += n;
+    }
+    return 0;
+}
+
+static int write_fully(int fd, const void *buffer, size_t length)
+{
+    size_t done = 0;
+    while (done < length)
+    {
+        ssize_t n = write(fd, (const char *)buffer + done, length - done);
+        if (n <= 0)
+            return -1;
+        done += n;
+    }
+    return 0;
+}
+
+// Function to run the test in num_processes forked processes at once
+// Every child configures & initializes its own CryptoLib, then all of them wait for the parent to release them
+// together, so the timed loops overlap. Each child sends back its Run_Result_t followed by its latencies.
+void Run_Processes(uint8_t *frame_b, int frame_l, Run_Result_t *results)
+{
+    int ready_pipe[2];
+    int start_pipe[2];
+    int *result_fds = calloc(num_processes, sizeof(int));
+    pid_t *pids = calloc(num_processes, sizeof(pid_t));
+    char c = 0;
+
+    if (pipe(ready_pipe) != 0 || pipe(start_pipe) != 0)
+    {
+        perror("pipe");
+        exit(1);
+    }
+
+    fflush(stdout);
+    for (int p = 0; p < num_processes; p++)
+    {
+        int result_pipe[2];
+        if (pipe(result_pipe) != 0)
+        {
+            perror("pipe");
+            exit(1);
+        }
+        pids[p] = fork();
+        if (pids[p] < 0)
+        {
+            perror("fork");
+            exit(1);
+        }
+        if (pids[p] == 0)
+        {
+            Run_Result_t result;
+            close(result_pipe[0]);
+            close(ready_pipe[0]);
+            close(start_pipe[1]);
+
+            result.latency_ns = calloc(num_loops, sizeof(uint64_t));
+            result.status = init_cryptolib();
+            result.frames_done = 0;
+            result.frame_bytes = 0;
+            result.wall_ns = 0;
+
+            // Signal ready, then block until the parent closes the start pipe
+            write_fully(ready_pipe[1], &c, 1);
+            close(ready_pipe[1]);
+            while (read(start_pipe[0], &c, 1) > 0)
+                ;
+
+            if (result.status == CRYPTO_LIB_SUCCESS)
+                Security_Loop(frame_b, frame_l, &result);
+            else
+                printf("ERROR: sdls_init failed in process %d: %d\n", getpid(), result.status);
+            sdls_shutdown();
+
+            write_fully(result_pipe[1], &result, sizeof(result));
+            write_fully(result_pipe[1], result.latency_ns, sizeof(uint64_t) * result.frames_done);
+            fflush(stdout);
+            _exit(0);
+        }
+        close(result_pipe[1]);
+        result_fds[p] = result_pipe[0];
+    }
+
+    close(ready_pipe[1]);
+    close(start_pipe[0]);
+    // A child that died before signaling closes its end of the ready pipe, so this cannot wait forever
+    for (int p = 0; p < num_processes; p++)
+    {
+        if (read_fully(ready_pipe[0], &c, 1) != 0)
+            break;
+    }
+    close(start_pipe[1]);
+    close(ready_pipe[0]);
+
+    for (int p = 0; p < num_processes; p++)
+    {
+        Run_Result_t received;
+        uint64_t *latency_ns = results[p].latency_ns;
+
+        if (read_fully(result_fds[p], &received, sizeof(received)) != 0 ||
+            read_fully(result_fds[p], latency_ns, sizeof(uint64_t) * received.frames_done) != 0)
+        {
+            printf("ERROR: process %d exited without results\n", pids[p]);
+            received.status = CRYPTO_LIB_ERROR;
+            received.frames_done = 0;
+            received.frame_bytes = 0;
+            received.wall_ns = 0;
+        }
+        received.latency_ns = latency_ns;
+        results[p] = received;
+        close(result_fds[p]);
+        waitpid(pids[p], NULL, 0);
+    }
+
+    free(result_fds);
+    free(pids);
+}
+
 int main(int argc, char **argv)
 {
     int option_index = 0;
@@ -487,8 +833,12 @@ int main(int argc, char **argv)
                 {"segmentation_header_yes", no_argument, &has_segmentation_hdr_flag, 1},
                 {"segmentation_header_no", no_argument, &has_segmentation_hdr_flag, 0},
 
-                {"tc_apply", no_argument, &apply_or_process, 0},
-                {"tc_process", no_argument, &apply_or_process, 1},
+                {"tc_apply", no_argument, &test_mode, TEST_MODE_TC_APPLY},
+                {"tc_process", no_argument, &test_mode, TEST_MODE_TC_PROCESS},
+                {"tm_apply", no_argument, &test_mode, TEST_MODE_TM_APPLY},
+                {"tm_process", no_argument, &test_mode, TEST_MODE_TM_PROCESS},
+                {"aos_apply", no_argument, &test_mode, TEST_MODE_AOS_APPLY},
+                {"aos_process", no_argument, &test_mode, TEST_MODE_AOS_PROCESS},
 
                 // Flag Settings for CAM
                 {"cam_enabled", no_argument, &cam_flag, 1},
@@ -529,11 +879,14 @@ int main(int argc, char **argv)
                 {"cam_manager_uri", required_argument, 0, '7'},
                 {"cam_username", required_argument, 0, '8'},
                 {"cam_home", required_argument, 0, '9'},
+                {"warmup", required_argument, 0, 'A'},
+                {"processes", required_argument, 0, 'B'},
+                {"json", required_argument, 0, 'C'},
                 {0, 0, 0, 0}
 
             };
 
-        c = getopt_long(argc, argv, "a:b:c:d:e:f:g:h:i:j:k:l:m:n:o:p:q:r:s:t:u:v:w:x:y:z:1:2:3:4:5:6:7:8:9:", long_options, &option_index);
+        c = getopt_long(argc, argv, "a:b:c:d:e:f:g:h:i:j:k:l:m:n:o:p:q:r:s:t:u:v:w:x:y:z:1:2:3:4:5:6:7:8:9:A:B:C:", long_options, &option_index);
 
         if (c == -1)
             break;
@@ -689,6 +1042,18 @@ int main(int argc, char **argv)
             cam_home = strdup(optarg);
             printf("CAM Home set to: %s\n", cam_home);
             break;
+        case 'A':
+            num_warmup_loops = (int)atoi(optarg);
+            printf("Number of warmup loops changed to: %d\n", num_warmup_loops);
+            break;
+        case 'B':
+            num_processes = (int)atoi(optarg);
+            printf("Number of processes changed to: %d\n", num_processes);
+            break;
+        case 'C':
+            json_path = strdup(optarg);
+            printf("JSON report path set to: %s\n", json_path);
+            break;
         case '?': // error
             printf("INVALID OPTION: %c\n", optopt);
             exit(0);
@@ -861,75 +1226,69 @@ int main(int argc, char **argv)
         cam_enabled = 0;
     }
 
-    // Setup & Initialize CryptoLib
+    if (frame == NULL)
+    {
+        help_message();
 
-    sdls_config_cryptolib(sadb_type, cryptography_type, create_fecf, process_sdls_pdus, has_pus_hdr,
-                          ignore_sa_state, ignore_anti_replay, unique_sa_per_mapid,
-                          check_fecf, vcid_bitmask, increment_nontransmitted_iv);
-    sdls_config_mariadb(mysql_hostname, mysql_database, mysql_port, mysql_require_secure_transport, mysql_tls_verify_server, mysql_tls_ca, mysql_tls_ca_path, mysql_mtls_cert, mysql_mtls_key, mysql_mtls_client_key_password, mysql_username, mysql_password);
-    sdls_config_kmc_crypto_service(protocol, kmc_crypto_hostname, kmc_crypto_port, kmc_crypto_app, kmc_tls_ca_bundle, kmc_tls_ca_path, kmc_ignore_ssl_hostname_validation, mtls_client_cert_path, mtls_client_cert_type, mtls_client_key_path, mtls_client_key_pass, mtls_issuer_cert);
-    sdls_config_add_gvcid_managed_parameter(tfvn, scid, vcid, has_fecf, has_segmentation_hdr, max_tc_frame_size);
+        printf("\n\nERROR:\nA frame MUST be included using the --frame \"xxx\" command!\n\n\n");
 
-    if (cam_enabled)
+        exit(0);
+    }
+    if (num_loops < 1 || num_warmup_loops < 0 || num_processes < 1)
     {
-        sdls_config_cam(cam_enabled, cam_cookie_path, cam_keytab_path, cam_login_method, cam_manager_uri, cam_username, cam_home);
+        printf("\n\nERROR:\n--numloops and --processes must be at least 1, --warmup cannot be negative\n\n\n");
+        exit(1);
     }
 
-    sdls_init();
+    // Convert hex to binary
+    hex_conversion(frame, &frame_b, &frame_len);
 
-    if (apply_or_process == 0)
+    Run_Result_t *results = calloc(num_processes, sizeof(Run_Result_t));
+    for (int p = 0; p < num_processes; p++)
     {
-        uint8_t *ptr_enc_frame = NULL;
-        uint16_t enc_frame_len = 0;
-
-        enc_frame_len = enc_frame_len;
-        ptr_enc_frame = ptr_enc_frame;
-        frame_b = frame_b;
-        frame_len = frame_len;
-
-        double max_time = 0;
-        double min_time = DBL_MAX;
+        results[p].latency_ns = calloc(num_loops, sizeof(uint64_t));
+    }
 
-        if (frame == NULL)
+    if (num_processes == 1)
+    {
+        // Setup & Initialize CryptoLib
+        int32_t status = init_cryptolib();
+        if (status != CRYPTO_LIB_SUCCESS)
         {
-            help_message();
-
-            printf("\n\nERROR:\nA frame MUST be included using the --frame \"xxx\" command!\n\n\n");
-
-            exit(0);
+            printf("ERROR: sdls_init failed: %d\n", status);
+            exit(1);
         }
-        hex_conversion(frame, &frame_b, &frame_len);
 
         printf("\nBeginning Performance test:\n");
-        total_time = 0.0;
-        total_time = Apply_Security_Loop((uint8_t *)frame_b, frame_len, ptr_enc_frame, &enc_frame_len, num_loops, &max_time, &min_time);
-
-        printf("\nPerformance Test Complete:\n");
-        test_information();
-        printf("\nPERFORMANCE DATA:\n");
-        printf("TC Method: %s\n", (apply_or_process == 0) ? "TC_APPLY" : "TC_PROCESS");
-        printf("\tNumber of Frames Sent: %d\n", num_loops);
-        printf("\t\tEncrypted Bytes Per Frame: %d\n", enc_frame_len);
-        printf("\t\tTotal Time: %f\n", total_time);
-        printf("\tMin Kbps: %f\n", (((enc_frame_len * 8) / max_time) / 1024));
-        printf("\tAvg Kbps: %f\n", (((enc_frame_len * 8 * num_loops) / total_time) / 1024));
-        printf("\tMax Kbps: %f\n", (((enc_frame_len * 8) / min_time) / 1024));
-        printf("\n");
+        Security_Loop((uint8_t *)frame_b, frame_len, &results[0]);
 
         sdls_shutdown();
     }
-
     else
     {
-        char *frame_b = NULL;
-        int frame_l = 0;
+        printf("\nBeginning Performance test in %d processes:\n", num_processes);
+        Run_Processes((uint8_t *)frame_b, frame_len, results);
+    }
 
-        // Convert hex to binary
-        hex_conversion(frame, &frame_b, &frame_l);
+    print_performance_data(results, num_processes);
 
-        printf("\nBeginning Performance test:\n");
-        Process_Security_Loop(frame_b, &frame_l, num_loops);
+    if (json_path != NULL)
+    {
+        FILE *json_out = fopen(json_path, "w");
+        if (json_out == NULL)
+        {
+            perror(json_path);
+            exit(1);
+        }
+        write_json_report(json_out, results, num_processes);
+        fclose(json_out);
+        printf("JSON report written to: %s\n", json_path);
+    }
 
-        sdls_shutdown();
+    for (int p = 0; p < num_processes; p++)
+    {
+        if (results[p].status != CRYPTO_LIB_SUCCESS)
+            return 1;
     }
+    return 0;
 }
@@ -41,7 +41,11 @@ setup(
 
     install_requires = [],
 
-    extras_require = {},
+    extras_require = {'numpy': ['numpy']},
 
-    entry_points = {}
+    entry_points = {
+        'console_scripts': [
+            'kmc-sdls-bulk=gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsBulk:main',
+        ],
+    }
 )
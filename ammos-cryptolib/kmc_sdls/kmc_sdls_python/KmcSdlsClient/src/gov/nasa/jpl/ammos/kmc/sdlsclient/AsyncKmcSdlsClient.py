@@ -0,0 +1,236 @@
+#
+# Copyright 2021, by the California Institute of Technology.
+# ALL RIGHTS RESERVED. United States Government Sponsorship acknowledged.
+# Any commercial use must be negotiated with the Office of Technology
+# Transfer at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S.
+# export laws and regulations. User has the responsibility to obtain
+# export licenses, or other export authority as may be required before
+# exporting such information to foreign countries or providing access to
+# foreign persons.
+#
+
+
+import asyncio
+import concurrent.futures
+import queue
+import threading
+
+from gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsClient import KmcSdlsClient, KmcSdlsConfig, SdlsClientException
+from gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsMetrics import KmcSdlsMetrics
+
+"""
+This module provides an asyncio front end for KmcSdlsClient.
+
+Every CryptoLib call, from sdls_init to sdls_shutdown, is made on one dedicated native-call thread, so CryptoLib's
+process-global state is only ever touched by a single thread while slow crypto service or SADB round trips no longer
+block the event loop.
+"""
+
+# asyncio.get_running_loop is new in Python 3.7; called from a coroutine, get_event_loop returns the running loop
+_get_running_loop = getattr(asyncio, "get_running_loop", asyncio.get_event_loop)
+
+# States of a submitted native call, guarded by AsyncKmcSdlsClient._state_lock
+_QUEUED = 0
+_RUNNING = 1
+_CANCELLED = 2
+
+
+class _NativeCall:
+    __slots__ = ("method", "frame", "kwargs", "loop", "future", "state")
+
+    def __init__(self, method, frame, kwargs, loop, future):
+        self.method = method
+        self.frame = frame
+        self.kwargs = kwargs
+        self.loop = loop
+        self.future = future
+        self.state = _QUEUED
+
+
+class AsyncKmcSdlsClient:
+
+    def __init__(self, config, max_pending=64, scratch_pool_size=8, metrics=True):
+        '''
+        Starts the native-call thread and initializes a KmcSdlsClient on it.
+        Initialization errors are raised by the first awaited call (or by entering ``async with``).
+
+        Parameters
+        ----------
+        config : list or KmcSdlsConfig
+            The CryptoLib configuration, as passed to KmcSdlsClient. It is validated before the native thread starts.
+        max_pending : int
+            Maximum number of frames submitted but not yet completed. Further submissions wait for a free slot.
+        scratch_pool_size : int
+            Passed through to KmcSdlsClient.
+        metrics : bool or KmcSdlsMetrics
+            Passed through to KmcSdlsClient. The KmcSdlsMetrics is available right away as self.metrics.
+        '''
+        if isinstance(metrics, bool):
+            metrics = KmcSdlsMetrics(enabled=metrics)
+        self.metrics = metrics
+        self.max_pending = max_pending
+        self._calls = queue.Queue()
+        self._state_lock = threading.Lock()
+        self._ready = concurrent.futures.Future()
+        self._slots = None  # asyncio.Semaphore, created on the event loop by the first submission
+        self._pending = dict()  # asyncio.Future -> _NativeCall of every frame submitted and not yet completed
+        self._closed = False
+        self._thread = threading.Thread(target=self._run_native_calls,
+                                        args=(KmcSdlsConfig.from_properties(config), scratch_pool_size, metrics),
+                                        name="AsyncKmcSdlsClient", daemon=True)
+        self._thread.start()
+
+    async def apply_security_tc(self, input_byte_array):
+        '''
+        Awaitable KmcSdlsClient.apply_security_tc. The frame buffer must not be modified until the call completes.
+        '''
+        return await self._submit("apply_security_tc", input_byte_array)
+
+    async def process_security_tc(self, input_byte_array):
+        '''
+        Awaitable KmcSdlsClient.process_security_tc. The frame buffer must not be modified until the call completes.
+        '''
+        return await self._submit("process_security_tc", input_byte_array)
+
+    async def apply_security_tm(self, input_byte_array, in_place=False):
+        '''
+        Awaitable KmcSdlsClient.apply_security_tm. The frame buffer must not be modified until the call completes.
+        '''
+        return await self._submit("apply_security_tm", input_byte_array, in_place=in_place)
+
+    async def process_security_tm(self, input_byte_array):
+        '''
+        Awaitable KmcSdlsClient.process_security_tm. The frame buffer must not be modified until the call completes.
+        '''
+        return await self._submit("process_security_tm", input_byte_array)
+
+    async def apply_security_aos(self, input_byte_array, in_place=False):
+        '''
+        Awaitable KmcSdlsClient.apply_security_aos. The frame buffer must not be modified until the call completes.
+        '''
+        return await self._submit("apply_security_aos", input_byte_array, in_place=in_place)
+
+    async def process_security_aos(self, input_byte_array):
+        '''
+        Awaitable KmcSdlsClient.process_security_aos. The frame buffer must not be modified until the call completes.
+        '''
+        return await self._submit("process_security_aos", input_byte_array)
+
+    async def reconfigure(self, config):
+        '''
+        Awaitable KmcSdlsClient.reconfigure. It is queued behind the frames already submitted, which complete with
+        the previous configuration; frames submitted after it wait for it and use the new one.
+        '''
+        return await self._submit("reconfigure", KmcSdlsConfig.from_properties(config))
+
+    def pending(self):
+        '''
+        Returns the number of frames submitted and not yet completed.
+        '''
+        return len(self._pending)
+
+    async def aclose(self, cancel_pending=False):
+        '''
+        Stops accepting frames, lets the native-call thread finish what is queued and calls sdls_shutdown on it.
+
+        Parameters
+        ----------
+        cancel_pending : bool
+            When True, frames that are queued but not yet started are cancelled instead of processed.
+            A frame already inside CryptoLib always runs to completion.
+        '''
+        if not self._closed:
+            self._closed = True
+            if cancel_pending:
+                with self._state_lock:
+                    # Marked under the lock so the native thread, which may already be dequeuing them, drops them
+                    queued = [call for call in self._pending.values() if call.state == _QUEUED]
+                    for call in queued:
+                        call.state = _CANCELLED
+                        self._slots.release()
+                for call in queued:
+                    call.future.cancel()
+            self._calls.put(None)
+        await _get_running_loop().run_in_executor(None, self._thread.join)
+
+    async def __aenter__(self):
+        await asyncio.wrap_future(self._ready)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose(cancel_pending=exc_type is not None)
+
+    async def _submit(self, method, frame, **kwargs):
+        if self._closed:
+            raise SdlsClientException(SdlsClientException.CLIENT_CLOSED, "AsyncKmcSdlsClient has been closed")
+        if not self._ready.done():
+            await asyncio.wrap_future(self._ready)
+        self._ready.result()  # Re-raises a KmcSdlsClient initialization error
+
+        loop = _get_running_loop()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        # Backpressure: wait for a free slot before queuing the frame
+        await self._slots.acquire()
+        if self._closed:
+            self._slots.release()
+            raise SdlsClientException(SdlsClientException.CLIENT_CLOSED, "AsyncKmcSdlsClient has been closed")
+
+        future = loop.create_future()
+        call = _NativeCall(method, frame, kwargs, loop, future)
+        self._pending[future] = call
+        self._calls.put(call)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            with self._state_lock:
+                if call.state == _QUEUED:
+                    # Never started: the native thread will drop it, so its slot is free right away. Calls cancelled
+                    # by aclose are already _CANCELLED with their slot released.
+                    call.state = _CANCELLED
+                    self._slots.release()
+            raise
+        finally:
+            self._pending.pop(future, None)
+
+    def _finish(self, call, ok, value):
+        # Runs on the event loop once the native thread is done with a started call
+        self._slots.release()
+        if call.future.done():
+            return
+        if ok:
+            call.future.set_result(value)
+        else:
+            call.future.set_exception(value)
+
+    def _run_native_calls(self, config, scratch_pool_size, metrics):
+        try:
+            client = KmcSdlsClient(config, scratch_pool_size, metrics)
+        except BaseException as e:
+            self._ready.set_exception(e)
+            return
+        self._ready.set_result(None)
+        try:
+            while True:
+                call = self._calls.get()
+                if call is None:
+                    break
+                with self._state_lock:
+                    if call.state == _CANCELLED:
+                        continue
+                    call.state = _RUNNING
+                try:
+                    value = getattr(client, call.method)(call.frame, **call.kwargs)
+                    ok = True
+                except Exception as e:
+                    value = e
+                    ok = False
+                try:
+                    call.loop.call_soon_threadsafe(self._finish, call, ok, value)
+                except RuntimeError:
+                    pass  # The event loop that submitted the frame has been closed
+        finally:
+            client.shutdown()
@@ -0,0 +1,164 @@
+#
+# Copyright 2021, by the California Institute of Technology.
+# ALL RIGHTS RESERVED. United States Government Sponsorship acknowledged.
+# Any commercial use must be negotiated with the Office of Technology
+# Transfer at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S.
+# export laws and regulations. User has the responsibility to obtain
+# export licenses, or other export authority as may be required before
+# exporting such information to foreign countries or providing access to
+# foreign persons.
+#
+
+
+import mmap
+import os
+
+from gov.nasa.jpl.ammos.kmc.sdlsclient import FrameHeaders
+from gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsClient import SdlsClientException, frame_gvcid
+
+"""
+This module provides a memory-mapped reader for archives of fixed-length TM or AOS Transfer Frames.
+"""
+
+
+class FrameArchive:
+
+    def __init__(self, path, client=None, frame_type='tm', frame_length=None, header_offset=0):
+        '''
+        Memory-maps an archive of fixed-length Transfer Frames.
+
+        Parameters
+        ----------
+        path : str
+            Path of the archive file.
+        client : KmcSdlsClient
+            Client whose GVCID managed parameters give the frame length. It is also the client used by process().
+        frame_type : str
+            'tm' or 'aos'.
+        frame_length : int
+            Length of every frame in the archive. When omitted, the max_frame_length managed parameter configured
+            for the GVCID of the first frame is used.
+        header_offset : int
+            Number of bytes to skip at the start of the file before the first frame.
+        '''
+        if frame_type not in ('tm', 'aos'):
+            raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT,
+                                      "FrameArchive only supports fixed-length 'tm' or 'aos' frames, got: %s" % frame_type)
+        self.path = path
+        self.client = client
+        self.frame_type = frame_type
+        self.header_offset = header_offset
+        self._mmap = None
+        self._view = memoryview(b'')
+
+        size = os.path.getsize(path)
+        if size > header_offset:
+            with open(path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._mmap)[header_offset:]
+
+        if frame_length is None:
+            frame_length = self._managed_frame_length()
+        if frame_length <= 0:
+            raise SdlsClientException(SdlsClientException.INVALID_CONFIGURATION_VALUE,
+                                      "Frame length must be positive, got: %d" % frame_length)
+        self.frame_length = frame_length
+        self._num_frames = len(self._view) // frame_length
+        # Bytes after the last whole frame, e.g. from an archive cut short by a capture that was still running
+        self.trailing_bytes = len(self._view) - self._num_frames * frame_length
+
+    def __len__(self):
+        return self._num_frames
+
+    def __getitem__(self, idx):
+        '''
+        Returns a read-only memoryview over frame idx. Negative indexes count from the end.
+        '''
+        if idx < 0:
+            idx += self._num_frames
+        if not 0 <= idx < self._num_frames:
+            raise IndexError("frame index out of range")
+        start = idx * self.frame_length
+        return self._view[start:start + self.frame_length]
+
+    def __iter__(self):
+        frame_length = self.frame_length
+        view = self._view
+        for start in range(0, self._num_frames * frame_length, frame_length):
+            yield view[start:start + frame_length]
+
+    def batch(self, start, count):
+        '''
+        Returns a list of read-only memoryviews over frames start to start + count (clipped to the archive end),
+        ready to pass to the client's process_security_*_batch methods.
+        '''
+        stop = min(start + count, self._num_frames)
+        frame_length = self.frame_length
+        view = self._view
+        return [view[offset:offset + frame_length] for offset in range(start * frame_length, stop * frame_length,
+                                                                         frame_length)]
+
+    def batches(self, batch_size):
+        '''
+        Yields consecutive lists of at most batch_size frame views covering the whole archive.
+        '''
+        for start in range(0, self._num_frames, batch_size):
+            yield self.batch(start, batch_size)
+
+    def headers(self):
+        '''
+        Decodes the primary header of every frame straight from the mapped file with
+        FrameHeaders.decode_primary_headers. Requires numpy.
+        '''
+        return FrameHeaders.decode_primary_headers(self.frame_type, self._view, self.frame_length)
+
+    def gvcid_index(self):
+        '''
+        Returns the archive's (tfvn, scid, vcid) -> frame index array mapping, see FrameHeaders.gvcid_index.
+        The index arrays can be passed to batch() one run at a time or used to pick frames with archive[idx].
+        '''
+        return FrameHeaders.index_frames(self.frame_type, self._view, self.frame_length)
+
+    def process(self, client=None, chunk_size=64, pdus_only=False):
+        '''
+        Processes SDLS security on every frame of the archive with KmcSdlsClient.process_stream.
+        See process_stream for the parameters and results.
+        '''
+        client = client or self.client
+        if client is None:
+            raise SdlsClientException(SdlsClientException.INVALID_CONFIGURATION,
+                                      "FrameArchive.process requires a KmcSdlsClient")
+        return client.process_stream(iter(self), self.frame_type, chunk_size, pdus_only)
+
+    def close(self):
+        '''
+        Unmaps the archive. Frame views handed out earlier must be released (or garbage collected) first.
+        '''
+        self._view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _managed_frame_length(self):
+        if self.client is None:
+            raise SdlsClientException(SdlsClientException.MISSING_CONFIGURATION_PARAMETER,
+                                      "FrameArchive needs either a frame_length or a KmcSdlsClient to look it up")
+        gvcid = frame_gvcid(self.frame_type, self._view[:2])
+        if gvcid is None:
+            raise SdlsClientException(SdlsClientException.NO_FRAME_DATA,
+                                      "Archive %s holds no frame to read a GVCID from" % self.path)
+        frame_length = self.client.get_max_frame_length(self.frame_type, *gvcid)
+        if frame_length is None:
+            raise SdlsClientException(SdlsClientException.MISSING_CONFIGURATION_PARAMETER,
+                                      "No max_frame_length managed parameter for %s GVCID (tfvn=%d, scid=%d, vcid=%d)" % (
+                                          self.frame_type, gvcid[0], gvcid[1], gvcid[2]))
+        return frame_length
@@ -0,0 +1,261 @@
+#
+# Copyright 2021, by the California Institute of Technology.
+# ALL RIGHTS RESERVED. United States Government Sponsorship acknowledged.
+# Any commercial use must be negotiated with the Office of Technology
+# Transfer at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S.
+# export laws and regulations. User has the responsibility to obtain
+# export licenses, or other export authority as may be required before
+# exporting such information to foreign countries or providing access to
+# foreign persons.
+#
+
+
+from gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsClient import SdlsClientException, TC_MAX_FRAME_LENGTH, \
+    TC_FramePrimaryHeader, TC_HEADER_BITS, TC_HEADER_LENGTH, \
+    TM_FramePrimaryHeader, TM_HEADER_BITS, TM_HEADER_LENGTH, \
+    AOS_FramePrimaryHeader, AOS_HEADER_BITS, AOS_HEADER_LENGTH
+
+"""
+This module generates synthetic TC, TM and AOS Transfer Frames for load, benchmark and soak testing: any GVCID and
+length, with the frame counter of the primary header incrementing from frame to frame and a valid FECF.
+
+Frames of a generator differ only in their counter bytes, so the FECF is not computed over the whole frame each
+time. The CRC register after the constant header bytes is computed once; per frame only the counter bytes go through
+the CRC table, and the rest of the frame, being constant, is crossed with two 256 entry tables (the CRC of a fixed
+run of bytes is affine in the register it starts from). A frame costs the same whatever its length, so batches
+written with numpy into preallocated arrays run at memory copy speed.
+"""
+
+FECF_LENGTH = 2
+
+# Per frame type: (shift, mask) table of the primary header, its length, the frame counter modulus and the (offset,
+# shift) of each counter byte, in frame order. The TM master and virtual channel frame counts both take the counter.
+_FRAME_LAYOUTS = {
+    'tc': (TC_HEADER_BITS, TC_HEADER_LENGTH, 1 << 8, ((4, 0),)),
+    'tm': (TM_HEADER_BITS, TM_HEADER_LENGTH, 1 << 8, ((2, 0), (3, 0))),
+    'aos': (AOS_HEADER_BITS, AOS_HEADER_LENGTH, 1 << 24, ((2, 16), (3, 8), (4, 0))),
+}
+
+
+def _crc16_table():
+    # CRC-16-CCITT (polynomial 0x1021), the CCSDS Frame Error Control Field
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else crc << 1
+        table.append(crc & 0xFFFF)
+    return tuple(table)
+
+
+CRC16_TABLE = _crc16_table()
+
+
+def crc16(data, crc=0xFFFF):
+    '''
+    Returns the CCSDS CRC-16 (polynomial 0x1021, register preset to 0xFFFF) of data. A frame ending in a valid FECF
+    has a CRC of 0.
+    '''
+    table = CRC16_TABLE
+    for byte in bytes(data):
+        crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ byte]
+    return crc
+
+
+class FrameGenerator:
+
+    def __init__(self, frame_type, scid, vcid, frame_length, tfvn=None, first_count=0, payload=b'\xff', fecf=True,
+                 security_header_length=0, security_trailer_length=0):
+        '''
+        Creates a generator of frames on one GVCID.
+
+        Each frame is the primary header, security_header_length zero bytes left for the security header, the data
+        field filled with payload, security_trailer_length zero bytes left for the security trailer and, with fecf,
+        the FECF. The counter of the primary header (TC frame sequence number, TM master and virtual channel frame
+        counts, AOS virtual channel frame count) goes up by one from frame to frame, wrapping around.
+
+        Parameters
+        ----------
+        frame_type : str
+            One of 'tc', 'tm' or 'aos'.
+        scid : int
+            Spacecraft ID.
+        vcid : int
+            Virtual Channel ID.
+        frame_length : int
+            Length of every frame in bytes, FECF included. TC frames can be up to 1024 bytes long.
+        tfvn : int
+            Transfer Frame Version Number, by default the CCSDS one of the frame type (0 for TC and TM, 1 for AOS).
+        first_count : int
+            Counter of the first frame.
+        payload : bytes-like
+            Data field contents, repeated or cut to fit the data field.
+        fecf : bool
+            Whether the frames end in a FECF. Leave it out of TC frames that are passed to apply_security_tc.
+        security_header_length : int
+            Bytes left for CryptoLib to fill in with the security header.
+        security_trailer_length : int
+            Bytes left for CryptoLib to fill in with the security trailer.
+        '''
+        layout = _FRAME_LAYOUTS.get(frame_type)
+        if layout is None:
+            raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT, "Unknown frame type: %s" % frame_type)
+        bit_table, header_length, counter_modulus, counter_bytes = layout
+        data_length = frame_length - header_length - security_header_length - security_trailer_length - (
+            FECF_LENGTH if fecf else 0)
+        if data_length <= 0:
+            raise SdlsClientException(SdlsClientException.INVALID_CONFIGURATION_VALUE,
+                                      "%s frames of %d bytes leave no room for a data field" % (
+                                          frame_type.upper(), frame_length))
+        if frame_type == 'tc' and frame_length > TC_MAX_FRAME_LENGTH:
+            raise SdlsClientException(SdlsClientException.INVALID_CONFIGURATION_VALUE,
+                                      "TC frames are at most %d bytes long, got %d" % (TC_MAX_FRAME_LENGTH,
+                                                                                      frame_length))
+        if not payload:
+            raise SdlsClientException(SdlsClientException.INVALID_CONFIGURATION_VALUE, "The payload is empty")
+
+        if frame_type == 'tc':
+            header = TC_FramePrimaryHeader(0 if tfvn is None else tfvn, 1, 0, 0, scid, vcid, frame_length - 1, 0)
+        elif frame_type == 'tm':
+            # No packet starts in an idle data field: first header pointer 0x7FF, segment length ID 3
+            header = TM_FramePrimaryHeader(0 if tfvn is None else tfvn, scid, vcid, 0, 0, 0, 0, 0, 0, 3, 0x7FF)
+        else:
+            header = AOS_FramePrimaryHeader(1 if tfvn is None else tfvn, scid, vcid, 0, 0, 0, 0, 0, 0)
+        for name, value, (_, mask) in zip(header._fields, header, bit_table):
+            if not 0 <= value <= mask:
+                raise SdlsClientException(SdlsClientException.INVALID_CONFIGURATION_VALUE,
+                                          "%s %s must be between 0 and %d, got %d" % (frame_type.upper(), name,
+                                                                                      mask, value))
+
+        self.frame_type = frame_type
+        self.frame_length = frame_length
+        self.fecf = fecf
+        self.gvcid = (header.tfvn, scid, vcid)
+        data = (bytes(payload) * (data_length // len(payload) + 1))[:data_length]
+        self._template = bytes(header.to_bytes()) + bytes(security_header_length) + data + bytes(
+            security_trailer_length) + bytes(FECF_LENGTH if fecf else 0)
+        self._counter_modulus = counter_modulus
+        self._counter_bytes = counter_bytes
+        self.count = first_count % counter_modulus
+
+        # CRC register after the constant bytes ahead of the counter, and the affine map crossing the constant bytes
+        # after it: register out = _advance_low[r & 0xFF] ^ _advance_high[r >> 8] ^ _advance_constant
+        first_counter = counter_bytes[0][0]
+        suffix = self._template[counter_bytes[-1][0] + 1:frame_length - FECF_LENGTH]
+        self._prefix_crc = crc16(self._template[:first_counter])
+        self._advance_constant = crc16(suffix, 0)
+        basis = [crc16(bytes(len(suffix)), 1 << bit) for bit in range(16)]
+        self._advance_low = _linear_table(basis[:8])
+        self._advance_high = _linear_table(basis[8:])
+        self._numpy_tables = None
+
+    def next_frame(self):
+        '''
+        Returns the next frame as a new bytearray.
+        '''
+        frame = bytearray(self._template)
+        self._write(frame, 0, self.count)
+        self.count = (self.count + 1) % self._counter_modulus
+        return frame
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.next_frame()
+
+    def generate(self, num_frames):
+        '''
+        Returns the next num_frames frames as a (num_frames, frame_length) uint8 numpy array. Requires numpy.
+        '''
+        import numpy
+
+        frames = numpy.empty((num_frames, self.frame_length), dtype=numpy.uint8)
+        self.generate_into(frames)
+        return frames
+
+    def generate_into(self, buffer, num_frames=None):
+        '''
+        Writes the next frames into a preallocated buffer, back to back.
+
+        Parameters
+        ----------
+        buffer : writable bytes-like
+            A 2 dimensional uint8 numpy array of frame_length columns, one frame per row, or any writable buffer
+            (bytearray, mmap, ...) holding frames back to back. numpy is used when installed; otherwise the frames
+            are written one by one.
+        num_frames : int
+            Number of frames to write, by default as many as fit.
+
+        Returns
+        ----------
+        int
+            The number of frames written.
+        '''
+        view = memoryview(buffer).cast('B')
+        capacity = len(view) // self.frame_length
+        if num_frames is None:
+            num_frames = capacity
+        elif num_frames > capacity:
+            raise SdlsClientException(SdlsClientException.OUTPUT_BUFFER_TOO_SMALL,
+                                      "Buffer holds %d frames of %d bytes, %d requested" % (capacity, self.frame_length,
+                                                                                          num_frames))
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        if numpy is None:
+            for idx in range(num_frames):
+                offset = idx * self.frame_length
+                view[offset:offset + self.frame_length] = self._template
+                self._write(view, offset, (self.count + idx) % self._counter_modulus)
+        elif num_frames:
+            frames = numpy.frombuffer(view, dtype=numpy.uint8, count=num_frames * self.frame_length).reshape(
+                num_frames, self.frame_length)
+            self._generate_numpy(numpy, frames)
+        self.count = (self.count + num_frames) % self._counter_modulus
+        return num_frames
+
+    def _write(self, frame, offset, count):
+        # Sets the counter bytes of the frame at offset and, with fecf, its FECF
+        table = CRC16_TABLE
+        crc = self._prefix_crc
+        for byte_offset, shift in self._counter_bytes:
+            byte = (count >> shift) & 0xFF
+            frame[offset + byte_offset] = byte
+            crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ byte]
+        if self.fecf:
+            crc = self._advance_low[crc & 0xFF] ^ self._advance_high[crc >> 8] ^ self._advance_constant
+            end = offset + self.frame_length
+            frame[end - 2] = crc >> 8
+            frame[end - 1] = crc & 0xFF
+
+    def _generate_numpy(self, numpy, frames):
+        if self._numpy_tables is None:
+            self._numpy_tables = tuple(numpy.array(table, dtype=numpy.uint16) for table in (
+                CRC16_TABLE, self._advance_low, self._advance_high))
+        table, advance_low, advance_high = self._numpy_tables
+        frames[:] = numpy.frombuffer(self._template, dtype=numpy.uint8)
+        counts = (numpy.arange(len(frames), dtype=numpy.uint64) + self.count) % self._counter_modulus
+        crc = numpy.full(len(frames), self._prefix_crc, dtype=numpy.uint16)
+        for byte_offset, shift in self._counter_bytes:
+            column = ((counts >> numpy.uint64(shift)) & numpy.uint64(0xFF)).astype(numpy.uint8)
+            frames[:, byte_offset] = column
+            crc = (crc << numpy.uint16(8)) ^ table[(crc >> numpy.uint16(8)) ^ column]
+        if self.fecf:
+            crc = advance_low[crc & numpy.uint16(0xFF)] ^ advance_high[crc >> numpy.uint16(8)] ^ numpy.uint16(
+                self._advance_constant)
+            frames[:, -2] = crc >> numpy.uint16(8)
+            frames[:, -1] = crc & numpy.uint16(0xFF)
+
+
+def _linear_table(basis):
+    # Table of the XOR of the basis entries selected by the bits of each byte value
+    table = [0] * 256
+    for value in range(1, 256):
+        low_bit = value & -value
+        table[value] = table[value ^ low_bit] ^ basis[low_bit.bit_length() - 1]
+    return tuple(table)
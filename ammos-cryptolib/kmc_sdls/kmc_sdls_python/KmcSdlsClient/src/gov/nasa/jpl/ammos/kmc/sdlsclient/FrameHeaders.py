@@ -0,0 +1,184 @@
+#
+# Copyright 2021, by the California Institute of Technology.
+# ALL RIGHTS RESERVED. United States Government Sponsorship acknowledged.
+# Any commercial use must be negotiated with the Office of Technology
+# Transfer at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S.
+# export laws and regulations. User has the responsibility to obtain
+# export licenses, or other export authority as may be required before
+# exporting such information to foreign countries or providing access to
+# foreign persons.
+#
+
+
+from gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsClient import SdlsClientException, \
+    TC_FramePrimaryHeader, TC_HEADER_BITS, TC_HEADER_LENGTH, \
+    TM_FramePrimaryHeader, TM_HEADER_BITS, TM_HEADER_LENGTH, \
+    AOS_FramePrimaryHeader, AOS_HEADER_BITS, AOS_HEADER_LENGTH
+
+"""
+This module decodes the primary headers of a whole batch of TC, TM or AOS Transfer Frames at once with numpy,
+before the frames enter CryptoLib, and indexes the batch by GVCID for routing, deduplication and sharding.
+
+The decoder uses the same (shift, mask) tables as the primary header NamedTuples' to_bytes()/from_bytes(), applied
+to a column of 64 bit header words instead of one integer at a time. Requires numpy.
+"""
+
+# Per frame type: NamedTuple whose fields name the columns, (shift, mask) table, header length in bytes
+_HEADER_LAYOUTS = {
+    'tc': (TC_FramePrimaryHeader, TC_HEADER_BITS, TC_HEADER_LENGTH),
+    'tm': (TM_FramePrimaryHeader, TM_HEADER_BITS, TM_HEADER_LENGTH),
+    'aos': (AOS_FramePrimaryHeader, AOS_HEADER_BITS, AOS_HEADER_LENGTH),
+}
+_header_dtypes = dict()
+
+
+def _header_layout(frame_type):
+    try:
+        return _HEADER_LAYOUTS[frame_type]
+    except KeyError:
+        raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT, "Unknown frame type: %s" % frame_type)
+
+
+def primary_header_dtype(frame_type):
+    '''
+    Returns the numpy structured dtype of the records returned by decode_primary_headers.
+
+    The fields are the primary header NamedTuple's fields (without the AOS FHEC), each in the smallest unsigned
+    integer type that holds it, followed by frame_len, the length in bytes of the frame the header was read from.
+    '''
+    import numpy
+
+    if frame_type not in _header_dtypes:
+        header_type, bit_table, _ = _header_layout(frame_type)
+        fields = [(name, 'u1' if mask <= 0xFF else 'u2' if mask <= 0xFFFF else 'u4')
+                  for name, (_, mask) in zip(header_type._fields, bit_table)]
+        _header_dtypes[frame_type] = numpy.dtype(fields + [('frame_len', 'u4')])
+    return _header_dtypes[frame_type]
+
+
+def _header_bytes(frames, header_length, frame_length):
+    # Returns an (n, header_length) uint8 array of leading frame bytes, plus the frame lengths
+    import numpy
+
+    if frame_length is not None:
+        # One buffer of fixed-length records, e.g. a FrameArchive mmap: decoded in place, without copying frames
+        records = numpy.frombuffer(frames, dtype=numpy.uint8)
+        num_frames = len(records) // frame_length
+        records = records[:num_frames * frame_length].reshape(num_frames, frame_length)
+        lengths = numpy.full(num_frames, frame_length, dtype=numpy.uint32)
+    elif isinstance(frames, numpy.ndarray):
+        if frames.ndim != 2:
+            raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT,
+                                      "Frame arrays must be 2 dimensional (frames x bytes), got %d dimensions" %
+                                      frames.ndim)
+        records = frames.astype(numpy.uint8, copy=False)
+        lengths = numpy.full(len(records), records.shape[1], dtype=numpy.uint32)
+    else:
+        try:
+            views = [memoryview(frame).cast('B') for frame in frames]
+        except TypeError as e:
+            raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT,
+                                      "Frames must be bytes-like objects: %s" % e)
+        lengths = numpy.fromiter((len(view) for view in views), dtype=numpy.uint32, count=len(views))
+        # Only the headers are gathered; frames too short for one are zero padded
+        zeros = bytes(header_length)
+        records = numpy.frombuffer(b''.join(bytes(view[:header_length]) + zeros[len(view):] for view in views),
+                                   dtype=numpy.uint8).reshape(len(views), header_length)
+
+    if records.shape[1] < header_length:
+        padded = numpy.zeros((len(records), header_length), dtype=numpy.uint8)
+        padded[:, :records.shape[1]] = records
+        records = padded
+    return records[:, :header_length], lengths
+
+
+def decode_primary_headers(frame_type, frames, frame_length=None):
+    '''
+    Decodes the primary header of every frame in a batch.
+
+    Parameters
+    ----------
+    frame_type : str
+        One of 'tc', 'tm' or 'aos'.
+    frames : sequence, numpy.ndarray or bytes-like
+        A sequence of bytes-like frames, a 2 dimensional uint8 array with one frame per row, or, when frame_length
+        is given, a single buffer of back-to-back fixed-length frames.
+    frame_length : int
+        Length of every frame in a single-buffer batch. A trailing partial frame is ignored.
+
+    Returns
+    ----------
+    numpy.ndarray
+        One primary_header_dtype(frame_type) record per frame. Frames shorter than their primary header are decoded
+        from zero padding; filter them out with their frame_len.
+    '''
+    import numpy
+
+    header_type, bit_table, header_length = _header_layout(frame_type)
+    if frames is None:
+        raise SdlsClientException(SdlsClientException.NO_FRAME_DATA, "Input Transfer Frame Batch is Empty")
+    if frame_length is not None and frame_length <= 0:
+        raise SdlsClientException(SdlsClientException.INVALID_CONFIGURATION_VALUE,
+                                  "Frame length must be positive, got: %d" % frame_length)
+    records, lengths = _header_bytes(frames, header_length, frame_length)
+
+    # Big-endian header bytes -> one uint64 word per frame, the same word _unpack_bits builds with int.from_bytes
+    words = numpy.zeros(len(records), dtype=numpy.uint64)
+    for byte_idx in range(header_length):
+        words |= records[:, byte_idx].astype(numpy.uint64) << numpy.uint64(8 * (header_length - 1 - byte_idx))
+
+    headers = numpy.empty(len(records), dtype=primary_header_dtype(frame_type))
+    for name, (shift, mask) in zip(header_type._fields, bit_table):
+        headers[name] = (words >> numpy.uint64(shift)) & numpy.uint64(mask)
+    headers['frame_len'] = lengths
+    return headers
+
+
+def gvcid_keys(headers):
+    '''
+    Returns one integer key per decoded header packing its GVCID as (tfvn << 16) | (scid << 6) | vcid.
+    '''
+    import numpy
+
+    return (headers['tfvn'].astype(numpy.uint32) << 16) | (headers['scid'].astype(numpy.uint32) << 6) | \
+        headers['vcid'].astype(numpy.uint32)
+
+
+def gvcid_index(headers, min_frame_len=1):
+    '''
+    Groups the frames of a decoded batch by GVCID.
+
+    Parameters
+    ----------
+    headers : numpy.ndarray
+        Records returned by decode_primary_headers.
+    min_frame_len : int
+        Frames shorter than this are left out of the index, e.g. the frame type's primary header length.
+
+    Returns
+    ----------
+    dict
+        (tfvn, scid, vcid) -> numpy array of the indexes of that GVCID's frames, in batch order.
+    '''
+    import numpy
+
+    candidates = numpy.flatnonzero(headers['frame_len'] >= min_frame_len)
+    keys = gvcid_keys(headers)[candidates]
+    # A stable sort keeps each GVCID's frames in batch order
+    order = numpy.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    unique_keys, starts = numpy.unique(sorted_keys, return_index=True)
+    groups = numpy.split(candidates[order], starts[1:])
+    return {(key >> 16, (key >> 6) & 0x3FF, key & 0x3F): group for key, group in zip(unique_keys.tolist(), groups)}
+
+
+def index_frames(frame_type, frames, frame_length=None):
+    '''
+    Decodes a batch of frames and returns its GVCID index, leaving out frames too short for a primary header.
+    See decode_primary_headers for the parameters and gvcid_index for the result.
+    '''
+    return gvcid_index(decode_primary_headers(frame_type, frames, frame_length),
+                       min_frame_len=_header_layout(frame_type)[2])
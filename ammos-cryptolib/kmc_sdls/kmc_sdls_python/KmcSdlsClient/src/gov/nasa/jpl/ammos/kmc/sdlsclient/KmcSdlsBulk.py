@@ -0,0 +1,213 @@
+#
+# Copyright 2021, by the California Institute of Technology.
+# ALL RIGHTS RESERVED. United States Government Sponsorship acknowledged.
+# Any commercial use must be negotiated with the Office of Technology
+# Transfer at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S.
+# export laws and regulations. User has the responsibility to obtain
+# export licenses, or other export authority as may be required before
+# exporting such information to foreign countries or providing access to
+# foreign persons.
+#
+
+
+import argparse
+import array
+import binascii
+import collections
+import sys
+import time
+
+from gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsClient import KmcSdlsClient, SdlsClientException, load_properties
+
+"""
+kmc-sdls-bulk: applies or processes SDLS security on every frame of a frame file in a single process, writes the
+resulting frames to an output file and reports throughput, error counts and per-frame latency percentiles.
+"""
+
+INPUT_FORMATS = ("fixed", "length-prefixed", "hex")
+OUTPUT_FORMATS = ("length-prefixed", "hex", "raw")
+LATENCY_PERCENTILES = (50, 90, 99, 99.9)
+
+
+def read_fixed_length_frames(stream, frame_length):
+    '''
+    Yields consecutive frame_length byte records from a binary stream. A trailing partial record is yielded as is.
+    '''
+    while True:
+        frame = stream.read(frame_length)
+        if not frame:
+            return
+        yield frame
+
+
+def read_length_prefixed_frames(stream, prefix_size=2):
+    '''
+    Yields frames from a binary stream where each frame is preceded by its big-endian length.
+    '''
+    while True:
+        prefix = stream.read(prefix_size)
+        if not prefix:
+            return
+        if len(prefix) < prefix_size:
+            raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT, "Truncated frame length prefix")
+        frame_length = int.from_bytes(prefix, 'big')
+        frame = stream.read(frame_length)
+        if len(frame) < frame_length:
+            raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT,
+                                      "Truncated frame: expected %d bytes, read %d" % (frame_length, len(frame)))
+        yield frame
+
+
+def read_hex_frames(stream):
+    '''
+    Yields one frame per line of hex from a binary stream. Blank lines and lines starting with '#' are skipped.
+    '''
+    for line in stream:
+        line = line.strip()
+        if not line or line.startswith(b'#'):
+            continue
+        try:
+            yield binascii.unhexlify(line)
+        except (binascii.Error, ValueError) as e:
+            raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT, "Invalid hex frame line: %s" % e)
+
+
+def write_frame(stream, frame, output_format, prefix_size=2):
+    if output_format == "length-prefixed":
+        stream.write(len(frame).to_bytes(prefix_size, 'big'))
+        stream.write(frame)
+    elif output_format == "hex":
+        stream.write(binascii.hexlify(frame))
+        stream.write(b'\n')
+    else:
+        stream.write(frame)
+
+
+def percentile(sorted_values, pct):
+    '''
+    Returns the nearest-rank percentile of an already sorted sequence.
+    '''
+    if not sorted_values:
+        return 0.0
+    rank = int(round(pct / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[rank]
+
+
+def build_options_parser():
+    arg_parser = argparse.ArgumentParser(prog="kmc-sdls-bulk",
+                                         description='Apply or process SDLS security on every frame of a frame file')
+    arg_parser.add_argument("input", help="Input frame file, or - for stdin")
+    arg_parser.add_argument("-o", "--output", dest="output",
+                            help="Output frame file, or - for stdout. Frames are only counted when omitted")
+    arg_parser.add_argument("-p", "--properties", dest="properties", required=True, type=argparse.FileType('r'),
+                            help="The properties file that contains all the configuration needed by KmcSdlsClient "
+                                 "(supported properties defined in KMC SIS)")
+    arg_parser.add_argument("-t", "--type", dest="type", choices=["TC", "TM", "AOS"], type=str.upper, default="TC",
+                            help="Frame type, choice between TC (default), TM, and AOS")
+    mode = arg_parser.add_mutually_exclusive_group()
+    mode.add_argument("-A", "--apply", dest="process", action='store_false',
+                      help="Apply security to the input frames (default)")
+    mode.add_argument("-P", "--process", dest="process", action='store_true',
+                      help="Process security on the input frames and write the unwrapped PDUs")
+    arg_parser.set_defaults(process=False)
+    arg_parser.add_argument("-i", "--input-format", dest="input_format", choices=INPUT_FORMATS, default="hex",
+                            help="fixed: frame-length byte records, length-prefixed: big-endian length before each "
+                                 "frame, hex: one hex frame per line (default)")
+    arg_parser.add_argument("-l", "--frame-length", dest="frame_length", type=int,
+                            help="Record length for the fixed input format")
+    arg_parser.add_argument("-O", "--output-format", dest="output_format", choices=OUTPUT_FORMATS,
+                            help="Output framing. Defaults to hex for hex input and length-prefixed otherwise")
+    arg_parser.add_argument("--prefix-size", dest="prefix_size", type=int, choices=[2, 4], default=2,
+                            help="Size in bytes of the length prefix for length-prefixed input and output")
+    return arg_parser
+
+
+def _open_binary(path, mode):
+    if path == "-":
+        return sys.stdin.buffer if "r" in mode else sys.stdout.buffer
+    return open(path, mode)
+
+
+def main(argv=None):
+    cli_args = build_options_parser().parse_args(argv)
+    if cli_args.input_format == "fixed" and not cli_args.frame_length:
+        raise SystemExit("kmc-sdls-bulk: --frame-length is required for the fixed input format")
+    output_format = cli_args.output_format or ("hex" if cli_args.input_format == "hex" else "length-prefixed")
+    f_type = cli_args.type.lower()
+
+    init_start = time.perf_counter()
+    try:
+        client = KmcSdlsClient(load_properties(cli_args.properties))
+    except (SdlsClientException, ValueError) as e:
+        raise SystemExit("kmc-sdls-bulk: invalid properties file %s: %s" % (cli_args.properties.name, e))
+    init_seconds = time.perf_counter() - init_start
+    client_method = getattr(client, ("process_security_" if cli_args.process else "apply_security_") + f_type)
+
+    latencies = array.array('d')
+    error_counts = collections.Counter()
+    error_messages = dict()
+    bytes_in = 0
+    bytes_out = 0
+    clock = time.perf_counter
+    in_stream = None
+    out_stream = None
+    run_start = clock()
+    try:
+        in_stream = _open_binary(cli_args.input, "rb")
+        out_stream = _open_binary(cli_args.output, "wb") if cli_args.output else None
+        if cli_args.input_format == "fixed":
+            frames = read_fixed_length_frames(in_stream, cli_args.frame_length)
+        elif cli_args.input_format == "length-prefixed":
+            frames = read_length_prefixed_frames(in_stream, cli_args.prefix_size)
+        else:
+            frames = read_hex_frames(in_stream)
+        for frame in frames:
+            bytes_in += len(frame)
+            frame_start = clock()
+            try:
+                result = client_method(bytearray(frame))
+            except SdlsClientException as e:
+                latencies.append(clock() - frame_start)
+                error_counts[e.get_error_code()] += 1
+                error_messages.setdefault(e.get_error_code(), str(e))
+                continue
+            latencies.append(clock() - frame_start)
+            if cli_args.process:
+                result = getattr(result, f_type + "_pdu")
+            bytes_out += len(result)
+            if out_stream is not None:
+                write_frame(out_stream, result, output_format, cli_args.prefix_size)
+    except (SdlsClientException, OSError) as e:
+        # The frame files could not be opened, read or written; frames CryptoLib rejects are counted above
+        raise SystemExit("kmc-sdls-bulk: %s" % e)
+    finally:
+        run_seconds = clock() - run_start
+        if in_stream is not None and in_stream is not sys.stdin.buffer:
+            in_stream.close()
+        if out_stream is not None and out_stream is not sys.stdout.buffer:
+            out_stream.close()
+        client.shutdown()
+
+    report = sys.stderr if cli_args.output == "-" else sys.stdout
+    num_frames = len(latencies)
+    num_errors = sum(error_counts.values())
+    rate_seconds = run_seconds if run_seconds > 0 else float('inf')
+    print("CryptoLib init:   %.3f s" % init_seconds, file=report)
+    print("Frames:           %d (%d ok, %d failed) in %.3f s" % (num_frames, num_frames - num_errors, num_errors,
+                                                                 run_seconds), file=report)
+    print("Throughput:       %.1f frames/s, %.3f MB/s in, %.3f MB/s out" % (
+        num_frames / rate_seconds, bytes_in / 1e6 / rate_seconds, bytes_out / 1e6 / rate_seconds), file=report)
+    sorted_latencies = sorted(latencies)
+    print("Latency (us):     " + ", ".join(
+        ["p%g %.1f" % (pct, percentile(sorted_latencies, pct) * 1e6) for pct in LATENCY_PERCENTILES] +
+        ["max %.1f" % ((sorted_latencies[-1] if sorted_latencies else 0.0) * 1e6)]), file=report)
+    for error_code, count in error_counts.most_common():
+        print("Error %-24s %8d  %s" % (error_code, count, error_messages[error_code]), file=report)
+    return 1 if num_errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
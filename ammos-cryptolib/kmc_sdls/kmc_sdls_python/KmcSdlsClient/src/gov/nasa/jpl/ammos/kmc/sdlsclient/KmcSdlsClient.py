@@ -13,14 +13,38 @@
 #
 
 
-import distutils.util
+import itertools
 import os.path
 import re
+import struct
+import time
 from typing import NamedTuple
 
-import kmc_python_c_sdls_interface
+
+class _LazyInterface:
+    '''
+    Stands in for the kmc_python_c_sdls_interface extension until it is first used, so importing this module (for
+    its frame types or KmcSdlsConfig) does not load CryptoLib. The first attribute access imports the extension and
+    rebinds the module global to it, so later native calls pay no indirection.
+    '''
+
+    def __getattr__(self, name):
+        global kmc_python_c_sdls_interface
+        import kmc_python_c_sdls_interface as interface
+        kmc_python_c_sdls_interface = interface
+        return getattr(interface, name)
+
+
+kmc_python_c_sdls_interface = _LazyInterface()
 
 SUCCESS = 0
+# Status reported when a secured frame or PDU does not fit the output buffer (SDLS_OUTPUT_BUFFER_TOO_SHORT in kmc_sdls.h)
+SDLS_OUTPUT_BUFFER_TOO_SHORT = -1000
+# Largest TC Transfer Frame allowed by the 10 bit frame length field
+TC_MAX_FRAME_LENGTH = 1024
+
+# Monotonic nanosecond clock timing native calls for KmcSdlsMetrics (time.perf_counter_ns needs Python 3.7)
+_clock_ns = getattr(time, "perf_counter_ns", None) or (lambda: int(time.perf_counter() * 1e9))
 
 """
 This module defines a pythonic library for interfacing with the kmc_python_c_sdls_interface
@@ -32,318 +56,107 @@ class KmcSdlsClient:
     ffi = None
     global_dict = dict()
 
-    def __init__(self, config):
+    def __init__(self, config, scratch_pool_size=8, metrics=True):
         '''
         Default KmcSdlsClient Constructor
 
         Parameters
         ----------
-        config : list
-            A list of properties that configure the CryptoLib interface.
+        config : list or KmcSdlsConfig
+            A list of properties that configure the CryptoLib interface, or the KmcSdlsConfig compiled from them.
             See the KMC SIS for what the supported properties are.
+        scratch_pool_size : int
+            Maximum number of native TC_t/TM_t/AOS_t result structs kept for reuse per frame type.
+        metrics : bool or KmcSdlsMetrics
+            Whether every native call is recorded in self.metrics (which can also be switched later through
+            self.metrics.enabled), or the KmcSdlsMetrics to record them in.
 
         '''
+        if isinstance(metrics, bool):
+            from gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsMetrics import KmcSdlsMetrics
+            metrics = KmcSdlsMetrics(enabled=metrics)
+        self.metrics = metrics
+        self.profiler = None
         self.ffi = kmc_python_c_sdls_interface.ffi
+        self.config = KmcSdlsConfig.from_properties(config)
+        self.managed_parameters = self.config.managed_parameters
 
-        config_dict = dict(config_str.split('=', 1) for config_str in config)
+        # Native scratch memory reused across process_security_* calls
+        self._tc_pool = _ScratchStructPool(self.ffi, "TC_t", "tc_pdu", scratch_pool_size)
+        self._tm_pool = _ScratchStructPool(self.ffi, "TM_t", "tm_pdu", scratch_pool_size)
+        self._aos_pool = _ScratchStructPool(self.ffi, "AOS_t", "aos_pdu", scratch_pool_size)
+        self._int_cell = self.ffi.new("int *")
+        self._uint16_cell = self.ffi.new("uint16_t *")
+        _load_error_names()
 
-        home = os.path.expanduser('~')
+        self._initialize(self.config)
 
-        sadb_type_map = {"uninitialized": 0, "custom": 1, "inmemory": 2, "mariadb": 3}
-        crypto_type_map = {"uninitialized": 0, "libgcrypt": 1, "kmccryptoservice": 2, "wolfssl": 3}
-        cam_login_method = {"none": 0, "kerberos": 1, "keytab_file": 2}
-
-        # Configure CryptoLib
-        cryptolib_sadb_type = sadb_type_map.get(config_dict.get("cryptolib.sadb.type", "mariadb"), 3)
-        cryptolib_crypto_type = crypto_type_map.get(config_dict.get("cryptolib.crypto.type", "kmccryptoservice"), 2)
+    def reconfigure(self, config):
+        '''
+        Switches the client to a new configuration, doing no more native work than the difference requires.
 
-        cryptolib_process_tc_ignore_antireplay = distutils.util.strtobool(
-            config_dict.get("cryptolib.process_tc.ignore_antireplay", "true"))
-        cryptolib_process_tc_ignore_sa_state = distutils.util.strtobool(
-            config_dict.get("cryptolib.process_tc.ignore_sa_state", "true"))
-        cryptolib_process_tc_process_pdus = distutils.util.strtobool(
-            config_dict.get("cryptolib.process_tc.process_pdus", "false"))
-        if "cryptolib.apply_tm.create_ecf" in config_dict:
-            cryptolib_apply_create_ecf = distutils.util.strtobool(
-                config_dict.get("cryptolib.apply_tm.create_ecf", "false")) + 2
-        elif "cryptolib.apply_aos.create_ecf" in config_dict:
-            cryptolib_apply_create_ecf = distutils.util.strtobool(
-                config_dict.get("cryptolib.apply_aos.create_ecf", "false")) + 4
-        else:
-            cryptolib_apply_create_ecf = distutils.util.strtobool(
-                config_dict.get("cryptolib.apply_tc.create_ecf", "false"))
+        GVCID managed parameters that only the new configuration has are added to the running CryptoLib. Any other
+        change (SADB, KMC Crypto Service or CAM settings such as rotated certificate paths, changed or removed managed
+        parameters) shuts CryptoLib down and initializes it again with the new configuration. CryptoLib state is
+        process-wide, so this client cannot serve frames while it restarts; KmcSdlsPool.reconfigure brings up
+        standby workers instead. If the new configuration fails to initialize, the previous one is restored before
+        the error is raised; if that fails too, the restore error is raised with the original error as its cause.
 
-        cryptolib_tc_has_pus_header = distutils.util.strtobool(config_dict.get("cryptolib.tc.has_pus_header", "false"))
-        cryptolib_tc_unique_sa_per_mapid = distutils.util.strtobool(
-            config_dict.get("cryptolib.tc.unique_sa_per_mapid", "false"))
-        if "cryptolib.process_tm.check_fecf" in config_dict:
-            cryptolib_check_fecf = distutils.util.strtobool(
-                config_dict.get("cryptolib.process_tm.check_fecf", "false")) + 2
-        elif "cryptolib.process_aos.check_fecf" in config_dict:
-            cryptolib_check_fecf = distutils.util.strtobool(
-                config_dict.get("cryptolib.process_aos.check_fecf", "false")) + 4
-        else:
-            cryptolib_check_fecf = distutils.util.strtobool(config_dict.get("cryptolib.process_tc.check_fecf", "false"))
+        Parameters
+        ----------
+        config : list or KmcSdlsConfig
+            The new CryptoLib configuration, as passed to the constructor.
 
-        if "cryptolib.tm.vcid_bitmask" in config_dict:
-            cryptolib_vcid_bitmask = int(config_dict.get("cryptolib.tm.vcid_bitmask", "0x3F"), 16)
-        elif "cryptolib.aos.vcid_bitmask" in config_dict:
-            cryptolib_vcid_bitmask = int(config_dict.get("cryptolib.aos.vcid_bitmask", "0x3F"), 16)
+        Returns
+        ----------
+        ConfigChange
+            What differed between the previous and the new configuration.
+        '''
+        new_config = KmcSdlsConfig.from_properties(config)
+        change = self.config.diff(new_config)
+        if change.requires_restart:
+            kmc_python_c_sdls_interface.lib.sdls_shutdown()
+            try:
+                self._initialize(new_config)
+            except SdlsClientException as e:
+                kmc_python_c_sdls_interface.lib.sdls_shutdown()
+                try:
+                    self._initialize(self.config)
+                except SdlsClientException as restore_error:
+                    # Neither configuration is running; keep why the new one failed as the cause
+                    raise restore_error from e
+                raise
         else:
-            cryptolib_vcid_bitmask = int(config_dict.get("cryptolib.tc.vcid_bitmask", "0x3F"), 16)
-
-        cryptolib_tc_on_rollover_increment_nontransmitted_counter = distutils.util.strtobool(
-            config_dict.get("cryptolib.tc.on_rollover_increment_nontransmitted_counter", "true"))
-        kmc_python_c_sdls_interface.lib.sdls_config_cryptolib(self.ffi.cast("uint8_t", cryptolib_sadb_type)
-                                                              , self.ffi.cast("uint8_t", cryptolib_crypto_type)
-                                                              , self.ffi.cast("uint8_t", cryptolib_apply_create_ecf)
-                                                              , self.ffi.cast("uint8_t",
-                                                                              cryptolib_process_tc_process_pdus)
-                                                              , self.ffi.cast("uint8_t", cryptolib_tc_has_pus_header)
-                                                              , self.ffi.cast("uint8_t",
-                                                                              cryptolib_process_tc_ignore_sa_state)
-                                                              , self.ffi.cast("uint8_t",
-                                                                              cryptolib_process_tc_ignore_antireplay)
-                                                              ,
-                                                              self.ffi.cast("uint8_t", cryptolib_tc_unique_sa_per_mapid)
-                                                              , self.ffi.cast("uint8_t", cryptolib_check_fecf)
-                                                              , self.ffi.cast("uint8_t", cryptolib_vcid_bitmask)
-                                                              , self.ffi.cast("uint8_t",
-                                                                              cryptolib_tc_on_rollover_increment_nontransmitted_counter)
-                                                              )
-
-        # MariaDB Property Keys
-        mariadb_tls_cacert_property_key = "cryptolib.sadb.mariadb.tls.cacert"
-        mariadb_mtls_clientcert_property_key = "cryptolib.sadb.mariadb.mtls.clientcert"
-        mariadb_mtls_clientkey_property_key = "cryptolib.sadb.mariadb.mtls.clientkey"
-        # Configure MySQL
-        sadb_mariadb_fqdn = config_dict.get("cryptolib.sadb.mariadb.fqdn", "localhost")
-        sadb_mariadb_port = int(config_dict.get("cryptolib.sadb.mariadb.port", 3306))
-        sadb_mariadb_database_name = config_dict.get("cryptolib.sadb.mariadb.database_name", "sadb")
-        sadb_mariadb_username = config_dict.get("cryptolib.sadb.mariadb.username", "sadb_user")
-        sadb_mariadb_password = config_dict.get("cryptolib.sadb.mariadb.password", "")
-        sadb_mariadb_cacert = config_dict.get(mariadb_tls_cacert_property_key,
-                                              "")  # Start empty, defaults to /etc/pki/tls/certs/ammos-ca-bundle.crt below if mtls_client_certs are set
-        sadb_mariadb_capath = config_dict.get("cryptolib.sadb.mariadb.tls.capath", "")
-        sadb_mariadb_tls_verifyserver = distutils.util.strtobool(
-            config_dict.get("cryptolib.sadb.mariadb.tls.verifyserver",
-                            "false"))  # Must be false by default,defaults to true below if mTLS/TLS is used!
-        sadb_mariadb_clientcert = config_dict.get(mariadb_mtls_clientcert_property_key, "")
-        sadb_mariadb_clientkey = config_dict.get(mariadb_mtls_clientkey_property_key, "")
-        sadb_mariadb_clientkeypassword = config_dict.get("cryptolib.sadb.mariadb.mtls.clientkeypassword", "")
-        sadb_mariadb_require_secure_transport = distutils.util.strtobool(
-            config_dict.get("cryptolib.sadb.mariadb.require_secure_transport",
-                            "false"))  # Must be false by default, otherwise tls connections are attempted, even if not configured for them.
-
-        # Create char[] for config strings
-        sadb_mariadb_username_ffi = self._ffi_null_or_char(sadb_mariadb_username)
-        sadb_mariadb_password_ffi = self._ffi_null_or_char(sadb_mariadb_password)
-        sadb_mariadb_fqdn_ffi = self._ffi_null_or_char(sadb_mariadb_fqdn)
-        sadb_mariadb_database_name_ffi = self._ffi_null_or_char(sadb_mariadb_database_name)
-        sadb_mariadb_clientcert_ffi = self._ffi_null_or_char(sadb_mariadb_clientcert)
-        sadb_mariadb_clientkey_ffi = self._ffi_null_or_char(sadb_mariadb_clientkey)
-        sadb_mariadb_cacert_ffi = self._ffi_null_or_char(sadb_mariadb_cacert)
-        sadb_mariadb_capath_ffi = self._ffi_null_or_char(sadb_mariadb_capath)
-        sadb_mariadb_clientkeypassword_ffi = self._ffi_null_or_char(sadb_mariadb_clientkeypassword)
-
-        # Verify mtls cert files are present if specified!
-        if (sadb_mariadb_clientcert_ffi != self.ffi.NULL or sadb_mariadb_clientkey_ffi != self.ffi.NULL):
-            sadb_mariadb_cacert = config_dict.get(mariadb_tls_cacert_property_key,
-                                                  "/etc/pki/tls/certs/ammos-ca-bundle.crt")
-            sadb_mariadb_clientcert_ffi = self._ffi_null_or_char(sadb_mariadb_clientcert)
-            if (sadb_mariadb_clientcert_ffi == self.ffi.NULL):
-                raise SdlsClientException(SdlsClientException.MISSING_CONFIGURATION_PARAMETER, (
-                        "Configuration Parameter is necessary for SADB mTLS connection: %s" % mariadb_mtls_clientcert_property_key))
-            if (sadb_mariadb_clientkey_ffi == self.ffi.NULL):
-                raise SdlsClientException(SdlsClientException.MISSING_CONFIGURATION_PARAMETER, (
-                        "Configuration Parameter is necessary for SADB mTLS connection: %s" % mariadb_mtls_clientkey_property_key))
-            self._file_exists_or_exception(sadb_mariadb_clientcert, mariadb_mtls_clientcert_property_key)
-            self._file_exists_or_exception(sadb_mariadb_clientkey, mariadb_mtls_clientkey_property_key)
-            self._file_exists_or_exception(sadb_mariadb_cacert, mariadb_tls_cacert_property_key)
-
-        # Verify tls cert files are present
-        if (sadb_mariadb_clientcert_ffi != self.ffi.NULL):
-            sadb_mariadb_tls_verifyserver = distutils.util.strtobool(
-                config_dict.get("cryptolib.sadb.mariadb.tls.verifyserver", "true"))  # default to true if TLS
-            sadb_mariadb_require_secure_transport = distutils.util.strtobool(
-                config_dict.get("cryptolib.sadb.mariadb.require_secure_transport", "true"))  # default to true if TLS
-
-        kmc_python_c_sdls_interface.lib.sdls_config_mariadb(sadb_mariadb_fqdn_ffi
-                                                            , sadb_mariadb_database_name_ffi
-                                                            , self.ffi.cast("uint16_t", sadb_mariadb_port)
-                                                            , sadb_mariadb_require_secure_transport
-                                                            , sadb_mariadb_tls_verifyserver
-                                                            , sadb_mariadb_cacert_ffi
-                                                            , sadb_mariadb_capath_ffi
-                                                            , sadb_mariadb_clientcert_ffi
-                                                            , sadb_mariadb_clientkey_ffi
-                                                            , sadb_mariadb_clientkeypassword_ffi
-                                                            , sadb_mariadb_username_ffi
-                                                            , sadb_mariadb_password_ffi
-                                                            )
-
-        # KMC Crypto Service Property Keys
-        kmc_crypto_mtls_client_cert_property_key = "cryptolib.crypto.kmccryptoservice.mtls.clientcert"
-        kmc_crypto_mtls_client_key_property_key = "cryptolib.crypto.kmccryptoservice.mtls.clientkey"
-        kmc_crypto_mtls_cacert_property_key = "cryptolib.crypto.kmccryptoservice.cacert"
-
-        # Configure KMC Crypto Service
-        kmc_crypto_protocol = config_dict.get("cryptolib.crypto.kmccryptoservice.protocol", "https")
-        kmc_crypto_hostname = config_dict.get("cryptolib.crypto.kmccryptoservice.fqdn", "localhost")
-        kmc_crypto_port = int(config_dict.get("cryptolib.crypto.kmccryptoservice.port", 8443))
-        kmc_crypto_app_uri = config_dict.get("cryptolib.crypto.kmccryptoservice.app", "crypto-service")
-        kmc_crypto_mtls_client_cert = config_dict.get(kmc_crypto_mtls_client_cert_property_key, "")
-        kmc_crypto_mtls_client_cert_format = config_dict.get("cryptolib.crypto.kmccryptoservice.mtls.clientcertformat",
-                                                             "PEM")
-        kmc_crypto_mtls_client_key = config_dict.get(kmc_crypto_mtls_client_key_property_key, "")
-        kmc_crypto_mtls_client_key_pass = config_dict.get("cryptolib.crypto.kmccryptoservice.mtls.clientkeypassword",
-                                                          "")
-        kmc_crypto_mtls_ca_bundle = config_dict.get(kmc_crypto_mtls_cacert_property_key,
-                                                    "")  # Start empty, defaults to /etc/pki/tls/certs/ammos-ca-bundle.crt below if KMC Crypto Service used (mTLS is only supported connection type right now)
-        kmc_crypto_mtls_ca_path = config_dict.get("cryptolib.crypto.kmccryptoservice.cacertpath", "")
-        kmc_crypto_mtls_issuer_cert = config_dict.get("cryptolib.crypto.kmccryptoservice.issuercert", "")
-        kmc_crypto_mtls_ignore_ssl_hostname_validation = distutils.util.strtobool(
-            config_dict.get("cryptolib.crypto.kmccryptoservice.verifyserver",
-                            "true"))  # only mtls crypto service connections are supported, defualt to true
-
-        # Create char[] for config strings
-        kmc_crypto_protocol_ffi = self._ffi_null_or_char(kmc_crypto_protocol)
-        kmc_crypto_hostname_ffi = self._ffi_null_or_char(kmc_crypto_hostname)
-        kmc_crypto_app_uri_ffi = self._ffi_null_or_char(kmc_crypto_app_uri)
-        kmc_crypto_mtls_client_cert_ffi = self._ffi_null_or_char(kmc_crypto_mtls_client_cert)
-        kmc_crypto_mtls_client_cert_format_ffi = self._ffi_null_or_char(kmc_crypto_mtls_client_cert_format)
-        kmc_crypto_mtls_client_key_ffi = self._ffi_null_or_char(kmc_crypto_mtls_client_key)
-        kmc_crypto_mtls_client_key_pass_ffi = self._ffi_null_or_char(kmc_crypto_mtls_client_key_pass)
-        kmc_crypto_mtls_ca_bundle_ffi = self._ffi_null_or_char(kmc_crypto_mtls_ca_bundle)
-        kmc_crypto_mtls_ca_path_ffi = self._ffi_null_or_char(kmc_crypto_mtls_ca_path)
-        kmc_crypto_mtls_issuer_cert_ffi = self._ffi_null_or_char(kmc_crypto_mtls_issuer_cert)
-
-        # Add some cert file existence sanity checks
-        if (
-                cryptolib_crypto_type == 2):  # KMC Crypto Service -- verify mTLS certs! (mtls is only supported KMC Crypto Connection type as of now)
-            kmc_crypto_mtls_ca_bundle = config_dict.get(kmc_crypto_mtls_cacert_property_key,
-                                                        "/etc/pki/tls/certs/ammos-ca-bundle.crt")
-            kmc_crypto_mtls_ca_bundle_ffi = self._ffi_null_or_char(kmc_crypto_mtls_ca_bundle)
-            if (kmc_crypto_mtls_client_cert_ffi == self.ffi.NULL):
-                raise SdlsClientException(SdlsClientException.MISSING_CONFIGURATION_PARAMETER, (
-                        "Configuration Parameter is necessary for KMC Crypto Service mTLS connection: %s" % kmc_crypto_mtls_client_cert_property_key))
-            if (kmc_crypto_mtls_client_key_ffi == self.ffi.NULL):
-                raise SdlsClientException(SdlsClientException.MISSING_CONFIGURATION_PARAMETER, (
-                        "Configuration Parameter is necessary for KMC Crypto Service mTLS connection: %s" % kmc_crypto_mtls_client_key_property_key))
-            self._file_exists_or_exception(kmc_crypto_mtls_client_cert, kmc_crypto_mtls_client_cert_property_key)
-            self._file_exists_or_exception(kmc_crypto_mtls_client_key, kmc_crypto_mtls_client_key_property_key)
-            self._file_exists_or_exception(kmc_crypto_mtls_ca_bundle, kmc_crypto_mtls_cacert_property_key)
-
-        # Add strong references to CFFI string objects so they don't get freed.
-        self.global_dict["sadb_mariadb_username_ffi"] = sadb_mariadb_username_ffi
-        self.global_dict["sadb_mariadb_password_ffi"] = sadb_mariadb_password_ffi
-        self.global_dict["sadb_mariadb_fqdn_ffi"] = sadb_mariadb_fqdn_ffi
-        self.global_dict["sadb_mariadb_database_name_ffi "] = sadb_mariadb_database_name_ffi
-        self.global_dict["sadb_mariadb_clientcert_ffi"] = sadb_mariadb_clientcert_ffi
-        self.global_dict["sadb_mariadb_clientkey_ffi "] = sadb_mariadb_clientkey_ffi
-        self.global_dict["sadb_mariadb_cacert_ffi"] = sadb_mariadb_cacert_ffi
-        self.global_dict["sadb_mariadb_capath_ffi"] = sadb_mariadb_capath_ffi
-
-        self.global_dict["kmc_crypto_protocol_ffi"] = kmc_crypto_protocol_ffi
-        self.global_dict["kmc_crypto_hostname_ffi"] = kmc_crypto_hostname_ffi
-        self.global_dict["kmc_crypto_app_uri_ffi"] = kmc_crypto_app_uri_ffi
-        self.global_dict["kmc_crypto_mtls_client_cert_ffi"] = kmc_crypto_mtls_client_cert_ffi
-        self.global_dict["kmc_crypto_mtls_client_cert_format_ffi"] = kmc_crypto_mtls_client_cert_format_ffi
-        self.global_dict["kmc_crypto_mtls_client_key_ffi"] = kmc_crypto_mtls_client_key_ffi
-        self.global_dict["kmc_crypto_mtls_client_key_pass_ffi"] = kmc_crypto_mtls_client_key_pass_ffi
-        self.global_dict["kmc_crypto_mtls_ca_bundle_ffi"] = kmc_crypto_mtls_ca_bundle_ffi
-        self.global_dict["kmc_crypto_mtls_ca_path_ffi"] = kmc_crypto_mtls_ca_path_ffi
-        self.global_dict["kmc_crypto_mtls_issuer_cert_ffi"] = kmc_crypto_mtls_issuer_cert_ffi
-
-        kmc_python_c_sdls_interface.lib.sdls_config_kmc_crypto_service(kmc_crypto_protocol_ffi
-                                                                       , kmc_crypto_hostname_ffi
-                                                                       , self.ffi.cast("uint16_t", kmc_crypto_port)
-                                                                       , kmc_crypto_app_uri_ffi
-                                                                       , kmc_crypto_mtls_ca_bundle_ffi
-                                                                       , kmc_crypto_mtls_ca_path_ffi
-                                                                       , self.ffi.cast("uint8_t",
-                                                                                       kmc_crypto_mtls_ignore_ssl_hostname_validation)
-                                                                       , kmc_crypto_mtls_client_cert_ffi
-                                                                       , kmc_crypto_mtls_client_cert_format_ffi
-                                                                       , kmc_crypto_mtls_client_key_ffi
-                                                                       , kmc_crypto_mtls_client_key_pass_ffi
-                                                                       , kmc_crypto_mtls_issuer_cert_ffi
-                                                                       )
-
-        # Configure CAM
-        home = os.path.expanduser("~")
-        cam_enabled = distutils.util.strtobool(config_dict.get("cryptolib.cam.enabled", "false"))
-        cam_cookie_file_path = config_dict.get("cryptolib.cam.cookie_file", home + "/.cam_cookie_file")
-        cam_keytab_file_path = config_dict.get("cryptolib.cam.keytab_file", "")
-        cam_home = config_dict.get("cryptolib.cam.cam_home", "/ammos/css")
-        cam_login_method = cam_login_method.get(config_dict.get("cryptolib.cam.login_method", "none"), 0)
-        cam_access_manager_uri = config_dict.get("cryptolib.cam.access_manager_uri", "")
-        cam_username = config_dict.get("cryptolib.cam.username", "")
-
-        cam_cookie_file_path_ffi = self._ffi_null_or_char(cam_cookie_file_path)
-        cam_keytab_file_path_ffi = self._ffi_null_or_char(cam_keytab_file_path)
-        cam_home_ffi = self._ffi_null_or_char(cam_home)
-        cam_access_manager_uri_ffi = self._ffi_null_or_char(cam_access_manager_uri)
-        cam_username_ffi = self._ffi_null_or_char(cam_username)
-
-        self.global_dict["cam_cookie_file_path"] = cam_cookie_file_path_ffi
-        self.global_dict["cam_keytab_file_path"] = cam_keytab_file_path_ffi
-        self.global_dict["cam_home"] = cam_home_ffi
-        self.global_dict["cam_access_manager_uri"] = cam_access_manager_uri_ffi
-        self.global_dict["cam_username"] = cam_username_ffi
-
-        if (cam_enabled):
-            kmc_python_c_sdls_interface.lib.sdls_config_cam(self.ffi.cast("uint8_t", cam_enabled)
-                                                            , cam_cookie_file_path_ffi
-                                                            , cam_keytab_file_path_ffi
-                                                            , self.ffi.cast("uint8_t", cam_login_method)
-                                                            , cam_access_manager_uri_ffi
-                                                            , cam_username_ffi
-                                                            , cam_home_ffi)
-
-        # Configure Managed Parameters
-        managed_parameter_regex = r'cryptolib\.(?P<f_type>tc|tm|aos)\.(?P<scid>\d+)\.(?P<vcid>\d+)\.(?P<tfvn>\d+)\.has_ecf'
-        for key in config_dict:
-            if ("has_ecf" in key):
-                if (not re.match(managed_parameter_regex, key)):
-                    raise SdlsClientException(SdlsClientException.INVALID_MANAGED_PARAMETER_FORMAT,
-                                              "Invalid Managed Parameter Format. Format must be 'cryptolib.<frame type>.<scid>.<vcid>.<tfvn>.has_ecf=<bool>'")
-                key_parts = key.split(".")  # EG, cryptolib.tc.44.1.0.has_ecf
-                frame_type = key_parts[1]
-                managed_parameter_scid = key_parts[2]
-                managed_parameter_vcid = key_parts[3]
-                managed_parameter_tfvn = key_parts[4]
-                managed_parameter_has_ecf = distutils.util.strtobool(
-                    config_dict.get(key))  # ECF is required per managed parameter and has no default.
-                managed_parameter_max_frame_length = int(config_dict.get(
-                    "cryptolib." + frame_type + "." + managed_parameter_scid + "." + managed_parameter_vcid + "." + managed_parameter_tfvn + ".max_frame_length",
-                    1024))
-                managed_parameter_has_ecf_enum = managed_parameter_has_ecf
-                if frame_type != 'tc':
-                    if frame_type == 'tm':
-                        # see FecfPresent enum in CryptoLib's crypto_config_structs.h
-                        if managed_parameter_has_ecf:
-                            managed_parameter_has_ecf_enum = 3
-                        else:
-                            managed_parameter_has_ecf_enum = 2
-                    elif frame_type == 'aos':
-                        if managed_parameter_has_ecf:
-                            managed_parameter_has_ecf_enum = 5
-                        else:
-                            managed_parameter_has_ecf_enum = 4
-                # managed_parameter_vcid_bitmask = int(config_dict.get("cryptolib.tc."+managed_parameter_scid+"."+managed_parameter_vcid+"."+managed_parameter_tfvn+".vcid_bitmask", 0x3F),16)
-                managed_parameter_has_segmentation_header = distutils.util.strtobool(config_dict.get(
-                    "cryptolib." + frame_type + "." + managed_parameter_scid + "." + managed_parameter_vcid + "." + managed_parameter_tfvn + ".has_segmentation_header",
-                    "false"))
-                kmc_python_c_sdls_interface.lib.sdls_config_add_gvcid_managed_parameter(
-                    self.ffi.cast("uint8_t", managed_parameter_tfvn)
-                    , self.ffi.cast("uint16_t", int(managed_parameter_scid))
-                    , self.ffi.cast("uint8_t", int(managed_parameter_vcid))
-                    , self.ffi.cast("uint8_t", managed_parameter_has_ecf_enum)
-                    , self.ffi.cast("uint8_t", managed_parameter_has_segmentation_header)
-                    , self.ffi.cast("uint16_t", int(managed_parameter_max_frame_length)))
-
-        init_status = kmc_python_c_sdls_interface.lib.sdls_init()
+            # The strings CryptoLib already points into are unchanged, so the running native config stays referenced
+            for managed_parameters in change.added_managed_parameters:
+                status = kmc_python_c_sdls_interface.lib.sdls_config_add_gvcid_managed_parameter(
+                    *_managed_parameter_args(managed_parameters))
+                if (status != SUCCESS):
+                    raise SdlsClientException(SdlsClientException.SDLS_INITIALIZATION_ERROR,
+                                              "Unable to add managed parameters for %s" % (managed_parameters,),
+                                              status)
+        self.config = new_config
+        self.managed_parameters = new_config.managed_parameters
+        return change
+
+    def _initialize(self, config):
+        native = config.native_config()
+        # CryptoLib keeps the configured strings by pointer, so hold a strong reference while it is initialized
+        self.global_dict["native_config"] = native
+        lib = kmc_python_c_sdls_interface.lib
+        lib.sdls_config_cryptolib(*native.cryptolib_args)
+        lib.sdls_config_mariadb(*native.sadb_mariadb_args)
+        lib.sdls_config_kmc_crypto_service(*native.kmc_crypto_service_args)
+        if config.cam.cam_enabled:
+            lib.sdls_config_cam(*native.cam_args)
+        for managed_parameters, managed_parameter_args in zip(config.managed_parameters.values(),
+                                                              native.managed_parameter_args):
+            status = lib.sdls_config_add_gvcid_managed_parameter(*managed_parameter_args)
+            if (status != SUCCESS):
+                raise SdlsClientException(SdlsClientException.SDLS_INITIALIZATION_ERROR,
+                                          "Unable to add managed parameters for %s" % (managed_parameters,), status)
+
+        init_status = lib.sdls_init()
         if (init_status != SUCCESS):
             raise SdlsClientException(SdlsClientException.SDLS_INITIALIZATION_ERROR,
                                       "Unable to Initialize KMC SDLS CryptoLib with provided configuration.",
@@ -355,331 +168,1416 @@ class KmcSdlsClient:
 
         Parameters
         ----------
-        input_byte_array : bytearray
-             The TC Transfer Frame byte array that will be wrapped in a security layer.
-             Note that the TC transfer frame FECF should not be included in this byte array.
+        input_byte_array : bytes-like
+             The TC Transfer Frame that will be wrapped in a security layer. Any buffer-protocol object is accepted.
+             Note that the TC transfer frame FECF should not be included in this frame.
 
         Returns
         ----------
         bytearray
             The TC Transfer Frame bytearray that has been wrapped in a security layer.
         '''
+        status, output_bytearray = self.try_apply_security_tc(input_byte_array)
+        if (status != SUCCESS):
+            raise SdlsClientException(SdlsClientException.APPLY_SECURITY_EXCEPTION,
+                                      "KMC CryptoLib Apply Security Exception.", status)
+        return output_bytearray
+
+    def try_apply_security_tc(self, input_byte_array):
+        '''
+        apply_security_tc that reports a CryptoLib failure in its status instead of raising it. Invalid input
+        (no frame, or a frame that is not a bytes-like object) still raises SdlsClientException.
+
+        Returns
+        ----------
+        tuple
+            (status, secured frame bytearray), the frame being None unless status is SUCCESS.
+            sdls_error_name(status) gives the CryptoLib name of a failure.
+        '''
+        profiler = self.profiler
+        tc_char_in_frame = self._frame_buffer(input_byte_array, require_writable=False)
+        if profiler is not None:
+            profiler.phase("marshal")
+        output_bytearray = bytearray(self._tc_max_frame_length(tc_char_in_frame))
+        status, tc_len_out = self.try_apply_security_tc_into(input_byte_array, output_bytearray)
+        if profiler is not None:
+            profiler.phase("result")
+        if (status != SUCCESS):
+            return status, None
+        del output_bytearray[tc_len_out:]
+        return status, output_bytearray
+
+    def apply_security_tc_into(self, input_byte_array, output_buffer):
+        '''
+        Apply SDLS security to the supplied TC Transfer Frame, writing the secured frame into a caller-owned buffer.
+        The frame CryptoLib allocates internally is released before this method returns.
+
+        Parameters
+        ----------
+        input_byte_array : bytes-like
+             The TC Transfer Frame that will be wrapped in a security layer.
+             Note that the TC transfer frame FECF should not be included in this frame.
+        output_buffer : writable bytes-like
+             Buffer receiving the secured frame. It must hold at least the max_frame_length configured for the
+             frame's GVCID (1024 bytes when the GVCID has no managed parameters).
+
+        Returns
+        ----------
+        int
+            The number of bytes written to output_buffer.
+        '''
+        status, tc_len_out = self.try_apply_security_tc_into(input_byte_array, output_buffer)
+        if (status != SUCCESS):
+            raise SdlsClientException(SdlsClientException.APPLY_SECURITY_EXCEPTION,
+                                      "KMC CryptoLib Apply Security Exception.", status)
+        return tc_len_out
+
+    def try_apply_security_tc_into(self, input_byte_array, output_buffer):
+        '''
+        apply_security_tc_into that reports a CryptoLib failure in its status instead of raising it. Invalid input
+        or a too small output_buffer still raises SdlsClientException.
+
+        Returns
+        ----------
+        tuple
+            (status, number of bytes written to output_buffer), the length being None unless status is SUCCESS.
+        '''
+        profiler = self.profiler
         if input_byte_array is None:
             raise SdlsClientException(SdlsClientException.NO_FRAME_DATA, "Input Transfer Frame Byte Array is Empty")
-
-        if not isinstance(input_byte_array, bytearray):
+        if profiler is not None:
+            profiler.phase("marshal")
+        try:
+            tc_char_in_frame = self.ffi.from_buffer("uint8_t[]", input_byte_array)
+            tc_char_out_frame = self.ffi.from_buffer("uint8_t[]", output_buffer, require_writable=True)
+        except (TypeError, BufferError) as e:
             raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT,
-                                      "Input Transfer Frame is not a bytearray, actual type: %s" % type(
-                                          input_byte_array).__name__)
-
-        tc_char_in_frame = self.ffi.from_buffer(input_byte_array, require_writable=True)
-        output_bytearray = bytearray()
-        tc_char_out_frame = self.ffi.from_buffer(output_bytearray, require_writable=True)
-        # tc_char_star_in = self.ffi.new("uint8_t *")
-        tc_char_star_in = tc_char_in_frame
-        tc_char_star_star_out = self.ffi.new("uint8_t **")
-        tc_char_star_star_out[0] = tc_char_out_frame
-        tc_len_in = self.ffi.cast("uint16_t", len(tc_char_in_frame))
-        tc_len_out = self.ffi.new("uint16_t *")
-        apply_security_result = kmc_python_c_sdls_interface.lib.apply_security_tc(tc_char_star_in, tc_len_in,
-                                                                                  tc_char_star_star_out, tc_len_out)
+                                      "Transfer Frame buffer is not a usable bytes-like object: %s" % e)
+        out_capacity = len(tc_char_out_frame)
+        required_capacity = self._tc_max_frame_length(tc_char_in_frame)
+        if out_capacity < required_capacity:
+            raise SdlsClientException(SdlsClientException.OUTPUT_BUFFER_TOO_SMALL,
+                                      "Output buffer holds %d bytes, GVCID max_frame_length requires %d" % (
+                                          out_capacity, required_capacity))
+        tc_len_out = self._uint16_cell
+        if profiler is not None:
+            profiler.phase("native")
+        start = _clock_ns() if self.metrics.enabled else None
+        apply_security_result = kmc_python_c_sdls_interface.lib.apply_security_tc_into(
+            tc_char_in_frame, len(tc_char_in_frame), tc_char_out_frame, min(out_capacity, 0xFFFF),
+            tc_len_out)
+        if profiler is not None:
+            profiler.phase("result")
+        if start is not None:
+            self.metrics.record("apply", "tc", input_byte_array, len(tc_char_in_frame), _clock_ns() - start,
+                                apply_security_result)
         if (apply_security_result != SUCCESS):
-            raise SdlsClientException(SdlsClientException.APPLY_SECURITY_EXCEPTION,
-                                      "KMC CryptoLib Apply Security Exception.", apply_security_result)
-        return bytearray(self.ffi.buffer(tc_char_star_star_out[0], tc_len_out[0]))
+            return apply_security_result, None
+        return apply_security_result, tc_len_out[0]
 
-    def process_security_tc(self, input_byte_array):
+    def get_max_frame_length(self, frame_type, tfvn, scid, vcid, default=None):
+        '''
+        Returns the max_frame_length managed parameter configured for a GVCID, or default if it has none.
+
+        Parameters
+        ----------
+        frame_type : str
+            One of 'tc', 'tm' or 'aos'.
+        '''
+        managed_parameters = self.managed_parameters.get((frame_type, tfvn, scid, vcid))
+        if managed_parameters is None:
+            return default
+        return managed_parameters.max_frame_length
+
+    def _tc_max_frame_length(self, tc_frame):
+        gvcid = frame_gvcid('tc', tc_frame)
+        if gvcid is None:
+            return TC_MAX_FRAME_LENGTH
+        return self.get_max_frame_length('tc', *gvcid, default=TC_MAX_FRAME_LENGTH)
+
+    def process_security_tc(self, input_byte_array, lazy=False):
         '''
         Process SDLS security from the supplied TC Transfer Frame.
 
         Parameters
         ----------
-        input_byte_array : bytearray
-            The TC Transfer Frame byte array that currently wrapped in a security layer, that will be unwrapped
+        input_byte_array : bytes-like
+            The TC Transfer Frame that is currently wrapped in a security layer, that will be unwrapped.
+            Writable buffers (bytearray, memoryview, mmap, uint8 NumPy array) are unwrapped in place, without a copy;
+            read-only ones such as bytes are copied first.
+        lazy : bool
+            When True, return a TC_FrameView that decodes fields from the native TC_t on access instead of
+            copying the frame into a CompactTC.
+
+        Returns
+        ----------
+        CompactTC
+            The unwrapped frame. Attribute access matches the TC NamedTuple (tc_header.scid, tc_pdu, ...).
         '''
-        if input_byte_array is None:
-            raise SdlsClientException(SdlsClientException.NO_FRAME_DATA, "Input Transfer Frame Byte Array is Empty")
-        if not isinstance(input_byte_array, bytearray):
-            raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT,
-                                      "Input Transfer Frame is not a bytearray, actual type: %s" % type(
-                                          input_byte_array).__name__)
+        status, tc_sdls_object = self.try_process_security_tc(input_byte_array, lazy)
+        if (status != SUCCESS):
+            raise SdlsClientException(SdlsClientException.PROCESS_SECURITY_EXCEPTION,
+                                      "KMC CryptoLib Process Security Exception.", status)
+        return tc_sdls_object
 
-        tc_char = self.ffi.from_buffer(input_byte_array, require_writable=True)
-        tc_len = self.ffi.new("int *")
+    def try_process_security_tc(self, input_byte_array, lazy=False):
+        '''
+        process_security_tc that reports a CryptoLib failure in its status instead of raising it, so rejecting a
+        frame costs no more than accepting one. Invalid input still raises SdlsClientException.
+
+        Returns
+        ----------
+        tuple
+            (status, CompactTC or TC_FrameView), the frame being None unless status is SUCCESS.
+            sdls_error_name(status) gives the CryptoLib name of a failure.
+        '''
+        profiler = self.profiler
+        # CryptoLib unwraps the frame in place, in a private copy when the caller's buffer is read-only
+        tc_char = self._frame_buffer(input_byte_array, copy_readonly=True)
+        if profiler is not None:
+            profiler.phase("marshal")
+        tc_len = self._int_cell
         tc_len[0] = len(tc_char)
-        tc_result = self.ffi.new("TC_t *")  # Frame that will contain the processed SDLS fields
+        tc_result = self._tc_pool.acquire()  # Frame that will contain the processed SDLS fields
+        if profiler is not None:
+            profiler.phase("native")
+        start = _clock_ns() if self.metrics.enabled else None
         process_security_result = kmc_python_c_sdls_interface.lib.process_security_tc(tc_char, tc_len, tc_result)
+        if profiler is not None:
+            profiler.phase("result")
+        if start is not None:
+            self.metrics.record("process", "tc", input_byte_array, len(tc_char), _clock_ns() - start,
+                                process_security_result)
+
+        if (process_security_result != SUCCESS):
+            self._tc_pool.release(tc_result)
+            return process_security_result, None
+
+        if lazy:
+            return process_security_result, TC_FrameView(tc_result, self._tc_pool)
+
+        try:
+            tc_sdls_object = CompactTC.from_struct(tc_result)
+        finally:
+            self._tc_pool.release(tc_result)
+        return process_security_result, tc_sdls_object
+
+    def apply_security_aos(self, input_byte_array, in_place=False):
+        '''
+        Apply SDLS security to the supplied AOS Transfer Frame.
+
+        Parameters
+        ----------
+        input_byte_array : bytes-like
+             The AOS Transfer Frame that will be wrapped in a security layer.
+             Note that the AOS transfer frame FECF should not be included in this frame.
+        in_place : bool
+             When True, the frame is secured directly in input_byte_array, which must then be a writable buffer
+             (bytearray, memoryview, mmap or uint8 NumPy array), and that same object is returned without any
+             copy being made. When False, input_byte_array is left untouched and a secured copy is returned.
+
+        Returns
+        ----------
+        bytearray or bytes-like
+            The AOS Transfer Frame that has been wrapped in a security layer.
+        '''
+        status, output_frame = self.try_apply_security_aos(input_byte_array, in_place)
+        if status != SUCCESS:
+            raise SdlsClientException(SdlsClientException.APPLY_SECURITY_EXCEPTION,
+                                      "KMC CryptoLib Apply Security Exception.", status)
+        return output_frame
+
+    def try_apply_security_aos(self, input_byte_array, in_place=False):
+        '''
+        apply_security_aos that reports a CryptoLib failure in its status instead of raising it. Invalid input
+        still raises SdlsClientException.
+
+        Returns
+        ----------
+        tuple
+            (status, secured frame), the frame being None unless status is SUCCESS.
+        '''
+        profiler = self.profiler
+        in_frame = self._frame_buffer(input_byte_array, require_writable=in_place)
+        if profiler is not None:
+            profiler.phase("marshal")
+        if in_place:
+            output_frame = input_byte_array
+            aos_char_in_frame = in_frame
+        else:
+            # CryptoLib secures the frame in place, so the only copy made is the one that is returned
+            output_frame = bytearray(in_frame)
+            aos_char_in_frame = self.ffi.from_buffer("uint8_t[]", output_frame)
+        if profiler is not None:
+            profiler.phase("native")
+        start = _clock_ns() if self.metrics.enabled else None
+        apply_security_result = kmc_python_c_sdls_interface.lib.apply_security_aos(aos_char_in_frame,
+                                                                                  len(aos_char_in_frame))
+        if profiler is not None:
+            profiler.phase("result")
+        if start is not None:
+            self.metrics.record("apply", "aos", output_frame, len(aos_char_in_frame), _clock_ns() - start,
+                                apply_security_result)
+        if apply_security_result != SUCCESS:
+            return apply_security_result, None
+        return apply_security_result, output_frame
+
+    def process_security_aos(self, input_byte_array, lazy=False):
+        '''
+        Process SDLS security from the supplied AOS Transfer Frame.
+
+        Parameters
+        ----------
+        input_byte_array : bytes-like
+            The AOS Transfer Frame that is currently wrapped in a security layer, that will be unwrapped.
+            Any buffer-protocol object is accepted; the caller's buffer is never modified.
+        lazy : bool
+            When True, return an AOS_FrameView that decodes fields from the native AOS_t on access instead of
+            copying the frame into a CompactAOS.
+
+        Returns
+        ----------
+        CompactAOS
+            The unwrapped frame. Attribute access matches the AOS NamedTuple (aos_header.scid, aos_pdu, ...).
+        '''
+        status, aos_sdls_object = self.try_process_security_aos(input_byte_array, lazy)
+        if (status != SUCCESS):
+            raise SdlsClientException(SdlsClientException.PROCESS_SECURITY_EXCEPTION,
+                                      "KMC CryptoLib Process Security Exception.", status)
+        return aos_sdls_object
+
+    def try_process_security_aos(self, input_byte_array, lazy=False):
+        '''
+        process_security_aos that reports a CryptoLib failure in its status instead of raising it, so rejecting a
+        frame costs no more than accepting one. Invalid input still raises SdlsClientException.
+
+        Returns
+        ----------
+        tuple
+            (status, CompactAOS or AOS_FrameView), the frame being None unless status is SUCCESS.
+        '''
+        profiler = self.profiler
+        in_frame = self._frame_buffer(input_byte_array, require_writable=False)
+        if profiler is not None:
+            profiler.phase("marshal")
+        # CryptoLib may modify the frame while processing it, so work on a private copy
+        aos_char = self.ffi.from_buffer("uint8_t[]", bytearray(in_frame))
+        aos_result = self._aos_pool.acquire()  # Frame that will contain the processed SDLS fields
+        aos_result_len = self._uint16_cell
+        if profiler is not None:
+            profiler.phase("native")
+        start = _clock_ns() if self.metrics.enabled else None
+        process_security_result = kmc_python_c_sdls_interface.lib.process_security_aos(aos_char, len(aos_char),
+                                                                                       aos_result, aos_result_len)
+        if profiler is not None:
+            profiler.phase("result")
+        if start is not None:
+            self.metrics.record("process", "aos", input_byte_array, len(aos_char), _clock_ns() - start,
+                                process_security_result)
+
+        if (process_security_result != SUCCESS):
+            self._aos_pool.release(aos_result)
+            return process_security_result, None
+
+        if lazy:
+            return process_security_result, AOS_FrameView(aos_result, self._aos_pool)
+
+        try:
+            aos_sdls_object = CompactAOS.from_struct(aos_result)
+        finally:
+            self._aos_pool.release(aos_result)
+        return process_security_result, aos_sdls_object
+
+    def apply_security_tm(self, input_byte_array, in_place=False):
+        '''
+        Apply SDLS security to the supplied TM Transfer Frame.
+
+        Parameters
+        ----------
+        input_byte_array : bytes-like
+             The TM Transfer Frame that will be wrapped in a security layer.
+             Note that the TM transfer frame FECF should not be included in this frame.
+        in_place : bool
+             When True, the frame is secured directly in input_byte_array, which must then be a writable buffer
+             (bytearray, memoryview, mmap or uint8 NumPy array), and that same object is returned without any
+             copy being made. When False, input_byte_array is left untouched and a secured copy is returned.
+
+        Returns
+        ----------
+        bytearray or bytes-like
+            The TM Transfer Frame that has been wrapped in a security layer.
+        '''
+        status, output_frame = self.try_apply_security_tm(input_byte_array, in_place)
+        if status != SUCCESS:
+            raise SdlsClientException(SdlsClientException.APPLY_SECURITY_EXCEPTION,
+                                      "KMC CryptoLib Apply Security Exception.", status)
+        return output_frame
+
+    def try_apply_security_tm(self, input_byte_array, in_place=False):
+        '''
+        apply_security_tm that reports a CryptoLib failure in its status instead of raising it. Invalid input
+        still raises SdlsClientException.
+
+        Returns
+        ----------
+        tuple
+            (status, secured frame), the frame being None unless status is SUCCESS.
+        '''
+        profiler = self.profiler
+        in_frame = self._frame_buffer(input_byte_array, require_writable=in_place)
+        if profiler is not None:
+            profiler.phase("marshal")
+        if in_place:
+            output_frame = input_byte_array
+            tm_char_in_frame = in_frame
+        else:
+            # CryptoLib secures the frame in place, so the only copy made is the one that is returned
+            output_frame = bytearray(in_frame)
+            tm_char_in_frame = self.ffi.from_buffer("uint8_t[]", output_frame)
+        if profiler is not None:
+            profiler.phase("native")
+        start = _clock_ns() if self.metrics.enabled else None
+        apply_security_result = kmc_python_c_sdls_interface.lib.apply_security_tm(tm_char_in_frame,
+                                                                                  len(tm_char_in_frame))
+        if profiler is not None:
+            profiler.phase("result")
+        if start is not None:
+            self.metrics.record("apply", "tm", output_frame, len(tm_char_in_frame), _clock_ns() - start,
+                                apply_security_result)
+        if apply_security_result != SUCCESS:
+            return apply_security_result, None
+        return apply_security_result, output_frame
+
+    def process_security_tm(self, input_byte_array, lazy=False):
+        '''
+        Process SDLS security from the supplied AOS Transfer Frame.
+
+        Parameters
+        ----------
+        input_byte_array : bytes-like
+            The TM Transfer Frame that is currently wrapped in a security layer, that will be unwrapped.
+            Any buffer-protocol object is accepted; the caller's buffer is never modified.
+        lazy : bool
+            When True, return a TM_FrameView that decodes fields from the native TM_t on access instead of
+            copying the frame into a CompactTM.
+
+        Returns
+        ----------
+        CompactTM
+            The unwrapped frame. Attribute access matches the TM NamedTuple (tm_header.scid, tm_pdu, ...).
+        '''
+        status, tm_sdls_object = self.try_process_security_tm(input_byte_array, lazy)
+        if (status != SUCCESS):
+            raise SdlsClientException(SdlsClientException.PROCESS_SECURITY_EXCEPTION,
+                                      "KMC CryptoLib Process Security Exception.", status)
+        return tm_sdls_object
+
+    def try_process_security_tm(self, input_byte_array, lazy=False):
+        '''
+        process_security_tm that reports a CryptoLib failure in its status instead of raising it, so rejecting a
+        frame costs no more than accepting one. Invalid input still raises SdlsClientException.
+
+        Returns
+        ----------
+        tuple
+            (status, CompactTM or TM_FrameView), the frame being None unless status is SUCCESS.
+        '''
+        profiler = self.profiler
+        in_frame = self._frame_buffer(input_byte_array, require_writable=False)
+        if profiler is not None:
+            profiler.phase("marshal")
+        # CryptoLib may modify the frame while processing it, so work on a private copy
+        tm_char = self.ffi.from_buffer("uint8_t[]", bytearray(in_frame))
+        tm_result = self._tm_pool.acquire()  # Frame that will contain the processed SDLS fields
+        tm_result_len = self._uint16_cell
+        if profiler is not None:
+            profiler.phase("native")
+        start = _clock_ns() if self.metrics.enabled else None
+        process_security_result = kmc_python_c_sdls_interface.lib.process_security_tm(tm_char, len(tm_char),
+                                                                                      tm_result, tm_result_len)
+        if profiler is not None:
+            profiler.phase("result")
+        if start is not None:
+            self.metrics.record("process", "tm", input_byte_array, len(tm_char), _clock_ns() - start,
+                                process_security_result)
+
+        if (process_security_result != SUCCESS):
+            self._tm_pool.release(tm_result)
+            return process_security_result, None
+
+        if lazy:
+            return process_security_result, TM_FrameView(tm_result, self._tm_pool)
+
+        try:
+            tm_sdls_object = CompactTM.from_struct(tm_result)
+        finally:
+            self._tm_pool.release(tm_result)
+        return process_security_result, tm_sdls_object
+
+    def apply_security_tc_batch(self, frames):
+        '''
+        Apply SDLS security to a batch of TC Transfer Frames with a single native call.
+
+        Parameters
+        ----------
+        frames : sequence
+             The TC Transfer Frames (any bytes-like objects) that will be wrapped in a security layer.
+             Note that the TC transfer frame FECF should not be included in these frames.
+
+        Returns
+        ----------
+        SdlsBatchResult
+            The packed secured frames with the offset, length and CryptoLib status of each frame.
+        '''
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.phase("marshal")
+        in_frames, in_offsets, in_lengths, num_frames = self._pack_frames(frames)
+        out_capacity = num_frames * TC_MAX_FRAME_LENGTH
+        output_bytearray = bytearray(out_capacity)
+        out_frames = self.ffi.from_buffer(output_bytearray, require_writable=True)
+        out_offsets = self.ffi.new("uint32_t[]", num_frames)
+        out_lengths = self.ffi.new("uint16_t[]", num_frames)
+        status = self.ffi.new("int32_t[]", num_frames)
+        if profiler is not None:
+            profiler.phase("native")
+        start = _clock_ns() if self.metrics.enabled else None
+        batch_result = kmc_python_c_sdls_interface.lib.apply_security_tc_batch(
+            self.ffi.from_buffer(in_frames), in_offsets, in_lengths, num_frames, out_frames, out_capacity,
+            out_offsets, out_lengths, status)
+        if profiler is not None:
+            profiler.phase("result")
+        elapsed_ns = _clock_ns() - start if start is not None else None
+        self.ffi.release(out_frames)
+        if batch_result != SUCCESS:
+            raise SdlsClientException(SdlsClientException.APPLY_SECURITY_EXCEPTION,
+                                      "KMC CryptoLib Apply Security Exception.", batch_result)
+        offsets = self.ffi.unpack(out_offsets, num_frames)
+        lengths = self.ffi.unpack(out_lengths, num_frames)
+        frame_status = self.ffi.unpack(status, num_frames)
+        if elapsed_ns is not None:
+            self.metrics.record_batch("apply", "tc", in_frames, self.ffi.unpack(in_offsets, num_frames),
+                                      self.ffi.unpack(in_lengths, num_frames), elapsed_ns, frame_status)
+        if num_frames > 0:
+            del output_bytearray[offsets[-1] + lengths[-1]:]
+        return SdlsBatchResult(output_bytearray, offsets, lengths, frame_status)
+
+    def apply_security_tm_batch(self, frames):
+        '''
+        Apply SDLS security to a batch of TM Transfer Frames with a single native call.
+
+        Parameters
+        ----------
+        frames : sequence
+             The TM Transfer Frames (any bytes-like objects) that will be wrapped in a security layer.
+
+        Returns
+        ----------
+        SdlsBatchResult
+            The packed secured frames with the offset, length and CryptoLib status of each frame.
+        '''
+        return self._apply_security_in_place_batch(frames, "tm",
+                                                   kmc_python_c_sdls_interface.lib.apply_security_tm_batch)
+
+    def apply_security_aos_batch(self, frames):
+        '''
+        Apply SDLS security to a batch of AOS Transfer Frames with a single native call.
+
+        Parameters
+        ----------
+        frames : sequence
+             The AOS Transfer Frames (any bytes-like objects) that will be wrapped in a security layer.
+
+        Returns
+        ----------
+        SdlsBatchResult
+            The packed secured frames with the offset, length and CryptoLib status of each frame.
+        '''
+        return self._apply_security_in_place_batch(frames, "aos",
+                                                   kmc_python_c_sdls_interface.lib.apply_security_aos_batch)
+
+    def _apply_security_in_place_batch(self, frames, frame_type, batch_function):
+        # TM and AOS security is applied in place, so the packed input copy doubles as the packed output.
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.phase("marshal")
+        in_frames, in_offsets, in_lengths, num_frames = self._pack_frames(frames)
+        status = self.ffi.new("int32_t[]", num_frames)
+        frames_ffi = self.ffi.from_buffer(in_frames, require_writable=True)
+        if profiler is not None:
+            profiler.phase("native")
+        start = _clock_ns() if self.metrics.enabled else None
+        batch_result = batch_function(frames_ffi, in_offsets, in_lengths, num_frames, status)
+        if profiler is not None:
+            profiler.phase("result")
+        elapsed_ns = _clock_ns() - start if start is not None else None
+        self.ffi.release(frames_ffi)
+        if batch_result != SUCCESS:
+            raise SdlsClientException(SdlsClientException.APPLY_SECURITY_EXCEPTION,
+                                      "KMC CryptoLib Apply Security Exception.", batch_result)
+        offsets = self.ffi.unpack(in_offsets, num_frames)
+        lengths = self.ffi.unpack(in_lengths, num_frames)
+        frame_status = self.ffi.unpack(status, num_frames)
+        if elapsed_ns is not None:
+            self.metrics.record_batch("apply", frame_type, in_frames, offsets, lengths, elapsed_ns, frame_status)
+        return SdlsBatchResult(in_frames, offsets, lengths, frame_status)
+
+    def process_security_tc_batch(self, frames):
+        '''
+        Process SDLS security from a batch of TC Transfer Frames with a single native call.
+
+        Parameters
+        ----------
+        frames : sequence
+            The TC Transfer Frames (any bytes-like objects) that are currently wrapped in a security layer.
+
+        Returns
+        ----------
+        SdlsColumnarResult
+            Columnar header fields, packed PDUs and the CryptoLib status of each frame. Requires numpy.
+        '''
+        return self._process_security_batch(frames, "tc", kmc_python_c_sdls_interface.lib.process_security_tc_batch)
+
+    def process_security_tm_batch(self, frames):
+        '''
+        Process SDLS security from a batch of TM Transfer Frames with a single native call.
+
+        Parameters
+        ----------
+        frames : sequence
+            The TM Transfer Frames (any bytes-like objects) that are currently wrapped in a security layer.
+
+        Returns
+        ----------
+        SdlsColumnarResult
+            Columnar header fields, packed PDUs and the CryptoLib status of each frame. Requires numpy.
+        '''
+        return self._process_security_batch(frames, "tm", kmc_python_c_sdls_interface.lib.process_security_tm_batch)
+
+    def process_security_aos_batch(self, frames):
+        '''
+        Process SDLS security from a batch of AOS Transfer Frames with a single native call.
+
+        Parameters
+        ----------
+        frames : sequence
+            The AOS Transfer Frames (any bytes-like objects) that are currently wrapped in a security layer.
+
+        Returns
+        ----------
+        SdlsColumnarResult
+            Columnar header fields, packed PDUs and the CryptoLib status of each frame. Requires numpy.
+        '''
+        return self._process_security_batch(frames, "aos", kmc_python_c_sdls_interface.lib.process_security_aos_batch)
+
+    def _process_security_batch(self, frames, frame_type, batch_function):
+        import numpy
+
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.phase("marshal")
+        in_frames, in_offsets, in_lengths, num_frames = self._pack_frames(frames)
+        summaries = self.ffi.new("SdlsFrameSummary_t[]", num_frames)
+        # A PDU is never longer than its frame, so the packed input size bounds the packed PDU size.
+        pdus = bytearray(len(in_frames))
+        pdus_ffi = self.ffi.from_buffer(pdus, require_writable=True)
+        in_frames_ffi = self.ffi.from_buffer(in_frames, require_writable=True)
+        if profiler is not None:
+            profiler.phase("native")
+        start = _clock_ns() if self.metrics.enabled else None
+        batch_result = batch_function(in_frames_ffi, in_offsets, in_lengths, num_frames, summaries, pdus_ffi,
+                                      len(pdus))
+        if profiler is not None:
+            profiler.phase("result")
+        elapsed_ns = _clock_ns() - start if start is not None else None
+        self.ffi.release(pdus_ffi)
+        if batch_result != SUCCESS:
+            raise SdlsClientException(SdlsClientException.PROCESS_SECURITY_EXCEPTION,
+                                      "KMC CryptoLib Process Security Exception.", batch_result)
+        headers = numpy.frombuffer(self.ffi.buffer(summaries), dtype=frame_summary_dtype())
+        if elapsed_ns is not None:
+            self.metrics.record_batch("process", frame_type, in_frames, self.ffi.unpack(in_offsets, num_frames),
+                                      self.ffi.unpack(in_lengths, num_frames), elapsed_ns,
+                                      headers['status'].tolist())
+        if num_frames > 0:
+            del pdus[summaries[num_frames - 1].pdu_offset + summaries[num_frames - 1].pdu_len:]
+        return SdlsColumnarResult(headers, pdus, headers['pdu_offset'], headers['pdu_len'], headers['status'])
+
+    def _pack_frames(self, frames):
+        '''
+        Pack a sequence of frames into one bytearray plus the native offset and length arrays used by the batch calls.
+        '''
+        if frames is None:
+            raise SdlsClientException(SdlsClientException.NO_FRAME_DATA, "Input Transfer Frame Batch is Empty")
+        try:
+            frame_views = [memoryview(frame) for frame in frames]
+        except TypeError as e:
+            raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT,
+                                      "Input Transfer Frame Batch contains a non bytes-like frame: %s" % e)
+        lengths = [frame_view.nbytes for frame_view in frame_views]
+        if lengths and max(lengths) > 0xFFFF:
+            raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT,
+                                      "Input Transfer Frame Batch contains a frame longer than 65535 bytes")
+        offsets = [0]
+        offsets.extend(itertools.accumulate(lengths))
+        packed = bytearray().join(frame_views)
+        return (packed, self.ffi.new("uint32_t[]", offsets[:-1]), self.ffi.new("uint16_t[]", lengths),
+                len(frame_views))
+
+    def apply_stream(self, frames, frame_type='tc', chunk_size=64):
+        '''
+        Apply SDLS security to an iterable of Transfer Frames, yielding one result per frame in input order.
+
+        Frames are pulled lazily chunk_size at a time and secured with the native batch call, so memory stays bounded
+        by the chunk size no matter how long the input is.
+
+        Parameters
+        ----------
+        frames : iterable
+             Transfer Frames as bytes-like objects. Note that the FECF should not be included.
+        frame_type : str
+             One of 'tc', 'tm' or 'aos'.
+        chunk_size : int
+             Number of frames secured per native call.
+
+        Returns
+        ----------
+        generator
+            For each frame, a memoryview over the secured frame (it keeps its chunk's buffer alive while referenced),
+            or the SdlsClientException describing why that frame failed. Failures are yielded, never raised.
+        '''
+        batch_method = self._stream_method("apply_security_%s_batch", frame_type)
+        single_method = self._stream_method("apply_security_%s", frame_type)
+        for chunk in _chunked(frames, chunk_size):
+            try:
+                batch = batch_method(chunk)
+            except SdlsClientException:
+                # A malformed frame fails the whole batch call; retry the chunk frame by frame so only it fails
+                yield from _stream_single(single_method, chunk)
+                continue
+            for idx, status in enumerate(batch.status):
+                if status == SUCCESS:
+                    yield batch.get_frame(idx)
+                else:
+                    yield SdlsClientException(SdlsClientException.APPLY_SECURITY_EXCEPTION,
+                                              "KMC CryptoLib Apply Security Exception.", status)
+
+    def process_stream(self, frames, frame_type='tc', chunk_size=64, pdus_only=False):
+        '''
+        Process SDLS security from an iterable of Transfer Frames, yielding one result per frame in input order.
+
+        Frames are pulled lazily chunk_size at a time, so memory stays bounded by the chunk size no matter how long
+        the input is.
+
+        Parameters
+        ----------
+        frames : iterable
+            Transfer Frames, as bytes-like objects, that are currently wrapped in a security layer.
+        frame_type : str
+            One of 'tc', 'tm' or 'aos'.
+        chunk_size : int
+            Number of frames pulled from the iterable at a time.
+        pdus_only : bool
+            When True, each chunk is processed with the native batch call and only the PDUs are yielded. Requires
+            numpy. When False, the full TC/TM/AOS result of process_security_* is yielded for each frame.
+
+        Returns
+        ----------
+        generator
+            For each frame, its TC/TM/AOS result (or a memoryview over its PDU when pdus_only is set), or the
+            SdlsClientException describing why that frame failed. Failures are yielded, never raised.
+        '''
+        single_method = self._stream_method("process_security_%s", frame_type)
+        batch_method = self._stream_method("process_security_%s_batch", frame_type) if pdus_only else None
+        for chunk in _chunked(frames, chunk_size):
+            if batch_method is None:
+                yield from _stream_single(single_method, chunk)
+                continue
+            try:
+                batch = batch_method(chunk)
+            except SdlsClientException:
+                # A malformed frame fails the whole batch call; retry the chunk frame by frame so only it fails
+                for result in _stream_single(single_method, chunk):
+                    yield result if isinstance(result, SdlsClientException) else memoryview(getattr(
+                        result, frame_type + "_pdu"))
+                continue
+            for idx, status in enumerate(batch.status.tolist()):
+                if status == SUCCESS:
+                    yield batch.get_pdu(idx)
+                else:
+                    yield SdlsClientException(SdlsClientException.PROCESS_SECURITY_EXCEPTION,
+                                              "KMC CryptoLib Process Security Exception.", status)
+
+    def _stream_method(self, name_format, frame_type):
+        if frame_type not in ('tc', 'tm', 'aos'):
+            raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT, "Unknown frame type: %s" % frame_type)
+        return getattr(self, name_format % frame_type)
+
+    def enable_profiling(self, profiler=None):
+        '''
+        Starts timing the validate, marshal, native and result phases of every apply_security_* and
+        process_security_* call. Until it is called, those methods run without any profiling hook.
+
+        Parameters
+        ----------
+        profiler : KmcSdlsProfiler
+            The profiler to record into, a new one by default.
+
+        Returns
+        ----------
+        KmcSdlsProfiler
+            The profiler, for summary() and write_chrome_trace().
+        '''
+        if profiler is None:
+            from gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsProfiler import KmcSdlsProfiler
+            profiler = KmcSdlsProfiler()
+        self.disable_profiling()
+        self.profiler = profiler
+        # Instance attributes shadow the methods, so the wrappers cost nothing once profiling is disabled
+        for name in _PROFILED_METHODS:
+            setattr(self, name, profiler.wrap(name, getattr(KmcSdlsClient, name).__get__(self)))
+        return profiler
+
+    def disable_profiling(self):
+        '''
+        Stops profiling and returns the profiler that was in use, or None.
+        '''
+        for name in _PROFILED_METHODS:
+            self.__dict__.pop(name, None)
+        profiler, self.profiler = self.profiler, None
+        return profiler
+
+    def shutdown(self):
+        return kmc_python_c_sdls_interface.lib.sdls_shutdown()
+
+    def scratch_pool_allocations(self):
+        '''
+        Returns the number of native result structs allocated so far per frame type. Once the scratch pools are warm
+        this stays flat no matter how many frames are processed.
+        '''
+        return {"tc": self._tc_pool.allocations, "tm": self._tm_pool.allocations, "aos": self._aos_pool.allocations}
+
+    def _frame_buffer(self, input_frame, require_writable=True, copy_readonly=False):
+        '''
+        Returns a uint8_t[] cdata sharing memory with the supplied buffer-protocol object, without copying it.
+        With copy_readonly, a read-only buffer such as bytes is copied into a new bytearray instead of rejected.
+        '''
+        if input_frame is None:
+            raise SdlsClientException(SdlsClientException.NO_FRAME_DATA, "Input Transfer Frame Byte Array is Empty")
+        try:
+            return self.ffi.from_buffer("uint8_t[]", input_frame, require_writable=require_writable)
+        except (TypeError, BufferError) as e:
+            if copy_readonly and require_writable:
+                try:
+                    return self.ffi.from_buffer("uint8_t[]", bytearray(memoryview(input_frame)))
+                except TypeError:
+                    pass
+            raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT,
+                                      "Input Transfer Frame is not a %sbytes-like object, actual type: %s (%s)" % (
+                                          "writable " if require_writable else "", type(input_frame).__name__, e))
+
+    def c_array_to_bytearray(self, c_array, c_array_len):
+        '''
+        Helper function to convert a CFFI uint8 block into a Python bytearray.
+
+        Parameters
+        ----------
+        :param c_array: CFFI uint8 allocated memory block
+        :param c_array_len: length of actual data to be parsed from c_array block.
+        :return: bytearray: Python bytearray of data.
+        '''
+        return bytearray(self.ffi.buffer(c_array, c_array_len))
+
+
+# Single frame apply_security_* and process_security_* methods; each has a non-raising try_ variant
+_FRAME_METHODS = tuple("%s_security_%s" % (operation, frame_type)
+                       for operation in ("apply", "process") for frame_type in ("tc", "tm", "aos"))
+_PROFILED_METHODS = (_FRAME_METHODS + ("apply_security_tc_into",) +
+                     tuple("try_" + name for name in _FRAME_METHODS + ("apply_security_tc_into",)) +
+                     tuple(name + "_batch" for name in _FRAME_METHODS))
+
+
+def _chunked(iterable, chunk_size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, max(1, chunk_size)))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _stream_single(method, frames):
+    for frame in frames:
+        try:
+            yield method(frame)
+        except SdlsClientException as e:
+            yield e
+
+
+class GvcidManagedParameters(NamedTuple):
+    frame_type: str  # tc, tm or aos
+    tfvn: int  # Transfer Frame Version Number
+    scid: int  # Spacecraft ID
+    vcid: int  # Virtual Channel ID
+    has_ecf: int  # Frame Error Control Field present
+    has_segmentation_header: int
+    max_frame_length: int
+
+
+"""
+Compiled CryptoLib configuration.
+
+KmcSdlsConfig parses and validates the KMC SIS properties once. The results are kept as plain NamedTuples whose fields
+are the arguments of the matching sdls_config_* call, in order, so a KmcSdlsConfig pickles cheaply to KmcSdlsPool
+workers. The native arguments are built from them the first time a process initializes CryptoLib with the config.
+"""
+
+# Number of compiled configurations KmcSdlsConfig.from_properties keeps
+_COMPILED_CONFIG_CACHE_SIZE = 16
+_compiled_configs = dict()
+
+_TRUE_STRINGS = ('y', 'yes', 't', 'true', 'on', '1')
+_FALSE_STRINGS = ('n', 'no', 'f', 'false', 'off', '0')
+_MANAGED_PARAMETER_REGEX = re.compile(
+    r'cryptolib\.(?P<f_type>tc|tm|aos)\.(?P<scid>\d+)\.(?P<vcid>\d+)\.(?P<tfvn>\d+)\.has_ecf')
+# First has_fecf value of each frame type in CryptoLib's FecfPresent enum (crypto_config_structs.h), the second one
+# meaning the FECF is present
+_FECF_PRESENT_BASE = {'tc': 0, 'tm': 2, 'aos': 4}
+
+_SADB_TYPES = {"uninitialized": 0, "custom": 1, "inmemory": 2, "mariadb": 3}
+_CRYPTO_TYPES = {"uninitialized": 0, "libgcrypt": 1, "kmccryptoservice": 2, "wolfssl": 3}
+_CAM_LOGIN_METHODS = {"none": 0, "kerberos": 1, "keytab_file": 2}
+_DEFAULT_CA_BUNDLE = "/etc/pki/tls/certs/ammos-ca-bundle.crt"
+
+
+# Arguments of sdls_config_cryptolib
+class CryptoLibSettings(NamedTuple):
+    sadb_type: int
+    cryptography_type: int
+    crypto_create_fecf: int
+    process_sdls_pdus: int
+    has_pus_hdr: int
+    ignore_sa_state: int
+    ignore_anti_replay: int
+    unique_sa_per_mapid: int
+    crypto_check_fecf: int
+    vcid_bitmask: int
+    crypto_increment_nontransmitted_iv: int
+
+
+# Arguments of sdls_config_mariadb
+class SadbMariaDbSettings(NamedTuple):
+    mysql_hostname: str
+    mysql_database: str
+    mysql_port: int
+    mysql_require_secure_transport: int
+    mysql_tls_verify_server: int
+    mysql_tls_ca: str
+    mysql_tls_capath: str
+    mysql_mtls_cert: str
+    mysql_mtls_key: str
+    mysql_mtls_client_key_password: str
+    mysql_username: str
+    mysql_password: str
+
+
+# Arguments of sdls_config_kmc_crypto_service
+class KmcCryptoServiceSettings(NamedTuple):
+    protocol: str
+    kmc_crypto_hostname: str
+    kmc_crypto_port: int
+    kmc_crypto_app: str
+    kmc_tls_ca_bundle: str
+    kmc_tls_ca_path: str
+    kmc_ignore_ssl_hostname_validation: int
+    mtls_client_cert_path: str
+    mtls_client_cert_type: str
+    mtls_client_key_path: str
+    mtls_client_key_pass: str
+    mtls_issuer_cert: str
+
+
+# Arguments of sdls_config_cam
+class CamSettings(NamedTuple):
+    cam_enabled: int
+    cookie_file_path: str
+    keytab_file_path: str
+    login_method: int
+    access_manager_uri: str
+    username: str
+    cam_home: str
+
+
+class ConfigChange(NamedTuple):
+    added_managed_parameters: tuple  # GvcidManagedParameters of the GVCIDs only the new configuration has
+    restart_reasons: tuple  # Settings whose change needs CryptoLib initialized again, empty when there are none
+
+    @property
+    def requires_restart(self):
+        return bool(self.restart_reasons)
+
+
+class _NativeConfig(NamedTuple):
+    cryptolib_args: tuple
+    sadb_mariadb_args: tuple
+    kmc_crypto_service_args: tuple
+    cam_args: tuple
+    managed_parameter_args: list  # sdls_config_add_gvcid_managed_parameter arguments, one tuple per GVCID
+    strings: list  # char[] passed in the arguments above. CryptoLib keeps the pointers, so they must outlive it
+
+
+def _strtobool(value, property_key):
+    '''
+    Parses a boolean property value as distutils.util.strtobool did, returning 1 or 0.
+    '''
+    lowered = value.strip().lower()
+    if lowered in _TRUE_STRINGS:
+        return 1
+    if lowered in _FALSE_STRINGS:
+        return 0
+    raise SdlsClientException(SdlsClientException.INVALID_CONFIGURATION_VALUE,
+                              "Invalid boolean value '%s' for configuration parameter: %s" % (value, property_key))
+
+
+def _managed_parameter_args(mp):
+    # Arguments of sdls_config_add_gvcid_managed_parameter
+    return (mp.tfvn, mp.scid, mp.vcid, _FECF_PRESENT_BASE[mp.frame_type] + mp.has_ecf, mp.has_segmentation_header,
+            mp.max_frame_length)
+
+
+def _file_exists_or_exception(filepath, property_string, required_files=None):
+    # required_files, when given, collects every checked file so cached configurations can check them again
+    if required_files is not None:
+        required_files.append((filepath, property_string))
+    if (not os.path.exists(filepath)):
+        raise SdlsClientException(SdlsClientException.FILE_DOESNT_EXIST,
+                                  "Necessary file doesn't exist '%s' from configuration parameter: %s" % (filepath,
+                                                                                                          property_string))
+
+
+class KmcSdlsConfig:
+
+    def __init__(self, config):
+        '''
+        Parses and validates CryptoLib properties. Nothing native is touched until native_config() is called.
+
+        Parameters
+        ----------
+        config : list
+            A list of 'key=value' properties that configure the CryptoLib interface.
+            See the KMC SIS for what the supported properties are.
+        '''
+        self.properties = tuple(config)
+        config_dict = dict(config_str.split('=', 1) for config_str in self.properties)
+        required_files = []
+        self.cryptolib = self._compile_cryptolib(config_dict)
+        self.sadb_mariadb = self._compile_sadb_mariadb(config_dict, required_files)
+        self.kmc_crypto_service = self._compile_kmc_crypto_service(config_dict, self.cryptolib.cryptography_type,
+                                                                   required_files)
+        self.required_files = tuple(required_files)  # (path, property) of every certificate and key file
+        self.cam = self._compile_cam(config_dict)
+        self.managed_parameters = self._compile_managed_parameters(config_dict)
+        self._native = None
+
+    @classmethod
+    def from_properties(cls, config):
+        '''
+        Returns config itself if it is already a KmcSdlsConfig, otherwise the KmcSdlsConfig compiled from the property
+        list. The most recently compiled property lists are cached, so clients built over and over from the same
+        properties only parse and validate them once; the certificate and key files they name are checked again on
+        every call, since they can be removed or rotated between calls.
+        '''
+        if isinstance(config, KmcSdlsConfig):
+            return config
+        key = tuple(config)
+        compiled = _compiled_configs.get(key)
+        if compiled is None:
+            compiled = cls(key)
+            if len(_compiled_configs) >= _COMPILED_CONFIG_CACHE_SIZE:
+                del _compiled_configs[next(iter(_compiled_configs))]
+            _compiled_configs[key] = compiled
+        else:
+            for filepath, property_string in compiled.required_files:
+                _file_exists_or_exception(filepath, property_string)
+        return compiled
+
+    def native_config(self):
+        '''
+        Returns the native sdls_config_* arguments, built on first use in each process.
+        '''
+        if self._native is None:
+            self._native = self._build_native_config()
+        return self._native
+
+    def diff(self, new_config):
+        '''
+        Compares this configuration with new_config.
+
+        Returns
+        ----------
+        ConfigChange
+            The managed parameters new_config adds, and the names of the settings that differ otherwise
+            ('cryptolib', 'sadb_mariadb', 'kmc_crypto_service', 'cam' or 'managed_parameters').
+        '''
+        restart_reasons = [name for name in ("cryptolib", "sadb_mariadb", "kmc_crypto_service", "cam")
+                           if getattr(self, name) != getattr(new_config, name)]
+        if any(new_config.managed_parameters.get(gvcid) != managed_parameters
+               for gvcid, managed_parameters in self.managed_parameters.items()):
+            restart_reasons.append("managed_parameters")
+        added = tuple(managed_parameters for gvcid, managed_parameters in new_config.managed_parameters.items()
+                      if gvcid not in self.managed_parameters)
+        return ConfigChange(added, tuple(restart_reasons))
+
+    def __eq__(self, other):
+        return isinstance(other, KmcSdlsConfig) and self.properties == other.properties
+
+    def __hash__(self):
+        return hash(self.properties)
+
+    def __getstate__(self):
+        # Native structs only live in the process that built them
+        state = self.__dict__.copy()
+        state['_native'] = None
+        return state
+
+    def __iter__(self):
+        # Iterates the original properties, so a KmcSdlsConfig can stand in wherever a property list is expected
+        return iter(self.properties)
+
+    @staticmethod
+    def _compile_cryptolib(config_dict):
+        def flag(key, default):
+            return _strtobool(config_dict.get(key, default), key)
+
+        if "cryptolib.apply_tm.create_ecf" in config_dict:
+            create_ecf = flag("cryptolib.apply_tm.create_ecf", "false") + 2
+        elif "cryptolib.apply_aos.create_ecf" in config_dict:
+            create_ecf = flag("cryptolib.apply_aos.create_ecf", "false") + 4
+        else:
+            create_ecf = flag("cryptolib.apply_tc.create_ecf", "false")
+
+        if "cryptolib.process_tm.check_fecf" in config_dict:
+            check_fecf = flag("cryptolib.process_tm.check_fecf", "false") + 2
+        elif "cryptolib.process_aos.check_fecf" in config_dict:
+            check_fecf = flag("cryptolib.process_aos.check_fecf", "false") + 4
+        else:
+            check_fecf = flag("cryptolib.process_tc.check_fecf", "false")
+
+        if "cryptolib.tm.vcid_bitmask" in config_dict:
+            vcid_bitmask = int(config_dict.get("cryptolib.tm.vcid_bitmask", "0x3F"), 16)
+        elif "cryptolib.aos.vcid_bitmask" in config_dict:
+            vcid_bitmask = int(config_dict.get("cryptolib.aos.vcid_bitmask", "0x3F"), 16)
+        else:
+            vcid_bitmask = int(config_dict.get("cryptolib.tc.vcid_bitmask", "0x3F"), 16)
+
+        return CryptoLibSettings(
+            sadb_type=_SADB_TYPES.get(config_dict.get("cryptolib.sadb.type", "mariadb"), 3),
+            cryptography_type=_CRYPTO_TYPES.get(config_dict.get("cryptolib.crypto.type", "kmccryptoservice"), 2),
+            crypto_create_fecf=create_ecf,
+            process_sdls_pdus=flag("cryptolib.process_tc.process_pdus", "false"),
+            has_pus_hdr=flag("cryptolib.tc.has_pus_header", "false"),
+            ignore_sa_state=flag("cryptolib.process_tc.ignore_sa_state", "true"),
+            ignore_anti_replay=flag("cryptolib.process_tc.ignore_antireplay", "true"),
+            unique_sa_per_mapid=flag("cryptolib.tc.unique_sa_per_mapid", "false"),
+            crypto_check_fecf=check_fecf,
+            vcid_bitmask=vcid_bitmask,
+            crypto_increment_nontransmitted_iv=flag("cryptolib.tc.on_rollover_increment_nontransmitted_counter",
+                                                    "true"))
+
+    @staticmethod
+    def _compile_sadb_mariadb(config_dict, required_files):
+        # MariaDB Property Keys
+        tls_cacert_key = "cryptolib.sadb.mariadb.tls.cacert"
+        mtls_clientcert_key = "cryptolib.sadb.mariadb.mtls.clientcert"
+        mtls_clientkey_key = "cryptolib.sadb.mariadb.mtls.clientkey"
+        verifyserver_key = "cryptolib.sadb.mariadb.tls.verifyserver"
+        secure_transport_key = "cryptolib.sadb.mariadb.require_secure_transport"
+
+        # Start empty. If mtls_client_certs are set, the AMMOS CA bundle is required below, but CryptoLib is only
+        # given a CA file when one is configured
+        cacert = config_dict.get(tls_cacert_key, "")
+        clientcert = config_dict.get(mtls_clientcert_key, "")
+        clientkey = config_dict.get(mtls_clientkey_key, "")
+        # Must be false by default, otherwise tls connections are attempted, even if not configured for them.
+        verifyserver_default = "false"
+        secure_transport_default = "false"
+
+        # Verify mtls cert files are present if specified!
+        if clientcert or clientkey:
+            if not clientcert:
+                raise SdlsClientException(SdlsClientException.MISSING_CONFIGURATION_PARAMETER, (
+                        "Configuration Parameter is necessary for SADB mTLS connection: %s" % mtls_clientcert_key))
+            if not clientkey:
+                raise SdlsClientException(SdlsClientException.MISSING_CONFIGURATION_PARAMETER, (
+                        "Configuration Parameter is necessary for SADB mTLS connection: %s" % mtls_clientkey_key))
+            _file_exists_or_exception(clientcert, mtls_clientcert_key, required_files)
+            _file_exists_or_exception(clientkey, mtls_clientkey_key, required_files)
+            _file_exists_or_exception(cacert or _DEFAULT_CA_BUNDLE, tls_cacert_key, required_files)
+            # default to true if TLS
+            verifyserver_default = "true"
+            secure_transport_default = "true"
+
+        return SadbMariaDbSettings(
+            mysql_username=config_dict.get("cryptolib.sadb.mariadb.username", "sadb_user"),
+            mysql_password=config_dict.get("cryptolib.sadb.mariadb.password", ""),
+            mysql_hostname=config_dict.get("cryptolib.sadb.mariadb.fqdn", "localhost"),
+            mysql_database=config_dict.get("cryptolib.sadb.mariadb.database_name", "sadb"),
+            mysql_port=int(config_dict.get("cryptolib.sadb.mariadb.port", 3306)),
+            mysql_mtls_cert=clientcert,
+            mysql_mtls_key=clientkey,
+            mysql_tls_ca=cacert,
+            mysql_tls_capath=config_dict.get("cryptolib.sadb.mariadb.tls.capath", ""),
+            mysql_tls_verify_server=_strtobool(config_dict.get(verifyserver_key, verifyserver_default),
+                                               verifyserver_key),
+            mysql_mtls_client_key_password=config_dict.get("cryptolib.sadb.mariadb.mtls.clientkeypassword", ""),
+            mysql_require_secure_transport=_strtobool(config_dict.get(secure_transport_key, secure_transport_default),
+                                                      secure_transport_key))
+
+    @staticmethod
+    def _compile_kmc_crypto_service(config_dict, cryptography_type, required_files):
+        # KMC Crypto Service Property Keys
+        client_cert_key = "cryptolib.crypto.kmccryptoservice.mtls.clientcert"
+        client_key_key = "cryptolib.crypto.kmccryptoservice.mtls.clientkey"
+        cacert_key = "cryptolib.crypto.kmccryptoservice.cacert"
+        verifyserver_key = "cryptolib.crypto.kmccryptoservice.verifyserver"
+
+        client_cert = config_dict.get(client_cert_key, "")
+        client_key = config_dict.get(client_key_key, "")
+        # Start empty, defaults to the AMMOS CA bundle below if KMC Crypto Service used (mTLS is only supported
+        # connection type right now)
+        ca_bundle = config_dict.get(cacert_key, "")
+
+        # KMC Crypto Service -- verify mTLS certs! (mtls is only supported KMC Crypto Connection type as of now)
+        if cryptography_type == _CRYPTO_TYPES["kmccryptoservice"]:
+            ca_bundle = config_dict.get(cacert_key, _DEFAULT_CA_BUNDLE)
+            if not client_cert:
+                raise SdlsClientException(SdlsClientException.MISSING_CONFIGURATION_PARAMETER, (
+                        "Configuration Parameter is necessary for KMC Crypto Service mTLS connection: %s" %
+                        client_cert_key))
+            if not client_key:
+                raise SdlsClientException(SdlsClientException.MISSING_CONFIGURATION_PARAMETER, (
+                        "Configuration Parameter is necessary for KMC Crypto Service mTLS connection: %s" %
+                        client_key_key))
+            _file_exists_or_exception(client_cert, client_cert_key, required_files)
+            _file_exists_or_exception(client_key, client_key_key, required_files)
+            _file_exists_or_exception(ca_bundle, cacert_key, required_files)
+
+        return KmcCryptoServiceSettings(
+            kmc_crypto_hostname=config_dict.get("cryptolib.crypto.kmccryptoservice.fqdn", "localhost"),
+            protocol=config_dict.get("cryptolib.crypto.kmccryptoservice.protocol", "https"),
+            kmc_crypto_port=int(config_dict.get("cryptolib.crypto.kmccryptoservice.port", 8443)),
+            kmc_crypto_app=config_dict.get("cryptolib.crypto.kmccryptoservice.app", "crypto-service"),
+            mtls_client_cert_path=client_cert,
+            mtls_client_cert_type=config_dict.get("cryptolib.crypto.kmccryptoservice.mtls.clientcertformat", "PEM"),
+            mtls_client_key_path=client_key,
+            mtls_client_key_pass=config_dict.get("cryptolib.crypto.kmccryptoservice.mtls.clientkeypassword", ""),
+            kmc_tls_ca_bundle=ca_bundle,
+            kmc_tls_ca_path=config_dict.get("cryptolib.crypto.kmccryptoservice.cacertpath", ""),
+            mtls_issuer_cert=config_dict.get("cryptolib.crypto.kmccryptoservice.issuercert", ""),
+            # only mtls crypto service connections are supported, default to true
+            kmc_ignore_ssl_hostname_validation=_strtobool(config_dict.get(verifyserver_key, "true"), verifyserver_key))
+
+    @staticmethod
+    def _compile_cam(config_dict):
+        home = os.path.expanduser("~")
+        return CamSettings(
+            cam_enabled=_strtobool(config_dict.get("cryptolib.cam.enabled", "false"), "cryptolib.cam.enabled"),
+            cookie_file_path=config_dict.get("cryptolib.cam.cookie_file", home + "/.cam_cookie_file"),
+            keytab_file_path=config_dict.get("cryptolib.cam.keytab_file", ""),
+            access_manager_uri=config_dict.get("cryptolib.cam.access_manager_uri", ""),
+            username=config_dict.get("cryptolib.cam.username", ""),
+            cam_home=config_dict.get("cryptolib.cam.cam_home", "/ammos/css"),
+            login_method=_CAM_LOGIN_METHODS.get(config_dict.get("cryptolib.cam.login_method", "none"), 0))
+
+    @staticmethod
+    def _compile_managed_parameters(config_dict):
+        managed_parameters = dict()
+        for key in config_dict:
+            if ("has_ecf" in key):
+                key_match = _MANAGED_PARAMETER_REGEX.match(key)  # EG, cryptolib.tc.44.1.0.has_ecf
+                if (not key_match):
+                    raise SdlsClientException(SdlsClientException.INVALID_MANAGED_PARAMETER_FORMAT,
+                                              "Invalid Managed Parameter Format. Format must be 'cryptolib.<frame type>.<scid>.<vcid>.<tfvn>.has_ecf=<bool>'")
+                frame_type, scid, vcid, tfvn = key_match.group('f_type', 'scid', 'vcid', 'tfvn')
+                prefix = "cryptolib.%s.%s.%s.%s." % (frame_type, scid, vcid, tfvn)
+                # ECF is required per managed parameter and has no default.
+                has_ecf = _strtobool(config_dict.get(key), key)
+                max_frame_length = int(config_dict.get(prefix + "max_frame_length", 1024))
+                has_segmentation_header = _strtobool(config_dict.get(prefix + "has_segmentation_header", "false"),
+                                                     prefix + "has_segmentation_header")
+                gvcid_key = (frame_type, int(tfvn), int(scid), int(vcid))
+                managed_parameters[gvcid_key] = GvcidManagedParameters(*gvcid_key, has_ecf, has_segmentation_header,
+                                                                       max_frame_length)
+        return managed_parameters
+
+    def _build_native_config(self):
+        ffi = kmc_python_c_sdls_interface.ffi
+        strings = []
+
+        def native_args(settings):
+            args = []
+            for value in settings:
+                if isinstance(value, str):
+                    value = ffi.new("char[]", value.encode()) if value else ffi.NULL
+                    strings.append(value)
+                args.append(value)
+            return tuple(args)
+
+        managed_parameter_args = [_managed_parameter_args(mp) for mp in self.managed_parameters.values()]
+        return _NativeConfig(tuple(self.cryptolib), native_args(self.sadb_mariadb),
+                             native_args(self.kmc_crypto_service), native_args(self.cam), managed_parameter_args,
+                             strings)
+
+
+def load_properties(properties_file):
+    '''
+    Reads a KMC SDLS properties file into the list of properties expected by KmcSdlsClient.
+    Comment lines starting with '#' and blank lines are skipped.
 
-        if (process_security_result != SUCCESS):
-            raise SdlsClientException(SdlsClientException.PROCESS_SECURITY_EXCEPTION,
-                                      "KMC CryptoLib Process Security Exception.", process_security_result)
-
-        tc_sdls_object = TC(
-            TC_FramePrimaryHeader(tc_result.tc_header.tfvn
-                                  , tc_result.tc_header.bypass
-                                  , tc_result.tc_header.cc
-                                  , tc_result.tc_header.spare
-                                  , tc_result.tc_header.scid
-                                  , tc_result.tc_header.vcid
-                                  , tc_result.tc_header.fl
-                                  , tc_result.tc_header.fsn)
-            , FrameSecurityHeader(tc_result.tc_sec_header.sh
-                                  , tc_result.tc_sec_header.spi
-                                  , self.c_array_to_bytearray(tc_result.tc_sec_header.iv,
-                                                              tc_result.tc_sec_header.iv_field_len)
-                                  , tc_result.tc_sec_header.iv_field_len
-                                  , self.c_array_to_bytearray(tc_result.tc_sec_header.sn,
-                                                              tc_result.tc_sec_header.sn_field_len)
-                                  , tc_result.tc_sec_header.sn_field_len
-                                  , self.c_array_to_bytearray(tc_result.tc_sec_header.pad,
-                                                              tc_result.tc_sec_header.pad_field_len),
-                                  tc_result.tc_sec_header.pad_field_len
-                                  )
-            , self.c_array_to_bytearray(tc_result.tc_pdu, tc_result.tc_pdu_len)
-            , FrameSecurityTrailer(
-                self.c_array_to_bytearray(tc_result.tc_sec_trailer.mac, tc_result.tc_sec_trailer.mac_field_len)
-                , tc_result.tc_sec_trailer.mac_field_len
-                , bytearray()
-                , 0
-                , tc_result.tc_sec_trailer.fecf)
-        )
-        self.ffi.release(tc_result)
-        # Returning Python objects instead of the CFFI objects is somewhat inefficient. If performance becomes a problem, consider removing this nicety.
-        return tc_sdls_object
+    Parameters
+    ----------
+    properties_file : str or file
+        Path of the properties file, or an already open text file.
+    '''
+    if isinstance(properties_file, str):
+        with open(properties_file, 'r') as f:
+            return load_properties(f)
+    return [line.rstrip() for line in properties_file if not line.startswith('#') and line.rstrip() != '']
 
-    def apply_security_aos(self, input_byte_array):
-        '''
-        Apply SDLS security to the supplied AOS Transfer Frame.
 
-        Parameters
-        ----------
-        input_byte_array : bytearray
-             The AOS Transfer Frame byte array that will be wrapped in a security layer.
-             Note that the AOS transfer frame FECF should not be included in this byte array.
+def frame_gvcid(frame_type, frame):
+    '''
+    Decodes the GVCID from the primary header of a TC, TM or AOS Transfer Frame.
+
+    Parameters
+    ----------
+    frame_type : str
+        One of 'tc', 'tm' or 'aos'.
+    frame : bytes-like
+        The Transfer Frame, or at least its first three bytes.
+
+    Returns
+    ----------
+    tuple
+        (tfvn, scid, vcid), or None when the frame is too short to hold them.
+    '''
+    if frame_type == 'tc':
+        # TFVN (2 bits), bypass, control command, spare (2), SCID (10), VCID (6), ...
+        if len(frame) < 3:
+            return None
+        return frame[0] >> 6, ((frame[0] & 0x03) << 8) | frame[1], frame[2] >> 2
+    if len(frame) < 2:
+        return None
+    if frame_type == 'tm':
+        # TFVN (2 bits), SCID (10), VCID (3), OCF flag, ...
+        return frame[0] >> 6, ((frame[0] & 0x3F) << 4) | (frame[1] >> 4), (frame[1] >> 1) & 0x07
+    if frame_type == 'aos':
+        # TFVN (2 bits), SCID (8), VCID (6), ...
+        return frame[0] >> 6, ((frame[0] & 0x3F) << 2) | (frame[1] >> 6), frame[1] & 0x3F
+    raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT, "Unknown frame type: %s" % frame_type)
+
+
+_error_names = dict()  # CryptoLib status -> sdls_get_error_code_enum_string name
+# Status codes named when the first client is created. CryptoLib numbers its core errors down from -1 and its
+# MariaDB, KMC Crypto Service and CAM errors in blocks of positive hundreds; any other code is named on first use.
+_PREFETCHED_ERROR_CODES = tuple(range(-1, -128, -1)) + tuple(range(100, 700))
+
+
+def sdls_error_name(status):
+    '''
+    Returns the name CryptoLib gives a status code (sdls_get_error_code_enum_string), looked up once per code.
+    '''
+    name = _error_names.get(status)
+    if name is None:
+        name = _error_names[status] = kmc_python_c_sdls_interface.ffi.string(
+            kmc_python_c_sdls_interface.lib.sdls_get_error_code_enum_string(status)).decode('utf-8')
+    return name
 
-        Returns
-        ----------
-        bytearray
-            The AOS Transfer Frame bytearray that has been wrapped in a security layer.
-        '''
-        if input_byte_array is None:
-            raise SdlsClientException(SdlsClientException.NO_FRAME_DATA, "Input Transfer Frame Byte Array is Empty")
 
-        if not isinstance(input_byte_array, bytearray):
-            raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT,
-                                      "Input Transfer Frame is not a bytearray, actual type: %s" % type(
-                                          input_byte_array).__name__)
-
-        in_copy = bytearray(input_byte_array)
-        aos_char_in_frame = self.ffi.from_buffer(in_copy, require_writable=True)
-        aos_char_star_in = aos_char_in_frame
-        aos_len_in = self.ffi.cast("uint16_t", len(aos_char_in_frame))
-        apply_security_result = kmc_python_c_sdls_interface.lib.apply_security_aos(aos_char_star_in, aos_len_in)
-        if apply_security_result != SUCCESS:
-            raise SdlsClientException(SdlsClientException.APPLY_SECURITY_EXCEPTION,
-                                      "KMC CryptoLib Apply Security Exception.", apply_security_result)
-        buf = self.ffi.buffer(aos_char_star_in, int(aos_len_in))
-        return bytearray(buf)
+def _load_error_names():
+    # Fills the error name table once per process, so a rejected frame never calls into CryptoLib for its name
+    if len(_error_names) < len(_PREFETCHED_ERROR_CODES):
+        for status in _PREFETCHED_ERROR_CODES:
+            sdls_error_name(status)
 
-    def process_security_aos(self, input_byte_array):
-        '''
-        Process SDLS security from the supplied AOS Transfer Frame.
 
-        Parameters
-        ----------
-        input_byte_array : bytearray
-            The AOS Transfer Frame byte array that currently wrapped in a security layer, that will be unwrapped
-        '''
-        if input_byte_array is None:
-            raise SdlsClientException(SdlsClientException.NO_FRAME_DATA, "Input Transfer Frame Byte Array is Empty")
-        if not isinstance(input_byte_array, bytearray):
-            raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT,
-                                      "Input Transfer Frame is not a bytearray, actual type: %s" % type(
-                                          input_byte_array).__name__)
-
-        in_copy = bytearray(input_byte_array)
-        aos_char = self.ffi.from_buffer(in_copy, require_writable=True)
-        aos_len = self.ffi.new("int *")
-        aos_len[0] = len(aos_char)
-        aos_result = self.ffi.new("AOS_t *")  # Frame that will contain the processed SDLS fields
-        aos_result_len = self.ffi.new("uint16_t *")
-        process_security_result = kmc_python_c_sdls_interface.lib.process_security_aos(aos_char, aos_len[0], aos_result,
-                                                                                       aos_result_len)
+class _ScratchStructPool:
+    '''
+    Bounded free list of native frame structs (TC_t, TM_t or AOS_t) reused across process_security_* calls.
 
-        if (process_security_result != SUCCESS):
-            raise SdlsClientException(SdlsClientException.PROCESS_SECURITY_EXCEPTION,
-                                      "KMC CryptoLib Process Security Exception.", process_security_result)
-
-        aos_sdls_object = AOS(
-            AOS_FramePrimaryHeader(aos_result.aos_header.tfvn
-                                   , aos_result.aos_header.scid
-                                   , aos_result.aos_header.vcid
-                                   , aos_result.aos_header.vcfc
-                                   , aos_result.aos_header.rf
-                                   , aos_result.aos_header.sf
-                                   , aos_result.aos_header.spare
-                                   , aos_result.aos_header.vfcc
-                                   , aos_result.aos_header.fhecf)
-            , FrameSecurityHeader(
-                0,  # segment header
-                aos_result.aos_sec_header.spi,
-                self.c_array_to_bytearray(aos_result.aos_sec_header.iv, aos_result.aos_sec_header.iv_field_len),
-                aos_result.aos_sec_header.iv_field_len,
-                self.c_array_to_bytearray(aos_result.aos_sec_header.sn, aos_result.aos_sec_header.sn_field_len),
-                aos_result.aos_sec_header.sn_field_len,
-                aos_result.aos_sec_header.pad,
-                aos_result.aos_sec_header.pad_field_len
-            )
-            , self.c_array_to_bytearray(aos_result.aos_pdu, aos_result.aos_pdu_len)
-            # crypto_structs.h defines this as constant 1786?
-            , FrameSecurityTrailer(
-                self.c_array_to_bytearray(aos_result.aos_sec_trailer.mac, aos_result.aos_sec_trailer.mac_field_len),
-                aos_result.aos_sec_trailer.mac_field_len,
-                self.c_array_to_bytearray(aos_result.aos_sec_trailer.ocf, aos_result.aos_sec_trailer.ocf_field_len),
-                aos_result.aos_sec_trailer.ocf_field_len,
-                aos_result.aos_sec_trailer.fecf)  # CCSDS spec doesn't have an OCF here
-        )
-        self.ffi.release(aos_result)
-        # Returning Python objects instead of the CFFI objects is somewhat inefficient. If performance becomes a problem, consider removing this nicety.
-        return aos_sdls_object
+    A reused struct only has its header, security header and trailer bytes cleared; the large PDU array is left as is
+    since CryptoLib overwrites it and only pdu_len bytes of it are ever read. Structs handed to a lazy frame view are
+    owned by that view and only come back through the view's release().
+    '''
 
-    def apply_security_tm(self, input_byte_array):
-        '''
-        Apply SDLS security to the supplied AOS Transfer Frame.
+    def __init__(self, ffi, ctype, pdu_field, max_size):
+        self._ffi = ffi
+        self._ctype_ptr = ctype + " *"
+        self._max_size = max_size
+        self._free = []
+        self._head_len = ffi.offsetof(ctype, pdu_field)
+        self._tail_offset = ffi.offsetof(ctype, pdu_field + "_len")
+        self._tail_len = ffi.sizeof(ctype) - self._tail_offset
+        self._zeros = ffi.new("uint8_t[]", max(self._head_len, self._tail_len))
+        self.allocations = 0
+
+    def acquire(self):
+        if self._free:
+            struct = self._free.pop()
+            raw = self._ffi.cast("uint8_t *", struct)
+            self._ffi.memmove(raw, self._zeros, self._head_len)
+            self._ffi.memmove(raw + self._tail_offset, self._zeros, self._tail_len)
+            return struct
+        self.allocations += 1
+        return self._ffi.new(self._ctype_ptr)
+
+    def release(self, struct):
+        if len(self._free) < self._max_size:
+            self._free.append(struct)
 
-        Parameters
-        ----------
-        input_byte_array : bytearray
-             The AOS Transfer Frame byte array that will be wrapped in a security layer.
-             Note that the AOS transfer frame FECF should not be included in this byte array.
 
-        Returns
-        ----------
-        bytearray
-            The AOS Transfer Frame bytearray that has been wrapped in a security layer.
-        '''
-        if input_byte_array is None:
-            raise SdlsClientException(SdlsClientException.NO_FRAME_DATA, "Input Transfer Frame Byte Array is Empty")
+"""
+Wire (de)serialization of the frame NamedTuples.
 
-        if not isinstance(input_byte_array, bytearray):
-            raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT,
-                                      "Input Transfer Frame is not a bytearray, actual type: %s" % type(
-                                          input_byte_array).__name__)
-
-        in_copy = bytearray(input_byte_array)
-        tm_char_in_frame = self.ffi.from_buffer(in_copy, require_writable=True)
-        tm_char_star_in = tm_char_in_frame
-        tm_len_in = self.ffi.cast("uint16_t", len(tm_char_in_frame))
-        apply_security_result = kmc_python_c_sdls_interface.lib.apply_security_tm(tm_char_star_in, tm_len_in)
-        if apply_security_result != SUCCESS:
-            raise SdlsClientException(SdlsClientException.APPLY_SECURITY_EXCEPTION,
-                                      "KMC CryptoLib Apply Security Exception.", apply_security_result)
-        buf = self.ffi.buffer(tm_char_star_in, int(tm_len_in))
-        return bytearray(buf)
+Primary headers are packed into a single integer with the precomputed (shift, mask) tables below, listed in
+NamedTuple field order, and written out with int.to_bytes. The security header, PDU and security trailer are
+concatenated after it exactly as they appear on the wire.
+"""
 
-    def process_security_tm(self, input_byte_array):
-        '''
-        Process SDLS security from the supplied AOS Transfer Frame.
+# TC: TFVN (2 bits), bypass, control command, spare (2), SCID (10), VCID (6), frame length (10), FSN (8)
+TC_HEADER_BITS = ((38, 0x3), (37, 0x1), (36, 0x1), (34, 0x3), (24, 0x3FF), (18, 0x3F), (8, 0x3FF), (0, 0xFF))
+TC_HEADER_LENGTH = 5
+# AOS: TFVN (2 bits), SCID (8), VCID (6), VC frame count (24), replay, VC frame count usage, spare (2), VCFC cycle (4)
+AOS_HEADER_BITS = ((46, 0x3), (38, 0xFF), (32, 0x3F), (8, 0xFFFFFF), (7, 0x1), (6, 0x1), (4, 0x3), (0, 0xF))
+AOS_HEADER_LENGTH = 6
+# TM: TFVN (2 bits), SCID (10), VCID (3), OCF flag, MC frame count (8), VC frame count (8), secondary header flag,
+# synch flag, packet order flag, segment length ID (2), first header pointer (11)
+TM_HEADER_BITS = ((46, 0x3), (36, 0x3FF), (33, 0x7), (32, 0x1), (24, 0xFF), (16, 0xFF), (15, 0x1), (14, 0x1),
+                  (13, 0x1), (11, 0x3), (0, 0x7FF))
+TM_HEADER_LENGTH = 6
+FECF_LENGTH = 2
 
-        Parameters
-        ----------
-        input_byte_array : bytearray
-            The AOS Transfer Frame byte array that currently wrapped in a security layer, that will be unwrapped
-        '''
-        if input_byte_array is None:
-            raise SdlsClientException(SdlsClientException.NO_FRAME_DATA, "Input Transfer Frame Byte Array is Empty")
-        if not isinstance(input_byte_array, bytearray):
-            raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT,
-                                      "Input Transfer Frame is not a bytearray, actual type: %s" % type(
-                                          input_byte_array).__name__)
-
-        in_copy = bytearray(input_byte_array)
-        tm_char = self.ffi.from_buffer(in_copy, require_writable=True)
-        tm_len = self.ffi.new("int *")
-        tm_len[0] = len(tm_char)
-        tm_result = self.ffi.new("TM_t *")  # Frame that will contain the processed SDLS fields
-        tm_result_len = self.ffi.new("uint16_t *")
-        process_security_result = kmc_python_c_sdls_interface.lib.process_security_tm(tm_char, tm_len[0], tm_result,
-                                                                                      tm_result_len)
 
-        if (process_security_result != SUCCESS):
-            raise SdlsClientException(SdlsClientException.PROCESS_SECURITY_EXCEPTION,
-                                      "KMC CryptoLib Process Security Exception.", process_security_result)
-
-        tm_sdls_object = TM(
-            TM_FramePrimaryHeader(tm_result.tm_header.tfvn
-                                  , tm_result.tm_header.scid
-                                  , tm_result.tm_header.vcid
-                                  , tm_result.tm_header.ocff
-                                  , tm_result.tm_header.mcfc
-                                  , tm_result.tm_header.vcfc
-                                  , tm_result.tm_header.tfsh
-                                  , tm_result.tm_header.sf
-                                  , tm_result.tm_header.pof
-                                  , tm_result.tm_header.slid
-                                  , tm_result.tm_header.fhp)
-            , FrameSecurityHeader(
-                0,  # sh
-                tm_result.tm_sec_header.spi,
-                self.c_array_to_bytearray(tm_result.tm_sec_header.iv, tm_result.tm_sec_header.iv_field_len),
-                tm_result.tm_sec_header.iv_field_len,
-                self.c_array_to_bytearray(tm_result.tm_sec_header.sn, tm_result.tm_sec_header.sn_field_len),
-                tm_result.tm_sec_header.sn_field_len,
-                tm_result.tm_sec_header.pad,
-                tm_result.tm_sec_header.pad_field_len
-            )
-            , self.c_array_to_bytearray(tm_result.tm_pdu, tm_result.tm_pdu_len)
-            # crypto_structs.h defines this as constant 1786?
-            , FrameSecurityTrailer(
-                self.c_array_to_bytearray(tm_result.tm_sec_trailer.mac, tm_result.tm_sec_trailer.mac_field_len),
-                # Using whole field length here -- only 128 bit macs are currently supported.
-                tm_result.tm_sec_trailer.mac_field_len,
-                self.c_array_to_bytearray(tm_result.tm_sec_trailer.ocf, tm_result.tm_sec_trailer.ocf_field_len),
-                tm_result.tm_sec_trailer.ocf_field_len,
-                tm_result.tm_sec_trailer.fecf
-            )  # CCSDS spec doesn't have an OCF here
-        )
-        self.ffi.release(tm_result)
-        # Returning Python objects instead of the CFFI objects is somewhat inefficient. If performance becomes a problem, consider removing this nicety.
-        return tm_sdls_object
+def _pack_bits(values, bit_table, length):
+    word = 0
+    for value, (shift, mask) in zip(values, bit_table):
+        word |= (value & mask) << shift
+    return word.to_bytes(length, 'big')
 
-    def shutdown(self):
-        return kmc_python_c_sdls_interface.lib.sdls_shutdown()
 
-    def c_array_to_bytearray(self, c_array, c_array_len):
-        '''
-        Helper function to convert a CFFI uint8 block into a Python bytearray.
+def _unpack_bits(data, bit_table, length):
+    if len(data) < length:
+        raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT,
+                                  "Primary header needs %d bytes, got %d" % (length, len(data)))
+    word = int.from_bytes(data[:length], 'big')
+    return [(word >> shift) & mask for shift, mask in bit_table]
 
-        Parameters
-        ----------
-        :param c_array: CFFI uint8 allocated memory block
-        :param c_array_len: length of actual data to be parsed from c_array block.
-        :return: bytearray: Python bytearray of data.
-        '''
-        py_bytearray = bytearray()
-        for idx in range(0, c_array_len):
-            py_bytearray.append(c_array[idx])
-        return py_bytearray
-
-    def _ffi_null_or_char(self, py_obj):
-        if py_obj == self.ffi.NULL:
-            return self.ffi.NULL
-        if py_obj is None:
-            return self.ffi.NULL
-        if isinstance(py_obj, str):
-            if py_obj == "":
-                return self.ffi.NULL
-            else:
-                return self.ffi.new("char[]", py_obj.encode())
-        else:
-            raise SdlsClientException(SdlsClientException.INVALID_CONFIGURATION_VALUE,
-                                      "Unable to Parse Configuration Value." + str(py_obj))
 
-    def _file_exists_or_exception(self, filepath, property_string):
-        if (not os.path.exists(filepath)):
-            raise SdlsClientException(SdlsClientException.FILE_DOESNT_EXIST,
-                                      "Necessary file doesn't exist '%s' from configuration parameter: %s" % (filepath,
-                                                                                                              property_string))
+def _field_bytes(value, length):
+    # Pad fields are ints in TM/AOS results and bytes in TC results
+    if isinstance(value, int):
+        return value.to_bytes(length, 'big')
+    return bytes(value[:length])
 
 
 class TC_FramePrimaryHeader(NamedTuple):
@@ -692,6 +1590,16 @@ class TC_FramePrimaryHeader(NamedTuple):
     fl: int  # Frame Length
     fsn: int  # Frame Sequence Number
 
+    def to_bytes(self):
+        return _pack_bits(self, TC_HEADER_BITS, TC_HEADER_LENGTH)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(*_unpack_bits(data, TC_HEADER_BITS, TC_HEADER_LENGTH))
+
+    def hex(self):
+        return self.to_bytes().hex()
+
 
 class AOS_FramePrimaryHeader(NamedTuple):
     tfvn: int  # Transfer Frame Version Number
@@ -704,27 +1612,22 @@ class AOS_FramePrimaryHeader(NamedTuple):
     vcfcc: int  # VC Frame Count Cycle
     fhec: int  # Frame Header Error Control
 
+    def to_bytes(self, has_fhec=False):
+        '''
+        Returns the 6 byte primary header, followed by the 2 byte FHEC when has_fhec is set.
+        '''
+        header = _pack_bits(self, AOS_HEADER_BITS, AOS_HEADER_LENGTH)
+        if has_fhec:
+            header += self.fhec.to_bytes(2, 'big')
+        return header
+
+    @classmethod
+    def from_bytes(cls, data, has_fhec=False):
+        fhec = int.from_bytes(data[AOS_HEADER_LENGTH:AOS_HEADER_LENGTH + 2], 'big') if has_fhec else 0
+        return cls(*_unpack_bits(data, AOS_HEADER_BITS, AOS_HEADER_LENGTH), fhec)
+
     def hex(self):
-        from bitstring import Bits, BitArray
-        tfvn_b = Bits(uint=self.tfvn, length=2)
-        scid_b = Bits(uint=self.scid, length=8)
-        vcid_b = Bits(uint=self.vcid, length=6)
-        vcfc_b = Bits(uint=self.vcfc, length=24)
-        replay_b = Bits(uint=self.replay, length=1)
-        vcflag_b = Bits(uint=self.vcflag, length=1)
-        spare_b = Bits(uint=self.spare, length=2)
-        vcfcc_b = Bits(uint=self.vcfcc, length=4)
-        # fhec_b = Bits(uint=self.fhec, length=16)
-        header = BitArray(length=48)
-        header.overwrite(tfvn_b, 0)
-        header.overwrite(scid_b, 2)
-        header.overwrite(vcid_b, 10)
-        header.overwrite(vcfc_b, 16)
-        header.overwrite(replay_b, 40)
-        header.overwrite(vcflag_b, 41)
-        header.overwrite(spare_b, 42)
-        header.overwrite(vcfcc_b, 44)
-        return header.h
+        return self.to_bytes().hex()
 
 
 class TM_FramePrimaryHeader(NamedTuple):
@@ -740,32 +1643,15 @@ class TM_FramePrimaryHeader(NamedTuple):
     slid: int  # Segment Length ID
     fhp: int  # First Header Pointer
 
+    def to_bytes(self):
+        return _pack_bits(self, TM_HEADER_BITS, TM_HEADER_LENGTH)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(*_unpack_bits(data, TM_HEADER_BITS, TM_HEADER_LENGTH))
+
     def hex(self):
-        from bitstring import Bits, BitArray
-        tfvn_b = Bits(uint=self.tfvn, length=2)
-        scid_b = Bits(uint=self.scid, length=10)
-        vcid_b = Bits(uint=self.vcid, length=3)
-        ocf_f_b = Bits(uint=self.ocf, length=1)
-        mcfc_b = Bits(uint=self.mcfc, length=8)
-        vcfc_b = Bits(uint=self.vcfc, length=8)
-        shf_f_b = Bits(uint=self.shf, length=1)
-        sync_f_b = Bits(uint=self.sf, length=1)
-        po_f_b = Bits(uint=self.pof, length=1)
-        slid_b = Bits(uint=self.slid, length=2)
-        fhp_b = Bits(uint=self.fhp, length=11)
-        header = BitArray(length=48)
-        header.overwrite(tfvn_b, 0)
-        header.overwrite(scid_b, 2)  # 0 + 2
-        header.overwrite(vcid_b, 12)  # 2 + 10
-        header.overwrite(ocf_f_b, 15)  # 12 + 3
-        header.overwrite(mcfc_b, 16)  # 15 + 1
-        header.overwrite(vcfc_b, 24)  # 16 + 8
-        header.overwrite(shf_f_b, 32)  # 24 + 8
-        header.overwrite(sync_f_b, 33)  # 32 + 1
-        header.overwrite(po_f_b, 34)  # 33 + 1
-        header.overwrite(slid_b, 35)  # 34 + 1
-        header.overwrite(fhp_b, 37)  # 35 + 2
-        return header.h
+        return self.to_bytes().hex()
 
 
 class FrameSecurityHeader(NamedTuple):
@@ -778,30 +1664,32 @@ class FrameSecurityHeader(NamedTuple):
     pad: bytearray  # Pad
     pad_field_len: int
 
+    def to_bytes(self):
+        '''
+        Returns SPI, IV, SN and pad as they appear on the wire. The TC segment header is written by TC.to_bytes.
+        '''
+        return b''.join((self.spi.to_bytes(2, 'big'), _field_bytes(self.iv, self.iv_field_len),
+                         _field_bytes(self.sn, self.sn_field_len), _field_bytes(self.pad, self.pad_field_len)))
+
+    @classmethod
+    def from_bytes(cls, data, iv_field_len, sn_field_len, pad_field_len, sh=0, int_pad=False):
+        '''
+        Parses a security header whose field lengths are given by its security association.
+        int_pad returns the pad as an int, as TM and AOS results carry it.
+        '''
+        sn_start = 2 + iv_field_len
+        pad_start = sn_start + sn_field_len
+        pad = bytes(data[pad_start:pad_start + pad_field_len])
+        if int_pad:
+            pad = int.from_bytes(pad, 'big')
+        return cls(sh, int.from_bytes(data[:2], 'big'), bytes(data[2:sn_start]), iv_field_len,
+                   bytes(data[sn_start:pad_start]), sn_field_len, pad, pad_field_len)
+
+    def field_len(self):
+        return 2 + self.iv_field_len + self.sn_field_len + self.pad_field_len
+
     def hex(self):
-        from bitstring import Bits, BitArray
-        length = 16 + (self.iv_field_len * 8) + (self.sn_field_len * 8) + (self.pad_field_len * 8)
-        spi_b = Bits(uint=self.spi, length=16)
-        iv_b = Bits(self.iv)
-        sn_b = Bits(self.sn)
-        pad_b = Bits(self.pad)
-        idx = 0
-        header = BitArray(length=length)
-        header.overwrite(spi_b, idx)
-        idx += 16
-        if self.iv_field_len > 0:
-            header.overwrite(iv_b, idx)
-            idx += (self.iv_field_len * 8)
-
-        if self.sn_field_len > 0:
-            header.overwrite(sn_b, idx)
-            idx += (self.sn_field_len * 8)
-
-        if self.pad_field_len > 0:
-            header.overwrite(pad_b, idx)
-            idx += (self.pad_field_len * 8)
-
-        return header.h
+        return self.to_bytes().hex()
 
 
 class FrameSecurityTrailer(NamedTuple):
@@ -811,25 +1699,42 @@ class FrameSecurityTrailer(NamedTuple):
     ocf_field_len: int
     fecf: int  # Frame Error Control Field
 
-    def hex(self):
-        from bitstring import Bits, BitArray
-        mac_b = Bits(self.mac)
-        ocf_b = Bits(self.ocf)
-        fecf_b = Bits(uint=self.fecf, length=16)
+    def to_bytes(self, has_fecf=True):
+        fecf = self.fecf.to_bytes(FECF_LENGTH, 'big') if has_fecf else b''
+        return b''.join((_field_bytes(self.mac, self.mac_field_len), _field_bytes(self.ocf, self.ocf_field_len), fecf))
 
-        length = 16 + (self.mac_field_len * 8) + (self.ocf_field_len * 8)
-        idx = 0
-        header = BitArray(length=length)
-        if self.mac_field_len > 0:
-            header.overwrite(mac_b, idx)
-            idx += (self.mac_field_len * 8)
+    @classmethod
+    def from_bytes(cls, data, mac_field_len, ocf_field_len=0, has_fecf=True):
+        '''
+        Parses a security trailer whose MAC and OCF lengths are known from its security association and GVCID.
+        '''
+        ocf_start = mac_field_len
+        fecf_start = ocf_start + ocf_field_len
+        fecf = int.from_bytes(data[fecf_start:fecf_start + FECF_LENGTH], 'big') if has_fecf else 0
+        return cls(bytes(data[:ocf_start]), mac_field_len, bytes(data[ocf_start:fecf_start]), ocf_field_len, fecf)
 
-        if self.ocf_field_len > 0:
-            header.overwrite(ocf_b, idx)
-            idx += (self.ocf_field_len * 8)
+    def field_len(self, has_fecf=True):
+        return self.mac_field_len + self.ocf_field_len + (FECF_LENGTH if has_fecf else 0)
 
-        header.overwrite(fecf_b, idx)
-        return header.h
+    def hex(self):
+        return self.to_bytes().hex()
+
+
+def _frame_from_bytes(cls, header_type, header_length, data, iv_field_len, sn_field_len, pad_field_len,
+                      mac_field_len, ocf_field_len, has_fecf, sh_length=0):
+    data = memoryview(data)
+    header = header_type.from_bytes(data)
+    sh = data[header_length] if sh_length else 0
+    sec_header = FrameSecurityHeader.from_bytes(data[header_length + sh_length:], iv_field_len, sn_field_len,
+                                                pad_field_len, sh, int_pad=cls is not TC)
+    pdu_start = header_length + sh_length + sec_header.field_len()
+    trailer_length = mac_field_len + ocf_field_len + (FECF_LENGTH if has_fecf else 0)
+    pdu_end = len(data) - trailer_length
+    if pdu_end < pdu_start:
+        raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT,
+                                  "Frame of %d bytes is shorter than its headers and trailer" % len(data))
+    return cls(header, sec_header, bytes(data[pdu_start:pdu_end]),
+               FrameSecurityTrailer.from_bytes(data[pdu_end:], mac_field_len, ocf_field_len, has_fecf))
 
 
 class TC(NamedTuple):
@@ -838,6 +1743,33 @@ class TC(NamedTuple):
     tc_pdu: bytearray
     tc_security_trailer: FrameSecurityTrailer
 
+    def to_bytes(self, has_segment_header=False, has_fecf=True):
+        '''
+        Reconstructs the secured TC Transfer Frame.
+
+        Parameters
+        ----------
+        has_segment_header : bool
+            Whether the frame's GVCID is configured with a segment header (has_segmentation_header).
+        has_fecf : bool
+            Whether the frame's GVCID is configured with a FECF (has_ecf).
+        '''
+        segment_header = bytes((self.tc_security_header.sh,)) if has_segment_header else b''
+        return b''.join((self.tc_header.to_bytes(), segment_header, self.tc_security_header.to_bytes(), self.tc_pdu,
+                         self.tc_security_trailer.to_bytes(has_fecf)))
+
+    @classmethod
+    def from_bytes(cls, data, iv_field_len, sn_field_len, pad_field_len, mac_field_len, has_segment_header=False,
+                   has_fecf=True):
+        '''
+        Parses a secured TC Transfer Frame whose security field lengths are given by its security association.
+        '''
+        return _frame_from_bytes(cls, TC_FramePrimaryHeader, TC_HEADER_LENGTH, data, iv_field_len, sn_field_len,
+                                 pad_field_len, mac_field_len, 0, has_fecf, 1 if has_segment_header else 0)
+
+    def hex(self, has_segment_header=False, has_fecf=True):
+        return self.to_bytes(has_segment_header, has_fecf).hex()
+
 
 class AOS(NamedTuple):
     aos_header: AOS_FramePrimaryHeader
@@ -845,8 +1777,24 @@ class AOS(NamedTuple):
     aos_pdu: bytearray
     aos_security_trailer: FrameSecurityTrailer
 
-    def hex(self):
-        return self.aos_header.hex() + self.aos_security_header.hex() + self.aos_pdu.hex() + self.aos_security_trailer.hex()
+    def to_bytes(self, has_fecf=True):
+        '''
+        Reconstructs the secured AOS Transfer Frame.
+        '''
+        return b''.join((self.aos_header.to_bytes(), self.aos_security_header.to_bytes(), self.aos_pdu,
+                         self.aos_security_trailer.to_bytes(has_fecf)))
+
+    @classmethod
+    def from_bytes(cls, data, iv_field_len, sn_field_len, pad_field_len, mac_field_len, ocf_field_len=0,
+                   has_fecf=True):
+        '''
+        Parses a secured AOS Transfer Frame whose security field lengths are given by its security association.
+        '''
+        return _frame_from_bytes(cls, AOS_FramePrimaryHeader, AOS_HEADER_LENGTH, data, iv_field_len, sn_field_len,
+                                 pad_field_len, mac_field_len, ocf_field_len, has_fecf)
+
+    def hex(self, has_fecf=True):
+        return self.to_bytes(has_fecf).hex()
 
 
 class TM(NamedTuple):
@@ -855,8 +1803,559 @@ class TM(NamedTuple):
     tm_pdu: bytearray
     tm_security_trailer: FrameSecurityTrailer
 
-    def hex(self):
-        return self.tm_header.hex() + self.tm_security_header.hex() + self.tm_pdu.hex() + self.tm_security_trailer.hex()
+    def to_bytes(self, has_fecf=True):
+        '''
+        Reconstructs the secured TM Transfer Frame.
+        '''
+        return b''.join((self.tm_header.to_bytes(), self.tm_security_header.to_bytes(), self.tm_pdu,
+                         self.tm_security_trailer.to_bytes(has_fecf)))
+
+    @classmethod
+    def from_bytes(cls, data, iv_field_len, sn_field_len, pad_field_len, mac_field_len, ocf_field_len=0,
+                   has_fecf=True):
+        '''
+        Parses a secured TM Transfer Frame whose security field lengths are given by its security association.
+        '''
+        return _frame_from_bytes(cls, TM_FramePrimaryHeader, TM_HEADER_LENGTH, data, iv_field_len, sn_field_len,
+                                 pad_field_len, mac_field_len, ocf_field_len, has_fecf)
+
+    def hex(self, has_fecf=True):
+        return self.to_bytes(has_fecf).hex()
+
+
+"""
+Compact results returned by the process_security_* methods.
+
+Each result is a single object holding one bytes buffer: a fixed big-endian record of the header, security header and
+trailer integers followed by the variable-length fields (IV, SN, pad, PDU, MAC, OCF). Header and security
+header/trailer attributes return the same NamedTuples as before, decoded on access, so retaining a result costs two
+heap objects instead of about ten. materialize() returns the equivalent TC/TM/AOS NamedTuple.
+"""
+
+
+class _CompactFrame:
+    __slots__ = ('_data',)
+
+    def __init__(self, data):
+        self._data = data
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self._data == other._data
+
+    def __hash__(self):
+        return hash(self._data)
+
+    def __reduce__(self):
+        return type(self), (self._data,)
+
+    # Tuple-style access in NamedTuple field order: header, security header, PDU, security trailer
+    def __len__(self):
+        return 4
+
+    def __getitem__(self, idx):
+        return self.materialize()[idx]
+
+    def __iter__(self):
+        return iter(self.materialize())
+
+    def __repr__(self):
+        return repr(self.materialize()).replace(type(self).__name__[len("Compact"):], type(self).__name__, 1)
+
+    def nbytes(self):
+        '''
+        Returns the size of the buffer backing this result.
+        '''
+        return len(self._data)
+
+    def to_bytes(self, *args, **kwargs):
+        '''
+        Reconstructs the secured Transfer Frame. Takes the same arguments as the NamedTuple's to_bytes().
+        '''
+        return self.materialize().to_bytes(*args, **kwargs)
+
+    def hex(self, *args, **kwargs):
+        return self.materialize().hex(*args, **kwargs)
+
+
+class CompactTC(_CompactFrame):
+    __slots__ = ()
+    # tfvn, bypass, cc, spare, scid, vcid, fl, fsn | sh, spi, iv_len, sn_len, pad_len | mac_len, fecf | pdu_len
+    _layout = struct.Struct('>BBBBHBHB' 'BHBBB' 'BH' 'H')
+
+    @classmethod
+    def from_struct(cls, tc_result):
+        '''
+        Copy a processed native TC_t into a CompactTC.
+        '''
+        buffer = kmc_python_c_sdls_interface.ffi.buffer
+        header = tc_result.tc_header
+        sec_header = tc_result.tc_sec_header
+        sec_trailer = tc_result.tc_sec_trailer
+        return cls(b''.join((
+            cls._layout.pack(header.tfvn, header.bypass, header.cc, header.spare, header.scid, header.vcid, header.fl,
+                             header.fsn, sec_header.sh, sec_header.spi, sec_header.iv_field_len,
+                             sec_header.sn_field_len, sec_header.pad_field_len, sec_trailer.mac_field_len,
+                             sec_trailer.fecf, tc_result.tc_pdu_len),
+            buffer(sec_header.iv, sec_header.iv_field_len), buffer(sec_header.sn, sec_header.sn_field_len),
+            buffer(sec_header.pad, sec_header.pad_field_len), buffer(tc_result.tc_pdu, tc_result.tc_pdu_len),
+            buffer(sec_trailer.mac, sec_trailer.mac_field_len))))
+
+    @property
+    def tc_header(self):
+        return TC_FramePrimaryHeader(*self._layout.unpack_from(self._data)[:8])
+
+    @property
+    def tc_security_header(self):
+        fields = self._layout.unpack_from(self._data)
+        iv_start = self._layout.size
+        sn_start = iv_start + fields[10]
+        pad_start = sn_start + fields[11]
+        return FrameSecurityHeader(fields[8], fields[9], self._data[iv_start:sn_start], fields[10],
+                                   self._data[sn_start:pad_start], fields[11],
+                                   self._data[pad_start:pad_start + fields[12]], fields[12])
+
+    @property
+    def tc_pdu(self):
+        fields = self._layout.unpack_from(self._data)
+        pdu_start = self._layout.size + fields[10] + fields[11] + fields[12]
+        return self._data[pdu_start:pdu_start + fields[15]]
+
+    @property
+    def tc_security_trailer(self):
+        fields = self._layout.unpack_from(self._data)
+        mac_start = self._layout.size + fields[10] + fields[11] + fields[12] + fields[15]
+        return FrameSecurityTrailer(self._data[mac_start:mac_start + fields[13]], fields[13], b'', 0, fields[14])
+
+    def materialize(self):
+        '''
+        Returns the equivalent TC NamedTuple.
+        '''
+        return TC(self.tc_header, self.tc_security_header, self.tc_pdu, self.tc_security_trailer)
+
+
+class _CompactSecuredFrame(_CompactFrame):
+    '''
+    Shared layout tail of CompactTM and CompactAOS: the primary header record is followed by
+    spi, iv_len, sn_len, pad, pad_len | mac_len, ocf_len, fecf | pdu_len, then IV, SN, PDU, MAC and OCF bytes.
+    '''
+    __slots__ = ()
+    _header_count = 0
+
+    @classmethod
+    def _pack(cls, header_fields, sec_header, pdu, pdu_len, sec_trailer):
+        buffer = kmc_python_c_sdls_interface.ffi.buffer
+        return cls(b''.join((
+            cls._layout.pack(*header_fields, sec_header.spi, sec_header.iv_field_len, sec_header.sn_field_len,
+                             sec_header.pad, sec_header.pad_field_len, sec_trailer.mac_field_len,
+                             sec_trailer.ocf_field_len, sec_trailer.fecf, pdu_len),
+            buffer(sec_header.iv, sec_header.iv_field_len), buffer(sec_header.sn, sec_header.sn_field_len),
+            buffer(pdu, pdu_len), buffer(sec_trailer.mac, sec_trailer.mac_field_len),
+            buffer(sec_trailer.ocf, sec_trailer.ocf_field_len))))
+
+    def _security_header(self):
+        fields = self._layout.unpack_from(self._data)[self._header_count:]
+        iv_start = self._layout.size
+        sn_start = iv_start + fields[1]
+        return FrameSecurityHeader(0, fields[0], self._data[iv_start:sn_start], fields[1],
+                                   self._data[sn_start:sn_start + fields[2]], fields[2], fields[3], fields[4])
+
+    def _pdu(self):
+        fields = self._layout.unpack_from(self._data)[self._header_count:]
+        pdu_start = self._layout.size + fields[1] + fields[2]
+        return self._data[pdu_start:pdu_start + fields[8]]
+
+    def _security_trailer(self):
+        fields = self._layout.unpack_from(self._data)[self._header_count:]
+        mac_start = self._layout.size + fields[1] + fields[2] + fields[8]
+        ocf_start = mac_start + fields[5]
+        return FrameSecurityTrailer(self._data[mac_start:ocf_start], fields[5],
+                                    self._data[ocf_start:ocf_start + fields[6]], fields[6], fields[7])
+
+
+class CompactAOS(_CompactSecuredFrame):
+    __slots__ = ()
+    # tfvn, scid, vcid, vcfc, replay, vcflag, spare, vcfcc, fhec | security header, trailer and pdu_len
+    _layout = struct.Struct('>BHBIBBBBH' 'HBBHB' 'BBH' 'H')
+    _header_count = 9
+
+    @classmethod
+    def from_struct(cls, aos_result):
+        '''
+        Copy a processed native AOS_t into a CompactAOS.
+        '''
+        header = aos_result.aos_header
+        # vcfc is a signed 24 bit field in AOS_t, negative from 0x800000 on
+        return cls._pack((header.tfvn, header.scid, header.vcid, header.vcfc & 0xFFFFFF, header.rf, header.sf,
+                          header.spare, header.vfcc, header.fhecf), aos_result.aos_sec_header, aos_result.aos_pdu,
+                         aos_result.aos_pdu_len, aos_result.aos_sec_trailer)
+
+    @property
+    def aos_header(self):
+        return AOS_FramePrimaryHeader(*self._layout.unpack_from(self._data)[:9])
+
+    aos_security_header = property(_CompactSecuredFrame._security_header)
+    aos_pdu = property(_CompactSecuredFrame._pdu)
+    aos_security_trailer = property(_CompactSecuredFrame._security_trailer)
+
+    def materialize(self):
+        '''
+        Returns the equivalent AOS NamedTuple.
+        '''
+        return AOS(self.aos_header, self.aos_security_header, self.aos_pdu, self.aos_security_trailer)
+
+
+class CompactTM(_CompactSecuredFrame):
+    __slots__ = ()
+    # tfvn, scid, vcid, ocf, mcfc, vcfc, shf, sf, pof, slid, fhp | security header, trailer and pdu_len
+    _layout = struct.Struct('>BHBBBBBBBBH' 'HBBHB' 'BBH' 'H')
+    _header_count = 11
+
+    @classmethod
+    def from_struct(cls, tm_result):
+        '''
+        Copy a processed native TM_t into a CompactTM.
+        '''
+        header = tm_result.tm_header
+        return cls._pack((header.tfvn, header.scid, header.vcid, header.ocff, header.mcfc, header.vcfc, header.tfsh,
+                          header.sf, header.pof, header.slid, header.fhp), tm_result.tm_sec_header, tm_result.tm_pdu,
+                         tm_result.tm_pdu_len, tm_result.tm_sec_trailer)
+
+    @property
+    def tm_header(self):
+        return TM_FramePrimaryHeader(*self._layout.unpack_from(self._data)[:11])
+
+    tm_security_header = property(_CompactSecuredFrame._security_header)
+    tm_pdu = property(_CompactSecuredFrame._pdu)
+    tm_security_trailer = property(_CompactSecuredFrame._security_trailer)
+
+    def materialize(self):
+        '''
+        Returns the equivalent TM NamedTuple.
+        '''
+        return TM(self.tm_header, self.tm_security_header, self.tm_pdu, self.tm_security_trailer)
+
+
+class SdlsBatchResult(NamedTuple):
+    frames: bytearray  # Packed output frames
+    offsets: list  # Offset of each output frame in frames
+    lengths: list  # Length of each output frame
+    status: list  # CryptoLib status code of each frame, SUCCESS when the frame was secured
+
+    def get_frame(self, idx):
+        '''
+        Returns a memoryview over output frame idx, or None if CryptoLib rejected the frame.
+        '''
+        if self.status[idx] != SUCCESS:
+            return None
+        return memoryview(self.frames)[self.offsets[idx]:self.offsets[idx] + self.lengths[idx]]
+
+
+# Field layout of the packed SdlsFrameSummary_t record in kmc_sdls.h
+FRAME_SUMMARY_FIELDS = [('tfvn', 'u1'), ('scid', 'u2'), ('vcid', 'u1'), ('mcfc', 'u1'), ('vcfc', 'u4'), ('spi', 'u2'),
+                        ('iv_field_len', 'u1'), ('sn_field_len', 'u1'), ('pad_field_len', 'u1'),
+                        ('mac_field_len', 'u1'), ('ocf_field_len', 'u1'), ('fecf', 'u2'), ('pdu_offset', 'u4'),
+                        ('pdu_len', 'u2'), ('status', 'i4')]
+_frame_summary_dtype = None
+
+
+def frame_summary_dtype():
+    '''
+    Returns the numpy structured dtype matching SdlsFrameSummary_t.
+    '''
+    global _frame_summary_dtype
+    if _frame_summary_dtype is None:
+        import numpy
+        _frame_summary_dtype = numpy.dtype(FRAME_SUMMARY_FIELDS)
+    return _frame_summary_dtype
+
+
+class SdlsColumnarResult(NamedTuple):
+    headers: object  # numpy structured array with one FRAME_SUMMARY_FIELDS record per frame
+    pdus: bytearray  # Packed frame PDUs
+    pdu_offsets: object  # numpy view of headers['pdu_offset']
+    pdu_lengths: object  # numpy view of headers['pdu_len']
+    status: object  # numpy view of headers['status'], SUCCESS when the frame was processed
+
+    def get_pdu(self, idx):
+        '''
+        Returns a memoryview over the PDU of frame idx, or None if CryptoLib rejected the frame.
+        '''
+        if self.status[idx] != SUCCESS:
+            return None
+        offset = int(self.pdu_offsets[idx])
+        return memoryview(self.pdus)[offset:offset + int(self.pdu_lengths[idx])]
+
+
+"""
+Lazy frame views returned by the process_security_* methods when called with lazy=True.
+
+A view keeps the CFFI TC_t/TM_t/AOS_t result alive and reads each field from it only when the field is accessed.
+Byte fields are returned as memoryview slices over the native struct, so no frame data is copied until the caller
+asks for it (bytes(view.tm_pdu), materialize(), ...). Attribute names mirror the TC/TM/AOS NamedTuples.
+"""
+
+_view_offsets = dict()
+
+
+class _StructField:
+    '''
+    Descriptor that reads a scalar field of the viewed sub-struct on access. mask, when given, reads a signed bitfield
+    as unsigned.
+    '''
+
+    def __init__(self, c_name, mask=None):
+        self.c_name = c_name
+        self.mask = mask
+
+    def __get__(self, view, owner=None):
+        if view is None:
+            return self
+        value = getattr(getattr(view._struct, view._field), self.c_name)
+        return value if self.mask is None else value & self.mask
+
+
+class _StructBytes:
+    '''
+    Descriptor that returns a memoryview slice over a uint8 array field of the viewed sub-struct.
+    '''
+
+    def __init__(self, c_name, c_len_name):
+        self.c_name = c_name
+        self.c_len_name = c_len_name
+
+    def __get__(self, view, owner=None):
+        if view is None:
+            return self
+        if view._field is None:
+            path = (view._ctype, self.c_name)
+            sub_struct = view._struct
+        else:
+            path = (view._ctype, view._field, self.c_name)
+            sub_struct = getattr(view._struct, view._field)
+        offset = _view_offsets.get(path)
+        if offset is None:
+            offset = kmc_python_c_sdls_interface.ffi.offsetof(*path)
+            _view_offsets[path] = offset
+        return view._buffer[offset:offset + getattr(sub_struct, self.c_len_name)]
+
+
+class _StructView:
+    __slots__ = ('_struct', '_buffer', '_ctype', '_field')
+
+    def __init__(self, struct, buffer, ctype, field):
+        self._struct = struct  # Owning CFFI pointer, keeps the native memory alive
+        self._buffer = buffer  # memoryview over the whole native struct
+        self._ctype = ctype
+        self._field = field
+
+
+class TC_FramePrimaryHeaderView(_StructView):
+    __slots__ = ()
+    tfvn = _StructField('tfvn')
+    bypass = _StructField('bypass')
+    cc = _StructField('cc')
+    spare = _StructField('spare')
+    scid = _StructField('scid')
+    vcid = _StructField('vcid')
+    fl = _StructField('fl')
+    fsn = _StructField('fsn')
+
+    def materialize(self):
+        return TC_FramePrimaryHeader(self.tfvn, self.bypass, self.cc, self.spare, self.scid, self.vcid, self.fl,
+                                     self.fsn)
+
+
+class AOS_FramePrimaryHeaderView(_StructView):
+    __slots__ = ()
+    tfvn = _StructField('tfvn')
+    scid = _StructField('scid')
+    vcid = _StructField('vcid')
+    vcfc = _StructField('vcfc', 0xFFFFFF)
+    replay = _StructField('rf')
+    vcflag = _StructField('sf')
+    spare = _StructField('spare')
+    vcfcc = _StructField('vfcc')
+    fhec = _StructField('fhecf')
+
+    def materialize(self):
+        return AOS_FramePrimaryHeader(self.tfvn, self.scid, self.vcid, self.vcfc, self.replay, self.vcflag,
+                                      self.spare, self.vcfcc, self.fhec)
+
+
+class TM_FramePrimaryHeaderView(_StructView):
+    __slots__ = ()
+    tfvn = _StructField('tfvn')
+    scid = _StructField('scid')
+    vcid = _StructField('vcid')
+    ocf = _StructField('ocff')
+    mcfc = _StructField('mcfc')
+    vcfc = _StructField('vcfc')
+    shf = _StructField('tfsh')
+    sf = _StructField('sf')
+    pof = _StructField('pof')
+    slid = _StructField('slid')
+    fhp = _StructField('fhp')
+
+    def materialize(self):
+        return TM_FramePrimaryHeader(self.tfvn, self.scid, self.vcid, self.ocf, self.mcfc, self.vcfc, self.shf,
+                                     self.sf, self.pof, self.slid, self.fhp)
+
+
+class FrameSecurityHeaderView(_StructView):
+    '''
+    TM/AOS security header view. TM and AOS carry the pad as a uint16 and have no segment header.
+    '''
+    __slots__ = ()
+    sh = 0
+    spi = _StructField('spi')
+    iv = _StructBytes('iv', 'iv_field_len')
+    iv_field_len = _StructField('iv_field_len')
+    sn = _StructBytes('sn', 'sn_field_len')
+    sn_field_len = _StructField('sn_field_len')
+    pad = _StructField('pad')
+    pad_field_len = _StructField('pad_field_len')
+
+    def materialize(self):
+        return FrameSecurityHeader(self.sh, self.spi, bytearray(self.iv), self.iv_field_len, bytearray(self.sn),
+                                   self.sn_field_len, self.pad, self.pad_field_len)
+
+
+class TC_FrameSecurityHeaderView(FrameSecurityHeaderView):
+    __slots__ = ()
+    sh = _StructField('sh')
+    pad = _StructBytes('pad', 'pad_field_len')
+
+    def materialize(self):
+        return FrameSecurityHeader(self.sh, self.spi, bytearray(self.iv), self.iv_field_len, bytearray(self.sn),
+                                   self.sn_field_len, bytearray(self.pad), self.pad_field_len)
+
+
+class FrameSecurityTrailerView(_StructView):
+    __slots__ = ()
+    mac = _StructBytes('mac', 'mac_field_len')
+    mac_field_len = _StructField('mac_field_len')
+    ocf = _StructBytes('ocf', 'ocf_field_len')
+    ocf_field_len = _StructField('ocf_field_len')
+    fecf = _StructField('fecf')
+
+    def materialize(self):
+        return FrameSecurityTrailer(bytearray(self.mac), self.mac_field_len, bytearray(self.ocf),
+                                    self.ocf_field_len, self.fecf)
+
+
+class TC_FrameSecurityTrailerView(FrameSecurityTrailerView):
+    '''
+    TC security trailer view. The TC trailer has no OCF.
+    '''
+    __slots__ = ()
+    ocf = memoryview(b'')
+    ocf_field_len = 0
+
+
+class _FrameView:
+    __slots__ = ('_struct', '_buffer', '_pool')
+
+    def __init__(self, struct, pool=None):
+        self._struct = struct
+        self._buffer = memoryview(kmc_python_c_sdls_interface.ffi.buffer(struct))
+        self._pool = pool
+
+    def release(self):
+        '''
+        Release the native struct behind this view and hand it back to the client's scratch pool for reuse.
+        The view and any byte fields previously returned by it must not be used afterwards, since the struct
+        will be overwritten by later process_security_* calls. Views that are simply dropped are never reused.
+        '''
+        if self._struct is None:
+            return
+        self._buffer.release()
+        if self._pool is not None:
+            self._pool.release(self._struct)
+        self._struct = None
+
+
+class TC_FrameView(_FrameView):
+    __slots__ = ()
+
+    @property
+    def tc_header(self):
+        return TC_FramePrimaryHeaderView(self._struct, self._buffer, "TC_t", "tc_header")
+
+    @property
+    def tc_security_header(self):
+        return TC_FrameSecurityHeaderView(self._struct, self._buffer, "TC_t", "tc_sec_header")
+
+    tc_pdu = _StructBytes('tc_pdu', 'tc_pdu_len')
+
+    @property
+    def tc_security_trailer(self):
+        return TC_FrameSecurityTrailerView(self._struct, self._buffer, "TC_t", "tc_sec_trailer")
+
+    _ctype = "TC_t"
+    _field = None
+
+    def materialize(self):
+        '''
+        Copy this view into the equivalent TC NamedTuple.
+        '''
+        return TC(self.tc_header.materialize(), self.tc_security_header.materialize(), bytearray(self.tc_pdu),
+                  self.tc_security_trailer.materialize())
+
+
+class AOS_FrameView(_FrameView):
+    __slots__ = ()
+
+    @property
+    def aos_header(self):
+        return AOS_FramePrimaryHeaderView(self._struct, self._buffer, "AOS_t", "aos_header")
+
+    @property
+    def aos_security_header(self):
+        return FrameSecurityHeaderView(self._struct, self._buffer, "AOS_t", "aos_sec_header")
+
+    aos_pdu = _StructBytes('aos_pdu', 'aos_pdu_len')
+
+    @property
+    def aos_security_trailer(self):
+        return FrameSecurityTrailerView(self._struct, self._buffer, "AOS_t", "aos_sec_trailer")
+
+    _ctype = "AOS_t"
+    _field = None
+
+    def materialize(self):
+        '''
+        Copy this view into the equivalent AOS NamedTuple.
+        '''
+        return AOS(self.aos_header.materialize(), self.aos_security_header.materialize(), bytearray(self.aos_pdu),
+                   self.aos_security_trailer.materialize())
+
+
+class TM_FrameView(_FrameView):
+    __slots__ = ()
+
+    @property
+    def tm_header(self):
+        return TM_FramePrimaryHeaderView(self._struct, self._buffer, "TM_t", "tm_header")
+
+    @property
+    def tm_security_header(self):
+        return FrameSecurityHeaderView(self._struct, self._buffer, "TM_t", "tm_sec_header")
+
+    tm_pdu = _StructBytes('tm_pdu', 'tm_pdu_len')
+
+    @property
+    def tm_security_trailer(self):
+        return FrameSecurityTrailerView(self._struct, self._buffer, "TM_t", "tm_sec_trailer")
+
+    _ctype = "TM_t"
+    _field = None
+
+    def materialize(self):
+        '''
+        Copy this view into the equivalent TM NamedTuple.
+        '''
+        return TM(self.tm_header.materialize(), self.tm_security_header.materialize(), bytearray(self.tm_pdu),
+                  self.tm_security_trailer.materialize())
 
 
 class SdlsClientException(Exception):
@@ -875,6 +2374,10 @@ class SdlsClientException(Exception):
     MISSING_CONFIGURATION_PARAMETER = "MISSING_CONFIGURATION_PARAMETER"
     FILE_DOESNT_EXIST = "FILE_DOESNT_EXIST"
     INVALID_MANAGED_PARAMETER_FORMAT = "INVALID_MANAGED_PARAMETER_FORMAT"
+    OUTPUT_BUFFER_TOO_SMALL = "OUTPUT_BUFFER_TOO_SMALL"
+    WORKER_FAILURE = "WORKER_FAILURE"
+    CLIENT_CLOSED = "CLIENT_CLOSED"
+    UNKNOWN_GVCID = "UNKNOWN_GVCID"
 
     def __init__(self, error_code, message, cryptolib_error_code=0):
         '''
@@ -891,8 +2394,7 @@ class SdlsClientException(Exception):
         enum_string = ""
 
         if (cryptolib_error_code != 0):
-            enum_string = kmc_python_c_sdls_interface.ffi.string(
-                kmc_python_c_sdls_interface.lib.sdls_get_error_code_enum_string(cryptolib_error_code)).decode('utf-8')
+            enum_string = sdls_error_name(cryptolib_error_code)
             error_message = " Error code: %d, %s" % (cryptolib_error_code, enum_string)
         Exception.__init__(self, message + error_message)
         self.error_code = error_code
@@ -904,3 +2406,14 @@ class SdlsClientException(Exception):
         Returns the error code of the exception.
         '''
         return self.error_code
+
+    def __reduce__(self):
+        # Rebuild from the formatted message so unpickling (e.g. in a KmcSdlsPool parent) never calls into CryptoLib
+        return _restore_sdls_client_exception, (self.error_code, str(self))
+
+
+def _restore_sdls_client_exception(error_code, message):
+    exception = SdlsClientException.__new__(SdlsClientException)
+    Exception.__init__(exception, message)
+    exception.error_code = error_code
+    return exception
@@ -0,0 +1,323 @@
+#
+# Copyright 2021, by the California Institute of Technology.
+# ALL RIGHTS RESERVED. United States Government Sponsorship acknowledged.
+# Any commercial use must be negotiated with the Office of Technology
+# Transfer at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S.
+# export laws and regulations. User has the responsibility to obtain
+# export licenses, or other export authority as may be required before
+# exporting such information to foreign countries or providing access to
+# foreign persons.
+#
+
+
+import collections
+import queue
+import threading
+import time
+from typing import NamedTuple
+
+from gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsClient import SdlsClientException, frame_gvcid
+from gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsPool import KmcSdlsPool
+
+"""
+This module splits a mixed stream of Transfer Frames by virtual channel before SDLS processing.
+
+Every GVCID configured with managed parameters gets its own bounded queue (a lane). Lanes are drained round robin, at
+most lane_batch frames each per round, so a burst or a backlog on one virtual channel cannot hold back the others,
+and a failing virtual channel only shows up in its own lane's error counter. Frames whose GVCID has no managed
+parameters, or that are too short to carry one, go to the reject lane without reaching CryptoLib.
+
+With a KmcSdlsClient every round runs on the thread calling pump(). With a KmcSdlsPool a round is sent to the pool in
+one map() call, so lanes pinned to different workers are processed in parallel.
+"""
+
+REJECT_LANE = "reject"
+
+# Seconds the background drain thread waits for frames before checking whether it was stopped
+_IDLE_POLL_INTERVAL = 0.1
+
+
+class VcLaneStats(NamedTuple):
+    gvcid: object  # (tfvn, scid, vcid), or REJECT_LANE
+    enqueued: int  # Frames accepted into the lane
+    processed: int  # Frames CryptoLib returned a result for
+    errors: int  # Frames CryptoLib raised an SdlsClientException for
+    dropped: int  # Frames refused because the lane was full (for the reject lane: rejected frames evicted)
+    depth: int  # Frames queued now
+    max_depth: int  # Largest queue depth seen
+    bytes_in: int  # Bytes of all accepted frames
+    frames_per_second: float  # processed + errors over the time since the lane's first frame
+
+
+class _VcLane:
+
+    def __init__(self, gvcid, max_queue):
+        self.gvcid = gvcid
+        self.frames = queue.Queue(max_queue)
+        self.enqueued = 0
+        self.processed = 0
+        self.errors = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.bytes_in = 0
+        self.first_frame_time = None
+
+    def stats(self):
+        done = self.processed + self.errors
+        elapsed = time.perf_counter() - self.first_frame_time if self.first_frame_time is not None else 0.0
+        return VcLaneStats(self.gvcid, self.enqueued, self.processed, self.errors, self.dropped,
+                           self.frames.qsize(), self.max_depth, self.bytes_in, done / elapsed if elapsed > 0 else 0.0)
+
+
+class KmcSdlsDemux:
+
+    def __init__(self, backend, frame_type, operation="process", max_queue=256, lane_batch=16, max_rejected=256,
+                 sink=None):
+        '''
+        Creates one lane per managed-parameter GVCID of frame_type, plus the reject lane. A GVCID the backend gets
+        managed parameters for later, through reconfigure(), gets its lane when its first frame is submitted.
+
+        Parameters
+        ----------
+        backend : KmcSdlsClient or KmcSdlsPool
+            Where lanes are drained. The demux is the only caller of the backend while it is running.
+        frame_type : str
+            One of 'tc', 'tm' or 'aos'.
+        operation : str
+            'process' to process security on secured frames, or 'apply' to apply it.
+        max_queue : int
+            Maximum number of frames queued per lane.
+        lane_batch : int
+            Maximum number of frames taken from one lane per round.
+        max_rejected : int
+            Number of most recent rejected frames kept in the reject lane for inspection.
+        sink : callable
+            Called with (gvcid, frame, result) for every drained frame, where result is the client method's return
+            value or the SdlsClientException it raised. Required by start(). An exception raised by the sink, or
+            any other exception than SdlsClientException raised by the backend, stops the background thread and is
+            raised again by every later submit() and stop() call.
+        '''
+        if frame_type not in ('tc', 'tm', 'aos'):
+            raise SdlsClientException(SdlsClientException.BAD_DATA_FORMAT, "Unknown frame type: %s" % frame_type)
+        if operation not in ("process", "apply"):
+            raise SdlsClientException(SdlsClientException.INVALID_CONFIGURATION_VALUE,
+                                      "Demux operation must be 'process' or 'apply', got: %r" % (operation,))
+        self.backend = backend
+        self.frame_type = frame_type
+        self.operation = operation + "_security_" + frame_type
+        self.lane_batch = max(1, lane_batch)
+        self.sink = sink
+        self.lanes = dict()
+        self.rejected = collections.deque(maxlen=max_rejected)  # (frame, SdlsClientException), most recent last
+        self._max_queue = max_queue
+        self._reject_lane = _VcLane(REJECT_LANE, 0)
+        self._lane_order = []
+        self._lanes_built_from = None  # The backend's managed GVCID collection the lanes were last built from
+        self._next_lane = 0
+        self._lock = threading.Lock()  # Guards the lane counters
+        self._frames_ready = threading.Condition(self._lock)
+        self._queued = 0
+        self._thread = None
+        self._stopping = False
+        self._failure = None  # Exception that stopped the background thread
+        self._add_new_lanes()
+
+    def submit(self, frame, block=False, timeout=None):
+        '''
+        Routes a frame to the lane of its GVCID.
+
+        Parameters
+        ----------
+        frame : bytes-like
+            The Transfer Frame. It is queued as is, so it must not be modified until it has been drained.
+        block : bool
+            When the lane is full, wait up to timeout seconds for room instead of dropping the frame.
+
+        Returns
+        ----------
+        bool
+            True when the frame was queued, False when it was rejected or dropped.
+        '''
+        if self._failure is not None:
+            raise self._failure
+        gvcid = frame_gvcid(self.frame_type, frame)
+        lane = self.lanes.get(gvcid)
+        if lane is None and gvcid is not None and self._add_new_lanes():
+            lane = self.lanes.get(gvcid)
+        if lane is None:
+            if gvcid is None:
+                reason = SdlsClientException(SdlsClientException.BAD_DATA_FORMAT,
+                                             "Frame of %d bytes is too short for a primary header" % len(frame))
+            else:
+                reason = SdlsClientException(SdlsClientException.UNKNOWN_GVCID,
+                                             "No %s managed parameters for GVCID (tfvn=%d, scid=%d, vcid=%d)" % (
+                                                 self.frame_type, gvcid[0], gvcid[1], gvcid[2]))
+            with self._lock:
+                self._count_enqueued(self._reject_lane, frame)
+                if len(self.rejected) == self.rejected.maxlen:
+                    self._reject_lane.dropped += 1
+                self.rejected.append((frame, reason))
+                self._reject_lane.max_depth = max(self._reject_lane.max_depth, len(self.rejected))
+            return False
+        try:
+            lane.frames.put(frame, block, timeout)
+        except queue.Full:
+            with self._lock:
+                lane.dropped += 1
+            return False
+        with self._lock:
+            self._count_enqueued(lane, frame)
+            lane.max_depth = max(lane.max_depth, lane.frames.qsize())
+            self._queued += 1
+            self._frames_ready.notify()
+        return True
+
+    def pump(self):
+        '''
+        Runs one round: takes up to lane_batch frames from every non-empty lane, in round-robin order, and runs the
+        operation on them. Frame errors are counted on their lane and returned, never raised.
+
+        Returns
+        ----------
+        list
+            (gvcid, frame, result) for every frame drained this round. Each is also passed to the sink, if any.
+        '''
+        batch = []
+        lane_order = self._lane_order
+        num_lanes = len(lane_order)
+        for lane_offset in range(num_lanes):
+            lane = lane_order[(self._next_lane + lane_offset) % num_lanes]
+            for _ in range(self.lane_batch):
+                try:
+                    batch.append((lane, lane.frames.get_nowait()))
+                except queue.Empty:
+                    break
+        if num_lanes:
+            # Start the next round one lane further so no lane is always served first
+            self._next_lane = (self._next_lane + 1) % num_lanes
+        if not batch:
+            return []
+        with self._lock:
+            self._queued -= len(batch)
+
+        drained = []
+        for (lane, frame), result in zip(batch, self._run(frame for _, frame in batch)):
+            failed = isinstance(result, SdlsClientException)
+            with self._lock:
+                if failed:
+                    lane.errors += 1
+                else:
+                    lane.processed += 1
+            drained.append((lane.gvcid, frame, result))
+            if self.sink is not None:
+                self.sink(lane.gvcid, frame, result)
+        return drained
+
+    def drain(self):
+        '''
+        Runs rounds until every lane is empty and returns everything drained, see pump().
+        '''
+        drained = []
+        while True:
+            round_results = self.pump()
+            if not round_results:
+                return drained
+            drained.extend(round_results)
+
+    def start(self):
+        '''
+        Starts a background thread that keeps pumping lanes as frames arrive, delivering results to the sink.
+        '''
+        if self.sink is None:
+            raise SdlsClientException(SdlsClientException.INVALID_CONFIGURATION,
+                                      "KmcSdlsDemux.start requires a sink to deliver results to")
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._drain_continuously, name="KmcSdlsDemux", daemon=True)
+            self._thread.start()
+
+    def stop(self, drain=True):
+        '''
+        Stops the background thread, after it has emptied every lane when drain is True. If the thread was stopped by
+        an exception, that exception is raised instead and the lanes are left as they are.
+        '''
+        if self._thread is not None:
+            with self._lock:
+                self._stopping = True
+                self._frames_ready.notify()
+            self._thread.join()
+            self._thread = None
+        if self._failure is not None:
+            raise self._failure
+        if drain:
+            self.drain()
+
+    def stats(self):
+        '''
+        Returns a VcLaneStats snapshot per lane, keyed by GVCID, with the reject lane under REJECT_LANE.
+        '''
+        with self._lock:
+            lane_stats = {gvcid: lane.stats() for gvcid, lane in self.lanes.items()}
+            reject_stats = self._reject_lane.stats()
+        lane_stats[REJECT_LANE] = reject_stats._replace(depth=len(self.rejected))
+        return lane_stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop(drain=exc_type is None)
+
+    def _add_new_lanes(self):
+        # Adds a lane for every GVCID of frame_type the backend has managed parameters for and no lane yet. Both
+        # backends replace their managed GVCID collection on reconfigure(), so an unchanged one needs no scan.
+        if isinstance(self.backend, KmcSdlsPool):
+            managed_gvcids = self.backend.managed_gvcids
+        else:
+            managed_gvcids = self.backend.managed_parameters
+        with self._lock:
+            if managed_gvcids is self._lanes_built_from:
+                return False
+            self._lanes_built_from = managed_gvcids
+            new_lanes = [_VcLane(gvcid[1:], self._max_queue) for gvcid in sorted(managed_gvcids)
+                         if gvcid[0] == self.frame_type and gvcid[1:] not in self.lanes]
+            for lane in new_lanes:
+                self.lanes[lane.gvcid] = lane
+            # pump() may be reading the current list on the background thread, so it is replaced, not extended
+            self._lane_order = self._lane_order + new_lanes
+        return bool(new_lanes)
+
+    @staticmethod
+    def _count_enqueued(lane, frame):
+        if lane.first_frame_time is None:
+            lane.first_frame_time = time.perf_counter()
+        lane.enqueued += 1
+        lane.bytes_in += len(frame)
+
+    def _run(self, frames):
+        if isinstance(self.backend, KmcSdlsPool):
+            return self.backend.map(self.operation, frames, return_exceptions=True)
+        client_method = getattr(self.backend, self.operation)
+        results = []
+        for frame in frames:
+            try:
+                results.append(client_method(frame))
+            except SdlsClientException as e:
+                results.append(e)
+        return results
+
+    def _drain_continuously(self):
+        try:
+            while True:
+                with self._lock:
+                    while self._queued == 0 and not self._stopping:
+                        self._frames_ready.wait(_IDLE_POLL_INTERVAL)
+                    if self._stopping:
+                        return
+                self.pump()
+        except BaseException as e:
+            # Frames taken off their lanes in the failed round are lost; the rest stay queued
+            self._failure = e
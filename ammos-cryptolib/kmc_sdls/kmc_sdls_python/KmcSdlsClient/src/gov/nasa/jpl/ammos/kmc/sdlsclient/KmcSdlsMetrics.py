@@ -0,0 +1,257 @@
+#
+# Copyright 2021, by the California Institute of Technology.
+# ALL RIGHTS RESERVED. United States Government Sponsorship acknowledged.
+# Any commercial use must be negotiated with the Office of Technology
+# Transfer at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S.
+# export laws and regulations. User has the responsibility to obtain
+# export licenses, or other export authority as may be required before
+# exporting such information to foreign countries or providing access to
+# foreign persons.
+#
+
+
+import os
+import struct
+from typing import NamedTuple
+
+from gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsClient import frame_gvcid, sdls_error_name
+
+"""
+This module keeps per-call metrics of a KmcSdlsClient: frames, bytes, native call latency and CryptoLib error codes,
+per operation, frame type and GVCID. They can be pulled with snapshot() or written in the Prometheus text format for
+the node exporter textfile collector.
+
+Recording is kept to a few dictionary and list updates per frame. Latencies go to power of two nanosecond buckets,
+which become the buckets of a Prometheus histogram; LatencyHistogram is the tool for exact percentiles.
+"""
+
+# Latency bucket i counts calls of 2^(i-1) up to 2^i - 1 ns. Calls are recorded in 65 buckets, so any 64 bit duration
+# indexes one without a bounds check, and exported in the buckets from about 1 us to about 17 s, plus +Inf.
+NUM_LATENCY_BUCKETS = 36
+_FIRST_EXPORTED_BUCKET = 10
+_RECORDED_BUCKETS = 65
+# Reads the header bytes holding the GVCID of each frame type; the TC ones also hold bypass and length bits
+_GVCID_PREFIX = {'tc': struct.Struct(">HB"), 'tm': struct.Struct(">H"), 'aos': struct.Struct(">H")}
+# Frame header prefixes remembered per operation and frame type before the GVCID lookup cache is reset
+_MAX_CACHED_PREFIXES = 4096
+
+
+class OperationMetrics(NamedTuple):
+    operation: str  # apply or process
+    frame_type: str  # tc, tm or aos
+    gvcid: object  # (tfvn, scid, vcid), or None for frames too short to carry one
+    frames: int  # Frames submitted, including the ones that failed
+    bytes_in: int  # Bytes of all submitted frames
+    errors: dict  # CryptoLib error name (sdls_get_error_code_enum_string) -> count
+    latency_buckets: tuple  # (upper bound in seconds, cumulative count) pairs, the last bound being inf
+    latency_sum: float  # Seconds spent in all calls
+
+
+class _Series:
+    __slots__ = ('frames', 'bytes_in', 'errors', 'buckets', 'sum_ns')
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes_in = 0
+        self.errors = dict()
+        self.buckets = [0] * _RECORDED_BUCKETS
+        self.sum_ns = 0
+
+
+class KmcSdlsMetrics:
+
+    def __init__(self, enabled=True):
+        '''
+        Creates an empty set of metrics.
+
+        Parameters
+        ----------
+        enabled : bool
+            Whether calls are recorded. It can be switched at any time; the metrics recorded so far are kept.
+        '''
+        self.enabled = enabled
+        self.reset()
+
+    def record(self, operation, frame_type, frame, frame_length, elapsed_ns, status=0):
+        '''
+        Records one frame. Called by KmcSdlsClient after every native call while enabled.
+
+        Parameters
+        ----------
+        operation : str
+            apply or process.
+        frame_type : str
+            One of 'tc', 'tm' or 'aos'.
+        frame : bytes-like
+            The frame passed to CryptoLib, its primary header giving the GVCID.
+        frame_length : int
+            Length of the frame in bytes.
+        elapsed_ns : int
+            Duration of the native call in nanoseconds.
+        status : int
+            The CryptoLib status returned by the call.
+        '''
+        prefixes, unpack_prefix = self._prefix_cache[operation, frame_type]
+        try:
+            series = prefixes[unpack_prefix(frame)]
+        except (KeyError, struct.error):
+            series = self._lookup(operation, frame_type, frame)
+        series.frames += 1
+        series.bytes_in += frame_length
+        series.sum_ns += elapsed_ns
+        series.buckets[elapsed_ns.bit_length()] += 1
+        if status != 0:
+            name = sdls_error_name(status)
+            series.errors[name] = series.errors.get(name, 0) + 1
+
+    def record_batch(self, operation, frame_type, packed_frames, frame_offsets, frame_lengths, elapsed_ns, status):
+        '''
+        Records every frame of a batch call, each with an equal share of the call's duration.
+
+        Parameters
+        ----------
+        packed_frames : bytes-like
+            The frames of the batch as packed for the native call, so that iterators already consumed by the
+            packing are still recorded.
+        frame_offsets : sequence
+            The offset of each frame in packed_frames.
+        frame_lengths : sequence
+            The length of each frame in bytes.
+        status : sequence
+            The CryptoLib status of each frame.
+        '''
+        if not frame_lengths:
+            return
+        share_ns = elapsed_ns // len(frame_lengths)
+        bucket = share_ns.bit_length()
+        packed_view = memoryview(packed_frames)
+        for frame_offset, frame_length, frame_status in zip(frame_offsets, frame_lengths, status):
+            frame = packed_view[frame_offset:frame_offset + frame_length]
+            series = self._lookup(operation, frame_type, frame)
+            series.frames += 1
+            series.bytes_in += frame_length
+            series.sum_ns += share_ns
+            series.buckets[bucket] += 1
+            if frame_status != 0:
+                name = sdls_error_name(int(frame_status))
+                series.errors[name] = series.errors.get(name, 0) + 1
+
+    def _lookup(self, operation, frame_type, frame):
+        # The GVCID sits in the first header bytes, so they key a cache that skips decoding it again
+        prefixes, unpack_prefix = self._prefix_cache[operation, frame_type]
+        try:
+            prefix = unpack_prefix(frame)
+        except struct.error:
+            prefix = None  # Too short to carry a GVCID
+        series = prefixes.get(prefix)
+        if series is None:
+            key = (operation, frame_type, None if prefix is None else frame_gvcid(frame_type, frame))
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+            if len(prefixes) >= _MAX_CACHED_PREFIXES:
+                prefixes.clear()
+            prefixes[prefix] = series
+        return series
+
+    def reset(self):
+        '''
+        Drops every metric recorded so far.
+        '''
+        self._series = dict()  # (operation, frame_type, gvcid) -> _Series
+        # (operation, frame_type) -> ({GVCID header prefix: _Series}, prefix reader)
+        self._prefix_cache = {(operation, frame_type): (dict(), prefix.unpack_from)
+                              for operation in ("apply", "process") for frame_type, prefix in _GVCID_PREFIX.items()}
+
+    def snapshot(self):
+        '''
+        Returns the metrics recorded so far.
+
+        Returns
+        ----------
+        list
+            One OperationMetrics per operation, frame type and GVCID seen, sorted by them.
+        '''
+        snapshot = []
+        for (operation, frame_type, gvcid), series in sorted(list(self._series.items()), key=_series_sort_key):
+            cumulative = 0
+            latency_buckets = []
+            for idx, count in enumerate(series.buckets[:NUM_LATENCY_BUCKETS - 1]):
+                cumulative += count
+                if idx >= _FIRST_EXPORTED_BUCKET:
+                    latency_buckets.append((((1 << idx) - 1) / 1e9, cumulative))
+            latency_buckets.append((float("inf"), series.frames))
+            snapshot.append(OperationMetrics(operation, frame_type, gvcid, series.frames, series.bytes_in,
+                                             dict(series.errors), tuple(latency_buckets), series.sum_ns / 1e9))
+        return snapshot
+
+    def prometheus_text(self, prefix="kmc_sdls"):
+        '''
+        Returns the metrics in the Prometheus text exposition format.
+
+        Parameters
+        ----------
+        prefix : str
+            Prefix of every metric name.
+        '''
+        snapshot = self.snapshot()
+        lines = ["# HELP %s_frames_total Frames passed to CryptoLib, including failed ones." % prefix,
+                 "# TYPE %s_frames_total counter" % prefix]
+        lines.extend("%s_frames_total{%s} %d" % (prefix, _labels(m), m.frames) for m in snapshot)
+        lines.extend(["# HELP %s_frame_bytes_total Bytes of the frames passed to CryptoLib." % prefix,
+                      "# TYPE %s_frame_bytes_total counter" % prefix])
+        lines.extend("%s_frame_bytes_total{%s} %d" % (prefix, _labels(m), m.bytes_in) for m in snapshot)
+        lines.extend(["# HELP %s_frame_errors_total Frames CryptoLib failed, by error code name." % prefix,
+                      "# TYPE %s_frame_errors_total counter" % prefix])
+        for m in snapshot:
+            for name in sorted(m.errors):
+                lines.append('%s_frame_errors_total{%s,error="%s"} %d' % (prefix, _labels(m), _escape(name),
+                                                                           m.errors[name]))
+        lines.extend(["# HELP %s_call_duration_seconds Duration of the CryptoLib call securing or processing a frame."
+                      % prefix, "# TYPE %s_call_duration_seconds histogram" % prefix])
+        for m in snapshot:
+            labels = _labels(m)
+            for upper, count in m.latency_buckets:
+                lines.append('%s_call_duration_seconds_bucket{%s,le="%s"} %d' % (
+                    prefix, labels, "+Inf" if upper == float("inf") else repr(upper), count))
+            lines.append("%s_call_duration_seconds_sum{%s} %r" % (prefix, labels, m.latency_sum))
+            lines.append("%s_call_duration_seconds_count{%s} %d" % (prefix, labels, m.frames))
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus_textfile(self, path, prefix="kmc_sdls"):
+        '''
+        Writes the metrics to a .prom file for the node exporter textfile collector. The file is written next to
+        path and renamed over it, so the collector never reads a partial file.
+
+        Parameters
+        ----------
+        path : str
+            The .prom file, normally in the directory given to --collector.textfile.directory.
+        prefix : str
+            Prefix of every metric name.
+        '''
+        temporary_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(temporary_path, "w") as f:
+            f.write(self.prometheus_text(prefix))
+        os.replace(temporary_path, path)
+
+
+def _series_sort_key(item):
+    (operation, frame_type, gvcid), _ = item
+    return operation, frame_type, gvcid is not None, gvcid or ()
+
+
+def _labels(metrics):
+    if metrics.gvcid is None:
+        tfvn = scid = vcid = "unknown"
+    else:
+        tfvn, scid, vcid = metrics.gvcid
+    return 'operation="%s",frame_type="%s",tfvn="%s",scid="%s",vcid="%s"' % (metrics.operation, metrics.frame_type,
+                                                                            tfvn, scid, vcid)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
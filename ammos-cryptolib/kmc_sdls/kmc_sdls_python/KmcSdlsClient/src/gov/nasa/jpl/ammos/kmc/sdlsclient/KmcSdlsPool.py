@@ -0,0 +1,401 @@
+#
+# Copyright 2021, by the California Institute of Technology.
+# ALL RIGHTS RESERVED. United States Government Sponsorship acknowledged.
+# Any commercial use must be negotiated with the Office of Technology
+# Transfer at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S.
+# export laws and regulations. User has the responsibility to obtain
+# export licenses, or other export authority as may be required before
+# exporting such information to foreign countries or providing access to
+# foreign persons.
+#
+
+
+import multiprocessing
+import os
+import queue
+
+from gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsClient import KmcSdlsClient, KmcSdlsConfig, SdlsClientException, \
+    frame_gvcid
+
+"""
+This module spreads SDLS processing over several processes, each owning its own CryptoLib instance.
+
+CryptoLib keeps its configuration and security association state in process globals, so a single KmcSdlsClient is
+limited to one core. KmcSdlsPool starts one KmcSdlsClient per worker process and pins every security association to
+a single worker so sequence numbers and anti-replay windows stay consistent.
+"""
+
+# Client methods a pool can run, and the frame type each one operates on
+POOL_OPERATIONS = {
+    "apply_security_tc": "tc",
+    "process_security_tc": "tc",
+    "apply_security_tm": "tm",
+    "process_security_tm": "tm",
+    "apply_security_aos": "aos",
+    "process_security_aos": "aos",
+}
+# The non-raising variants, returning (status, result) so rejected frames need no exception pickled back
+POOL_OPERATIONS.update({"try_" + operation: frame_type for operation, frame_type in list(POOL_OPERATIONS.items())})
+
+# Seconds to wait on the result queue before checking that every worker is still alive
+_WORKER_POLL_INTERVAL = 1.0
+
+
+class KmcSdlsPool:
+
+    def __init__(self, config, num_workers=None, affinity="gvcid", chunk_size=32, max_in_flight=None,
+                 mp_context=None):
+        '''
+        Starts num_workers processes, each running a KmcSdlsClient initialized with the same configuration.
+
+        Parameters
+        ----------
+        config : list or KmcSdlsConfig
+            The CryptoLib configuration, as passed to KmcSdlsClient. It is compiled and validated once, here, and
+            the compiled KmcSdlsConfig is what the workers start from.
+        num_workers : int
+            Number of worker processes. Defaults to the number of CPUs.
+        affinity : str or callable
+            How frames are pinned to workers. 'gvcid' routes on (TFVN, SCID, VCID); 'spi' routes processed frames
+            on the SPI of their security header (applied frames carry no SPI yet and are routed on their GVCID).
+            A callable receives (frame_type, frame) and returns any hashable key. Frames with equal keys always go
+            to the same worker.
+        chunk_size : int
+            Number of frames sent to a worker per inter-process message.
+        max_in_flight : int
+            Maximum number of chunks queued to workers before waiting on results. Defaults to 4 per worker. imap()
+            also holds back at most max_in_flight * chunk_size results waiting on an earlier frame, sending that
+            frame's chunk before it is full if need be.
+        mp_context : multiprocessing context
+            Context used to start workers. Defaults to 'spawn' so workers never inherit CryptoLib state.
+        '''
+        if affinity not in ("gvcid", "spi") and not callable(affinity):
+            raise SdlsClientException(SdlsClientException.INVALID_CONFIGURATION_VALUE,
+                                      "Pool affinity must be 'gvcid', 'spi' or a callable, got: %r" % (affinity,))
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self.max_in_flight = max_in_flight or 4 * self.num_workers
+        self._affinity = affinity
+        self._context = mp_context or multiprocessing.get_context("spawn")
+        self._assignments = dict()  # affinity key -> worker index, assigned round robin on first sight
+        self._set_config(KmcSdlsConfig.from_properties(config))
+        self._generation = 0
+        self._retiring = []  # Replaced worker sets still finishing an imap() that started on them
+        self._worker_set = _WorkerSet(self._context, self.config, self.num_workers, self._generation)
+
+    def reconfigure(self, config):
+        '''
+        Switches every worker to a new configuration without stopping the pool.
+
+        When the new configuration only adds GVCID managed parameters, and no imap() is in progress, every worker
+        adds them to its running CryptoLib. Otherwise a standby set of workers is started with the new configuration
+        and, once all of them are initialized, new work goes to them. An imap() already in progress finishes on the
+        previous workers, which are shut down when it completes. If adding the managed parameters fails on any
+        worker, a standby set is started as for other changes. If the standby workers fail to initialize, the
+        previous workers keep serving and the error is raised.
+
+        Parameters
+        ----------
+        config : list or KmcSdlsConfig
+            The new CryptoLib configuration, as passed to KmcSdlsClient.
+
+        Returns
+        ----------
+        ConfigChange
+            What differed between the previous and the new configuration, as reported by KmcSdlsConfig.diff.
+        '''
+        new_config = KmcSdlsConfig.from_properties(config)
+        change = self.config.diff(new_config)
+        if not change.requires_restart and self._worker_set.active_calls == 0:
+            if change.added_managed_parameters:
+                try:
+                    self._worker_set.reconfigure(new_config)
+                except SdlsClientException:
+                    # Workers are reconfigured one by one, so some may have the new managed parameters and others not
+                    self._replace_workers(new_config)
+        else:
+            self._replace_workers(new_config)
+        self._set_config(new_config)
+        return change
+
+    def worker_for(self, frame_type, frame, secured=True):
+        '''
+        Returns the index of the worker the supplied frame is pinned to.
+
+        Parameters
+        ----------
+        frame_type : str
+            One of 'tc', 'tm' or 'aos'.
+        frame : bytes-like
+            The Transfer Frame.
+        secured : bool
+            Whether the frame already carries a security header. Only secured frames can be routed on their SPI.
+        '''
+        if callable(self._affinity):
+            key = self._affinity(frame_type, frame)
+        else:
+            key = None
+            if self._affinity == "spi" and secured:
+                key = self._spi_key(frame_type, frame)
+            if key is None:
+                key = (frame_type, frame_gvcid(frame_type, frame))
+        worker_idx = self._assignments.get(key)
+        if worker_idx is None:
+            worker_idx = len(self._assignments) % self.num_workers
+            self._assignments[key] = worker_idx
+        return worker_idx
+
+    def imap(self, operation, frames, return_exceptions=False):
+        '''
+        Runs a KmcSdlsClient operation on every frame across the workers, yielding results in submission order.
+
+        Parameters
+        ----------
+        operation : str
+            Name of the client method to run, e.g. 'apply_security_tm' or 'process_security_tc'.
+        frames : iterable
+            Transfer Frames as bytes-like objects.
+        return_exceptions : bool
+            When True, a frame that fails yields its SdlsClientException instead of raising it.
+        '''
+        frame_type = POOL_OPERATIONS.get(operation)
+        if frame_type is None:
+            raise SdlsClientException(SdlsClientException.INVALID_CONFIGURATION_VALUE,
+                                      "Unsupported pool operation: %s" % operation)
+        secured = operation.startswith(("process_", "try_process_"))
+
+        # The whole call runs on the worker set current when it starts, even if the pool is reconfigured meanwhile
+        workers = self._worker_set
+        workers.active_calls += 1
+        pending = [[] for _ in range(self.num_workers)]
+        completed = dict()
+        max_completed = self.max_in_flight * self.chunk_size
+        next_seq = 0
+        submitted = 0
+        in_flight = 0
+        try:
+            for frame in frames:
+                frame = bytes(frame)
+                worker_idx = self.worker_for(frame_type, frame, secured)
+                chunk = pending[worker_idx]
+                chunk.append((submitted, frame))
+                submitted += 1
+                if len(chunk) >= self.chunk_size:
+                    workers.task_queues[worker_idx].put((operation, chunk))
+                    pending[worker_idx] = []
+                    in_flight += 1
+                while True:
+                    while next_seq in completed:
+                        yield self._unwrap(completed.pop(next_seq), return_exceptions)
+                        next_seq += 1
+                    # Backpressure: never queue more than max_in_flight chunks, nor hold more than max_in_flight
+                    # chunks worth of results that wait on an earlier frame
+                    if in_flight < self.max_in_flight and len(completed) < max_completed:
+                        break
+                    # The oldest frame may sit in the partial chunk of a worker that rarely gets traffic: send it, so
+                    # waiting here always brings its result closer
+                    in_flight += self._send_head(workers, operation, pending, next_seq)
+                    in_flight -= self._collect(workers, completed)
+
+            for worker_idx, chunk in enumerate(pending):
+                if chunk:
+                    workers.task_queues[worker_idx].put((operation, chunk))
+                    in_flight += 1
+            pending = None
+            while next_seq < submitted:
+                while next_seq not in completed:
+                    in_flight -= self._collect(workers, completed)
+                yield self._unwrap(completed.pop(next_seq), return_exceptions)
+                next_seq += 1
+        finally:
+            # Drain what is still queued so an abandoned or failed call cannot leak results into the next one
+            try:
+                while in_flight > 0:
+                    in_flight -= self._collect(workers, completed)
+            finally:
+                workers.active_calls -= 1
+                if workers.active_calls == 0 and workers in self._retiring:
+                    self._retiring.remove(workers)
+                    workers.close()
+
+    def map(self, operation, frames, return_exceptions=False):
+        '''
+        Runs a KmcSdlsClient operation on every frame across the workers and returns the results in submission order.
+        See imap() for the parameters.
+        '''
+        return list(self.imap(operation, frames, return_exceptions))
+
+    def close(self):
+        '''
+        Shuts down every worker's CryptoLib instance and waits for the worker processes to exit.
+        '''
+        for workers in self._retiring + [self._worker_set]:
+            workers.close()
+        self._retiring = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _spi_key(self, frame_type, frame):
+        # The security header directly follows the primary header and, when present, the TC segment header or the TM
+        # secondary header. AOS managed parameters are always added without FHEC or insert zone (kmc_sdls.c), so the
+        # AOS security header always starts right after the 6 byte primary header.
+        gvcid = frame_gvcid(frame_type, frame)
+        if gvcid is None:
+            return None
+        offset = 6
+        if frame_type == "tc":
+            offset = 6 if gvcid in self._segmented_tc_gvcids else 5
+        elif frame_type == "tm" and frame[4] & 0x80:
+            if len(frame) < 7:
+                return None
+            # Secondary header flag set: its first byte holds its length minus one in the low 6 bits
+            offset = 7 + (frame[6] & 0x3F)
+        if len(frame) < offset + 2:
+            return None
+        return "spi", (frame[offset] << 8) | frame[offset + 1]
+
+    def _set_config(self, config):
+        self.config = config
+        # (tfvn, scid, vcid) of every TC managed parameter configured with a segment header
+        self._segmented_tc_gvcids = {gvcid[1:] for gvcid, mp in config.managed_parameters.items()
+                                     if mp.frame_type == "tc" and mp.has_segmentation_header}
+        # (frame_type, tfvn, scid, vcid) of every GVCID with managed parameters, like KmcSdlsClient.managed_parameters
+        self.managed_gvcids = set(config.managed_parameters)
+
+    def _replace_workers(self, config):
+        # Starts a standby worker set on config and retires the current one once it is up
+        current = self._worker_set
+        self._generation += 1
+        self._worker_set = _WorkerSet(self._context, config, self.num_workers, self._generation)
+        if current.active_calls == 0:
+            current.close()
+        else:
+            self._retiring.append(current)
+
+    @staticmethod
+    def _send_head(workers, operation, pending, next_seq):
+        # Sends the partial chunk starting with next_seq, the oldest frame without a result, if it is still pending
+        for worker_idx, chunk in enumerate(pending):
+            if chunk and chunk[0][0] == next_seq:
+                workers.task_queues[worker_idx].put((operation, chunk))
+                pending[worker_idx] = []
+                return 1
+        return 0
+
+    @staticmethod
+    def _collect(workers, completed):
+        worker_idx, chunk_results, error = workers.next_result()
+        if error is not None:
+            raise error
+        for seq, ok, value in chunk_results:
+            completed[seq] = (ok, value)
+        return 1
+
+    @staticmethod
+    def _unwrap(result, return_exceptions):
+        ok, value = result
+        if ok or return_exceptions:
+            return value
+        raise value
+
+
+class _WorkerSet:
+
+    def __init__(self, context, config, num_workers, generation):
+        # Starts one worker process per index and waits until each has initialized its KmcSdlsClient
+        self.active_calls = 0  # imap() calls running on this set
+        self.workers = []
+        self.task_queues = []
+        self.results = context.Queue()
+        for worker_idx in range(num_workers):
+            task_queue = context.Queue()
+            worker = context.Process(target=_pool_worker, args=(worker_idx, config, task_queue, self.results),
+                                     name="KmcSdlsPool-%d.%d" % (generation, worker_idx), daemon=True)
+            worker.start()
+            self.task_queues.append(task_queue)
+            self.workers.append(worker)
+
+        # Every worker reports once its KmcSdlsClient is initialized (or failed to)
+        try:
+            self._wait_for_workers()
+        except BaseException:
+            self.close()
+            raise
+
+    def reconfigure(self, config):
+        # Only for additive changes, and only while no imap() is using the workers' result queue
+        for task_queue in self.task_queues:
+            task_queue.put(("reconfigure", config))
+        self._wait_for_workers()
+
+    def next_result(self):
+        while True:
+            try:
+                return self.results.get(timeout=_WORKER_POLL_INTERVAL)
+            except queue.Empty:
+                for worker in self.workers:
+                    if not worker.is_alive():
+                        raise SdlsClientException(SdlsClientException.WORKER_FAILURE,
+                                                  "KmcSdlsPool worker %s exited with code %s" % (worker.name,
+                                                                                                 worker.exitcode))
+
+    def close(self):
+        for task_queue, worker in zip(self.task_queues, self.workers):
+            if worker.is_alive():
+                task_queue.put(None)
+        for worker in self.workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+        self.workers = []
+        self.task_queues = []
+
+    def _wait_for_workers(self):
+        # Collects one acknowledgement per worker before raising the first error, so none is left queued
+        first_error = None
+        for _ in range(len(self.workers)):
+            worker_idx, _, error = self.next_result()
+            if first_error is None:
+                first_error = error
+        if first_error is not None:
+            raise first_error
+
+
+def _pool_worker(worker_idx, config, task_queue, result_queue):
+    try:
+        client = KmcSdlsClient(config)
+    except Exception as e:
+        result_queue.put((worker_idx, None, e))
+        return
+    result_queue.put((worker_idx, None, None))
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            operation, chunk = task
+            if operation == "reconfigure":
+                try:
+                    client.reconfigure(chunk)
+                    result_queue.put((worker_idx, None, None))
+                except Exception as e:
+                    result_queue.put((worker_idx, None, e))
+                continue
+            client_method = getattr(client, operation)
+            chunk_results = []
+            for seq, frame in chunk:
+                try:
+                    chunk_results.append((seq, True, client_method(bytearray(frame))))
+                except Exception as e:
+                    chunk_results.append((seq, False, e))
+            result_queue.put((worker_idx, chunk_results, None))
+    finally:
+        client.shutdown()
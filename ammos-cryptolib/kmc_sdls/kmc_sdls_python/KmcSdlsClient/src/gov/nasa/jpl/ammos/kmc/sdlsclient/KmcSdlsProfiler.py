@@ -0,0 +1,201 @@
+#
+# Copyright 2021, by the California Institute of Technology.
+# ALL RIGHTS RESERVED. United States Government Sponsorship acknowledged.
+# Any commercial use must be negotiated with the Office of Technology
+# Transfer at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S.
+# export laws and regulations. User has the responsibility to obtain
+# export licenses, or other export authority as may be required before
+# exporting such information to foreign countries or providing access to
+# foreign persons.
+#
+
+
+import collections
+import functools
+import json
+import os
+import threading
+from typing import NamedTuple
+
+from gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsClient import _clock_ns
+
+"""
+This module splits the time of KmcSdlsClient apply_security_* and process_security_* calls into phases:
+
+    validate  checking the input frame and taking a view of its buffer
+    marshal   copies and native memory set up for the call (bytearray copies, from_buffer, ffi.new, scratch structs)
+    native    the CryptoLib call itself, including any SADB or KMC Crypto Service round trip
+    result    checking the status and building the Python result (CompactTC/TM/AOS, batch results, metrics)
+
+A call made from another profiled call (apply_security_tc calls apply_security_tc_into) is folded into its caller,
+its phases adding to the caller's phases of the same name.
+"""
+
+PHASES = ("validate", "marshal", "native", "result")
+
+
+class PhaseSummary(NamedTuple):
+    call: str  # KmcSdlsClient method name
+    phase: str  # One of PHASES
+    calls: int  # Calls profiled
+    total_ns: int  # Time spent in the phase over all calls
+    mean_ns: float  # total_ns / calls
+    max_ns: int  # Longest time spent in the phase by one call
+    share: float  # Fraction of the calls' total time spent in the phase
+
+
+class _CallTrace(NamedTuple):
+    call: str
+    thread_id: int
+    start_ns: int
+    end_ns: int
+    segments: list  # (phase, start_ns, end_ns), in call order
+
+
+class KmcSdlsProfiler:
+
+    def __init__(self, trace_capacity=100000):
+        '''
+        Creates a profiler. It is attached with KmcSdlsClient.enable_profiling().
+
+        Parameters
+        ----------
+        trace_capacity : int
+            Number of most recent calls kept for write_chrome_trace. The phase aggregates cover every call.
+        '''
+        self.trace_capacity = trace_capacity
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        '''
+        Drops everything profiled so far.
+        '''
+        with self._lock:
+            self._totals = collections.OrderedDict()  # call -> {phase: [calls, total_ns, max_ns]}
+            self._call_totals = dict()  # call -> total_ns
+            self._traces = collections.deque(maxlen=self.trace_capacity)
+
+    def wrap(self, call, method):
+        '''
+        Returns method wrapped so every outermost invocation is profiled as call.
+        '''
+        @functools.wraps(method)
+        def profiled(*args, **kwargs):
+            self.begin(call)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.end()
+        return profiled
+
+    def begin(self, call):
+        '''
+        Starts profiling a call, in its validate phase. Nested calls continue the outermost one.
+        '''
+        state = self._local
+        depth = getattr(state, "depth", 0)
+        state.depth = depth + 1
+        if depth:
+            self.phase("validate")
+            return
+        now = _clock_ns()
+        state.call = call
+        state.start_ns = now
+        state.phase = "validate"
+        state.phase_start_ns = now
+        state.segments = []
+
+    def phase(self, phase):
+        '''
+        Ends the current phase of the call being profiled on this thread and starts the given one.
+        '''
+        state = self._local
+        if not getattr(state, "depth", 0):
+            return
+        now = _clock_ns()
+        state.segments.append((state.phase, state.phase_start_ns, now))
+        state.phase = phase
+        state.phase_start_ns = now
+
+    def end(self):
+        '''
+        Ends the call being profiled on this thread, or returns to its caller's profile when nested.
+        '''
+        state = self._local
+        state.depth -= 1
+        if state.depth:
+            return
+        now = _clock_ns()
+        segments = state.segments
+        segments.append((state.phase, state.phase_start_ns, now))
+        per_phase = dict()
+        for phase, start_ns, end_ns in segments:
+            per_phase[phase] = per_phase.get(phase, 0) + end_ns - start_ns
+        with self._lock:
+            totals = self._totals.get(state.call)
+            if totals is None:
+                totals = self._totals[state.call] = {phase: [0, 0, 0] for phase in PHASES}
+            for phase, elapsed_ns in per_phase.items():
+                stats = totals.setdefault(phase, [0, 0, 0])
+                stats[1] += elapsed_ns
+                stats[2] = max(stats[2], elapsed_ns)
+            for stats in totals.values():
+                stats[0] += 1
+            self._call_totals[state.call] = self._call_totals.get(state.call, 0) + now - state.start_ns
+            self._traces.append(_CallTrace(state.call, threading.get_ident(), state.start_ns, now, segments))
+
+    def summary(self):
+        '''
+        Returns the per-phase aggregates of every call profiled so far.
+
+        Returns
+        ----------
+        list
+            One PhaseSummary per profiled method and phase, in order of first call and then of PHASES.
+        '''
+        summary = []
+        with self._lock:
+            for call, totals in self._totals.items():
+                call_total_ns = self._call_totals[call]
+                for phase, (calls, total_ns, max_ns) in totals.items():
+                    summary.append(PhaseSummary(call, phase, calls, total_ns, total_ns / calls if calls else 0.0,
+                                                max_ns, total_ns / call_total_ns if call_total_ns else 0.0))
+        return summary
+
+    def format_summary(self):
+        '''
+        Returns summary() as a text table, mean times in microseconds.
+        '''
+        lines = ["%-32s %-9s %9s %12s %12s %7s" % ("call", "phase", "calls", "mean (us)", "max (us)", "share")]
+        for s in self.summary():
+            lines.append("%-32s %-9s %9d %12.2f %12.2f %6.1f%%" % (s.call, s.phase, s.calls, s.mean_ns / 1e3,
+                                                                   s.max_ns / 1e3, s.share * 100))
+        return "\n".join(lines)
+
+    def write_chrome_trace(self, path):
+        '''
+        Writes the most recent calls as a Chrome trace-event JSON file, to open in chrome://tracing or Perfetto.
+        Every call is an event with its phases nested under it.
+
+        Parameters
+        ----------
+        path : str
+            The JSON file to write.
+        '''
+        pid = os.getpid()
+        events = []
+        with self._lock:
+            traces = list(self._traces)
+        for trace in traces:
+            events.append({"name": trace.call, "cat": "kmc_sdls", "ph": "X", "pid": pid, "tid": trace.thread_id,
+                           "ts": trace.start_ns / 1e3, "dur": (trace.end_ns - trace.start_ns) / 1e3})
+            for phase, start_ns, end_ns in trace.segments:
+                events.append({"name": phase, "cat": "kmc_sdls", "ph": "X", "pid": pid, "tid": trace.thread_id,
+                               "ts": start_ns / 1e3, "dur": (end_ns - start_ns) / 1e3, "args": {"call": trace.call}})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ns"}, f)
@@ -0,0 +1,156 @@
+#
+# Copyright 2021, by the California Institute of Technology.
+# ALL RIGHTS RESERVED. United States Government Sponsorship acknowledged.
+# Any commercial use must be negotiated with the Office of Technology
+# Transfer at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S.
+# export laws and regulations. User has the responsibility to obtain
+# export licenses, or other export authority as may be required before
+# exporting such information to foreign countries or providing access to
+# foreign persons.
+#
+
+
+import math
+
+from gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsClient import SdlsClientException
+
+"""
+This module records latencies in an HDR-style histogram: buckets grow with the magnitude of the value so that every
+recorded value is kept to a fixed number of significant digits, whatever its range, in a bounded number of counters.
+The bucket layout is the one of HdrHistogram, so percentiles agree with HdrHistogram to within its precision.
+"""
+
+
+class LatencyHistogram:
+
+    def __init__(self, significant_figures=3, unit_ns=1):
+        '''
+        Creates an empty histogram.
+
+        Parameters
+        ----------
+        significant_figures : int
+            Number of significant decimal digits values are kept to, from 1 to 5.
+        unit_ns : int
+            Smallest value told apart, in nanoseconds. Recorded values are integer multiples of it.
+        '''
+        if not 1 <= significant_figures <= 5:
+            raise SdlsClientException(SdlsClientException.INVALID_CONFIGURATION_VALUE,
+                                      "Histogram significant figures must be between 1 and 5, got: %d" %
+                                      significant_figures)
+        self.significant_figures = significant_figures
+        self.unit_ns = unit_ns
+        largest_single_unit = 2 * 10 ** significant_figures
+        self._sub_bucket_half_magnitude = int(math.ceil(math.log2(largest_single_unit))) - 1
+        self._sub_bucket_half_count = 1 << self._sub_bucket_half_magnitude
+        self._counts = dict()  # counts index -> number of values recorded in that bucket
+        self.total_count = 0
+        self.min_ns = None
+        self.max_ns = 0
+        self._sum_ns = 0
+
+    def record(self, value_ns, count=1):
+        '''
+        Records a latency of value_ns nanoseconds, count times. Negative values are recorded as 0.
+        '''
+        value = max(0, int(value_ns) // self.unit_ns)
+        index = self._counts_index(value)
+        self._counts[index] = self._counts.get(index, 0) + count
+        self.total_count += count
+        value_ns = value * self.unit_ns
+        self._sum_ns += value_ns * count
+        self.max_ns = max(self.max_ns, value_ns)
+        self.min_ns = value_ns if self.min_ns is None else min(self.min_ns, value_ns)
+
+    def record_with_expected_interval(self, value_ns, expected_interval_ns):
+        '''
+        Records value_ns, then corrects for coordinated omission the way HdrHistogram does: when a call took longer
+        than the interval at which calls were meant to start, the calls that should have started meanwhile are
+        recorded too, each with the latency it would have seen waiting for this one.
+        '''
+        self.record(value_ns)
+        if expected_interval_ns <= 0:
+            return
+        missing_value = value_ns - expected_interval_ns
+        while missing_value >= expected_interval_ns:
+            self.record(missing_value)
+            missing_value -= expected_interval_ns
+
+    def merge(self, other):
+        '''
+        Adds every value recorded in another histogram with the same significant figures and unit.
+        '''
+        if (other.significant_figures, other.unit_ns) != (self.significant_figures, self.unit_ns):
+            raise SdlsClientException(SdlsClientException.INVALID_CONFIGURATION_VALUE,
+                                      "Only histograms with the same significant figures and unit can be merged")
+        for index, count in other._counts.items():
+            self._counts[index] = self._counts.get(index, 0) + count
+        self.total_count += other.total_count
+        self._sum_ns += other._sum_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+        if other.min_ns is not None:
+            self.min_ns = other.min_ns if self.min_ns is None else min(self.min_ns, other.min_ns)
+
+    def mean_ns(self):
+        return self._sum_ns / self.total_count if self.total_count else 0.0
+
+    def percentile_ns(self, percentile):
+        '''
+        Returns the value, in nanoseconds, at or below which percentile percent of the recorded values fall. Like
+        HdrHistogram, it is the highest value equivalent to the bucket the percentile lands in.
+        '''
+        if not self.total_count:
+            return 0
+        target = max(1, int(math.ceil(min(percentile, 100.0) / 100.0 * self.total_count)))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max_ns // self.unit_ns) * self.unit_ns
+        return self.max_ns
+
+    def percentiles_ns(self, percentiles=(50.0, 90.0, 99.0, 99.9)):
+        '''
+        Returns a dict of percentile -> value in nanoseconds.
+        '''
+        return {percentile: self.percentile_ns(percentile) for percentile in percentiles}
+
+    def percentile_distribution(self, ticks_per_half_distance=5):
+        '''
+        Yields (value_ns, percentile, total count at or below the value) rows like HdrHistogram's percentile output,
+        stepping ever closer to 100% so the tail is shown in detail.
+        '''
+        if not self.total_count:
+            return
+        percentile = 0.0
+        half_distance = 1
+        while True:
+            value_ns = self.percentile_ns(percentile)
+            # The last row is the maximum, reached once the percentile gets within one value of 100%
+            yield value_ns, percentile, self._count_at_or_below(value_ns)
+            if value_ns >= self.max_ns:
+                return
+            percentile += 100.0 / (half_distance * 2 * ticks_per_half_distance)
+            if percentile >= 100.0 - 100.0 / (half_distance * 2):
+                half_distance *= 2
+
+    def _count_at_or_below(self, value_ns):
+        limit = self._counts_index(value_ns // self.unit_ns)
+        return sum(count for index, count in self._counts.items() if index <= limit)
+
+    def _counts_index(self, value):
+        bucket_index = max(0, value.bit_length() - (self._sub_bucket_half_magnitude + 1))
+        sub_bucket_index = value >> bucket_index
+        return ((bucket_index + 1) << self._sub_bucket_half_magnitude) + (sub_bucket_index -
+                                                                          self._sub_bucket_half_count)
+
+    def _highest_equivalent(self, index):
+        bucket_index = (index >> self._sub_bucket_half_magnitude) - 1
+        sub_bucket_index = (index & (self._sub_bucket_half_count - 1)) + self._sub_bucket_half_count
+        if bucket_index < 0:
+            sub_bucket_index -= self._sub_bucket_half_count
+            bucket_index = 0
+        return ((sub_bucket_index + 1) << bucket_index) - 1
@@ -621,6 +621,25 @@ typedef struct
     uint8_t login_method;
 } CamConfig_t;
 
+typedef struct
+{
+    uint8_t tfvn;
+    uint16_t scid;
+    uint8_t vcid;
+    uint8_t mcfc;
+    uint32_t vcfc;
+    uint16_t spi;
+    uint8_t iv_field_len;
+    uint8_t sn_field_len;
+    uint8_t pad_field_len;
+    uint8_t mac_field_len;
+    uint8_t ocf_field_len;
+    uint16_t fecf;
+    uint32_t pdu_offset;
+    uint16_t pdu_len;
+    int32_t status;
+} SdlsFrameSummary_t;
+
 extern int32_t sdls_config_cryptolib(uint8_t sadb_type, uint8_t cryptography_type, uint8_t crypto_create_fecf, uint8_t process_sdls_pdus, uint8_t has_pus_hdr, uint8_t ignore_sa_state, uint8_t ignore_anti_replay, uint8_t unique_sa_per_mapid, uint8_t crypto_check_fecf, uint8_t vcid_bitmask, uint8_t crypto_increment_nontransmitted_iv);
 
 extern int32_t sdls_config_mariadb(char* mysql_hostname, char* mysql_database, uint16_t mysql_port,
@@ -655,6 +674,9 @@ extern int32_t apply_security_tc_cam (const uint8_t* p_in_frame, const uint16_t
 
 extern int32_t process_security_tc_cam (char* sdls_transfer_frame, int* length, TC_t* tc_sdls_processed_frame, char* cam_cookies);
 
+extern int32_t apply_security_tc_into (const uint8_t* p_in_frame, const uint16_t in_frame_length, uint8_t* p_out_frame,
+                                       const uint16_t out_frame_capacity, uint16_t* p_out_frame_len);
+
 extern int32_t apply_security_tm (uint8_t* p_in_frame, uint16_t in_frame_length);
 
 extern int32_t process_security_tm (uint8_t *ptBuffer, uint16_t length, TM_t* p_enc_frame, uint16_t *p_enc_frame_len);
@@ -663,5 +685,27 @@ extern int32_t apply_security_aos (uint8_t* p_in_frame, uint16_t in_frame_length
 
 extern int32_t process_security_aos (uint8_t *ptBuffer, uint16_t length, AOS_t* p_enc_frame, uint16_t *p_enc_frame_len);
 
+extern int32_t apply_security_tc_batch (const uint8_t* p_in_frames, const uint32_t* p_in_offsets, const uint16_t* p_in_lengths,
+                                        uint32_t num_frames, uint8_t* p_out_frames, uint32_t out_frames_capacity,
+                                        uint32_t* p_out_offsets, uint16_t* p_out_lengths, int32_t* p_status);
+
+extern int32_t apply_security_tm_batch (uint8_t* p_frames, const uint32_t* p_offsets, const uint16_t* p_lengths,
+                                        uint32_t num_frames, int32_t* p_status);
+
+extern int32_t apply_security_aos_batch (uint8_t* p_frames, const uint32_t* p_offsets, const uint16_t* p_lengths,
+                                         uint32_t num_frames, int32_t* p_status);
+
+extern int32_t process_security_tc_batch (uint8_t* p_frames, const uint32_t* p_offsets, const uint16_t* p_lengths,
+                                          uint32_t num_frames, SdlsFrameSummary_t* p_summaries, uint8_t* p_pdus,
+                                          uint32_t pdus_capacity);
+
+extern int32_t process_security_tm_batch (uint8_t* p_frames, const uint32_t* p_offsets, const uint16_t* p_lengths,
+                                          uint32_t num_frames, SdlsFrameSummary_t* p_summaries, uint8_t* p_pdus,
+                                          uint32_t pdus_capacity);
+
+extern int32_t process_security_aos_batch (uint8_t* p_frames, const uint32_t* p_offsets, const uint16_t* p_lengths,
+                                           uint32_t num_frames, SdlsFrameSummary_t* p_summaries, uint8_t* p_pdus,
+                                           uint32_t pdus_capacity);
+
 extern char* sdls_get_error_code_enum_string(int32_t crypto_error_code);
 
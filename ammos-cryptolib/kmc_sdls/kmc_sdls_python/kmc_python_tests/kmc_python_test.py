@@ -11,8 +11,30 @@
 #foreign persons.
 
 import unittest
+import unittest.mock
+import asyncio
+import threading
 import binascii
+import os
+import tempfile
+import pickle
+import json
 from gov.nasa.jpl.ammos.kmc.sdlsclient import KmcSdlsClient
+from gov.nasa.jpl.ammos.kmc.sdlsclient.FrameArchive import FrameArchive
+from gov.nasa.jpl.ammos.kmc.sdlsclient import KmcSdlsDemux
+from gov.nasa.jpl.ammos.kmc.sdlsclient import FrameHeaders
+from gov.nasa.jpl.ammos.kmc.sdlsclient.LatencyHistogram import LatencyHistogram
+from gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsMetrics import KmcSdlsMetrics
+from gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsProfiler import KmcSdlsProfiler
+from gov.nasa.jpl.ammos.kmc.sdlsclient import FrameGenerator
+from gov.nasa.jpl.ammos.kmc.sdlsclient import KmcSdlsBulk
+from gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsPool import KmcSdlsPool
+from gov.nasa.jpl.ammos.kmc.sdlsclient import AsyncKmcSdlsClient
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 cryptolib_inmemory_default_config = ['cryptolib.sadb.type=inmemory','cryptolib.crypto.type=libgcrypt','cryptolib.process_tc.ignore_antireplay=true',
                                'cryptolib.process_tc.ignore_sa_state=true','cryptolib.process_tc.process_pdus=false',
@@ -44,6 +66,13 @@ cryptolib_inmemory_invalid_config = ['cryptolib.sadb.type=inmemory','cryptolib.c
                                      'cryptolib.tc.3.0.0.has_pus_header=true',
                                      'cryptolib.tc.3.0.0.max_frame_length=1024']
 
+def _secured_tc_frame(test, client):
+    # Applies security to a short TC frame, skipping the test when CryptoLib has no usable SA for it
+    try:
+        return client.apply_security_tc(bytearray(binascii.unhexlify("2003040700000001")))
+    except KmcSdlsClient.SdlsClientException as e:
+        test.skipTest("CryptoLib could not secure the test frame: %s" % e)
+
 class TestConfigMethods(unittest.TestCase):
 
     def test_config_prop_init_cryptolib_defaults(self):
@@ -63,5 +92,700 @@ class TestConfigMethods(unittest.TestCase):
         print(process_result)
         #self.assertEqual("0001",process_result.tc_pdu.hex())
     '''
+
+class TestLazyFrameViews(unittest.TestCase):
+
+    def test_lazy_view_matches_eager_result(self):
+        k = KmcSdlsClient.KmcSdlsClient(cryptolib_inmemory_default_config)
+        secured = _secured_tc_frame(self, k)
+        eager = k.process_security_tc(bytearray(secured))
+        view = k.process_security_tc(bytearray(secured), lazy=True)
+        self.assertEqual((eager.tc_header.scid, eager.tc_header.vcid), (view.tc_header.scid, view.tc_header.vcid))
+        self.assertIsInstance(view.tc_pdu, memoryview)
+        self.assertEqual(bytes(eager.tc_pdu), bytes(view.tc_pdu))
+        self.assertEqual(eager.materialize(), view.materialize())
+        view.release()
+        view.release()
+
+    def test_tm_view_reads_native_struct_fields(self):
+        tm_result = KmcSdlsClient.kmc_python_c_sdls_interface.ffi.new("TM_t *")
+        tm_result.tm_header.scid = 255
+        tm_result.tm_header.vcfc = 200
+        tm_result.tm_sec_header.spi = 7
+        tm_result.tm_pdu[0:4] = b"\x01\x02\x03\x04"
+        tm_result.tm_pdu_len = 4
+        view = KmcSdlsClient.TM_FrameView(tm_result)
+        self.assertEqual((255, 200, 7), (view.tm_header.scid, view.tm_header.vcfc, view.tm_security_header.spi))
+        self.assertEqual(b"\x01\x02\x03\x04", view.tm_pdu.tobytes())
+        materialized = view.materialize()
+        self.assertEqual((255, 200), (materialized.tm_header.scid, materialized.tm_header.vcfc))
+        self.assertEqual(b"\x01\x02\x03\x04", bytes(materialized.tm_pdu))
+        tm_result.tm_pdu[0] = 0xFF
+        self.assertEqual(0xFF, view.tm_pdu[0])
+
+class TestApplySecurityTcBatch(unittest.TestCase):
+
+    def test_batch_reports_each_frame(self):
+        k = KmcSdlsClient.KmcSdlsClient(cryptolib_inmemory_default_config)
+        secured = _secured_tc_frame(self, k)
+        frame = binascii.unhexlify("2003040700000001")
+        batch_result = k.apply_security_tc_batch([frame, memoryview(frame), b"\x20\x03"])
+        self.assertEqual(3, len(batch_result.status))
+        self.assertEqual(3, len(batch_result.offsets))
+        self.assertEqual(3, len(batch_result.lengths))
+        self.assertEqual([KmcSdlsClient.SUCCESS, KmcSdlsClient.SUCCESS], batch_result.status[:2])
+        self.assertNotEqual(KmcSdlsClient.SUCCESS, batch_result.status[2])
+        self.assertEqual(len(secured), len(batch_result.get_frame(0)))
+        self.assertEqual(len(secured), len(batch_result.get_frame(1)))
+        self.assertIsNone(batch_result.get_frame(2))
+
+    def test_empty_batch(self):
+        k = KmcSdlsClient.KmcSdlsClient(cryptolib_inmemory_default_config)
+        batch_result = k.apply_security_tc_batch([])
+        self.assertEqual((b"", [], [], []), (bytes(batch_result.frames), batch_result.offsets, batch_result.lengths,
+                                             batch_result.status))
+
+    def test_bad_batch_input(self):
+        k = KmcSdlsClient.KmcSdlsClient(cryptolib_inmemory_default_config)
+        with self.assertRaises(KmcSdlsClient.SdlsClientException) as cm:
+            k.apply_security_tc_batch(None)
+        self.assertEqual(KmcSdlsClient.SdlsClientException.NO_FRAME_DATA, cm.exception.get_error_code())
+        with self.assertRaises(KmcSdlsClient.SdlsClientException) as cm:
+            k.apply_security_tc_batch([binascii.unhexlify("2003040700000001"), "2003040700000001"])
+        self.assertEqual(KmcSdlsClient.SdlsClientException.BAD_DATA_FORMAT, cm.exception.get_error_code())
+
+class TestScratchStructPool(unittest.TestCase):
+
+    def test_results_survive_struct_reuse(self):
+        k = KmcSdlsClient.KmcSdlsClient(cryptolib_inmemory_default_config, scratch_pool_size=1)
+        secured_frames = [_secured_tc_frame(self, k) for _ in range(3)]
+        try:
+            result = k.process_security_tc(bytearray(secured_frames[0]))
+        except KmcSdlsClient.SdlsClientException as e:
+            self.skipTest("CryptoLib could not process the test frame: %s" % e)
+        expected = (result.tc_header, bytes(result.tc_pdu))
+        view = k.process_security_tc(bytearray(secured_frames[1]), lazy=True)
+        view_pdu = bytes(view.tc_pdu)
+        k.process_security_tc(bytearray(secured_frames[2]))
+        self.assertEqual(expected, (result.tc_header, bytes(result.tc_pdu)))
+        self.assertEqual(view_pdu, bytes(view.tc_pdu))
+        # One struct for the eager results plus the one the lazy view holds
+        self.assertEqual(2, k._tc_pool.allocations)
+        view.release()
+        # The released struct is reused even when CryptoLib rejects the replayed frame
+        try:
+            k.process_security_tc(bytearray(secured_frames[0]))
+        except KmcSdlsClient.SdlsClientException:
+            pass
+        self.assertEqual(2, k._tc_pool.allocations)
+
+class TestApplySecurityTcInto(unittest.TestCase):
+
+    def test_apply_into_caller_buffer(self):
+        k = KmcSdlsClient.KmcSdlsClient(cryptolib_inmemory_default_config)
+        secured = _secured_tc_frame(self, k)
+        output_buffer = bytearray(b"\xAA" * 2048)
+        tc_len_out = k.apply_security_tc_into(binascii.unhexlify("2003040700000001"),
+                                              memoryview(output_buffer)[1024:])
+        self.assertEqual(len(secured), tc_len_out)
+        self.assertEqual(b"\xAA" * 1024, output_buffer[:1024])
+        self.assertEqual(b"\x20\x03", output_buffer[1024:1026])
+
+    def test_output_buffer_too_small(self):
+        k = KmcSdlsClient.KmcSdlsClient(cryptolib_inmemory_default_config)
+        with self.assertRaises(KmcSdlsClient.SdlsClientException) as cm:
+            k.apply_security_tc_into(binascii.unhexlify("2003040700000001"), bytearray(16))
+        self.assertEqual(KmcSdlsClient.SdlsClientException.OUTPUT_BUFFER_TOO_SMALL, cm.exception.get_error_code())
+        with self.assertRaises(KmcSdlsClient.SdlsClientException) as cm:
+            k.apply_security_tc_into(binascii.unhexlify("2003040700000001"), bytes(1024))
+        self.assertEqual(KmcSdlsClient.SdlsClientException.BAD_DATA_FORMAT, cm.exception.get_error_code())
+
+class TestBufferProtocolFrames(unittest.TestCase):
+
+    def test_apply_tc_accepts_any_bytes_like(self):
+        k = KmcSdlsClient.KmcSdlsClient(cryptolib_inmemory_default_config)
+        secured = _secured_tc_frame(self, k)
+        frame = binascii.unhexlify("2003040700000001")
+        for input_frame in (frame, memoryview(frame), bytearray(frame)):
+            self.assertEqual(len(secured), len(k.apply_security_tc(input_frame)))
+        self.assertEqual(frame, binascii.unhexlify("2003040700000001"))
+
+    def test_in_place_requires_writable_frame(self):
+        k = KmcSdlsClient.KmcSdlsClient(cryptolib_inmemory_default_config)
+        frame = binascii.unhexlify("003000001800") + bytes(122)
+        with self.assertRaises(KmcSdlsClient.SdlsClientException) as cm:
+            k.apply_security_tm(frame, in_place=True)
+        self.assertEqual(KmcSdlsClient.SdlsClientException.BAD_DATA_FORMAT, cm.exception.get_error_code())
+        with self.assertRaises(KmcSdlsClient.SdlsClientException) as cm:
+            k.apply_security_aos(memoryview(frame), in_place=True)
+        self.assertEqual(KmcSdlsClient.SdlsClientException.BAD_DATA_FORMAT, cm.exception.get_error_code())
+
+    def test_in_place_returns_input_frame(self):
+        k = KmcSdlsClient.KmcSdlsClient(cryptolib_inmemory_default_config)
+        frame = bytearray(binascii.unhexlify("003000001800") + bytes(122))
+        try:
+            output_frame = k.apply_security_tm(frame, in_place=True)
+        except KmcSdlsClient.SdlsClientException as e:
+            self.skipTest("CryptoLib could not secure the test frame: %s" % e)
+        self.assertIs(frame, output_frame)
+        self.assertEqual(128, len(frame))
+
+class TestTrySecurityMethods(unittest.TestCase):
+
+    def test_try_process_security_returns_failure_status(self):
+        k = KmcSdlsClient.KmcSdlsClient(cryptolib_inmemory_default_config)
+        status, frame = k.try_process_security_tc(bytearray(b"\x20\x03\x04"))
+        self.assertNotEqual(KmcSdlsClient.SUCCESS, status)
+        self.assertIsNone(frame)
+        name = KmcSdlsClient.sdls_error_name(status)
+        self.assertTrue(name)
+        with self.assertRaises(KmcSdlsClient.SdlsClientException) as cm:
+            k.process_security_tc(bytearray(b"\x20\x03\x04"))
+        self.assertEqual(status, cm.exception.get_error_code())
+        self.assertIn(name, str(cm.exception))
+
+    def test_process_security_tc_copies_read_only_frames(self):
+        k = KmcSdlsClient.KmcSdlsClient(cryptolib_inmemory_default_config)
+        frame = b"\x20\x03\x04"
+        self.assertEqual(k.try_process_security_tc(bytearray(frame)), k.try_process_security_tc(frame))
+        self.assertEqual(b"\x20\x03\x04", frame)
+        with self.assertRaises(KmcSdlsClient.SdlsClientException) as cm:
+            k.try_process_security_tc(5)
+        self.assertEqual(KmcSdlsClient.SdlsClientException.BAD_DATA_FORMAT, cm.exception.get_error_code())
+
+class TestFrameGvcid(unittest.TestCase):
+
+    def test_frame_gvcid_decodes_each_frame_type(self):
+        self.assertEqual((0, 44, 1), KmcSdlsClient.frame_gvcid('tc', binascii.unhexlify("202c040800")))
+        self.assertEqual((1, 255, 0), KmcSdlsClient.frame_gvcid('tm', binascii.unhexlify("4ff000000000")))
+        self.assertEqual((1, 255, 0), KmcSdlsClient.frame_gvcid('aos', binascii.unhexlify("7fc000000000")))
+        self.assertIsNone(KmcSdlsClient.frame_gvcid('tc', b'\x20\x2c'))
+
+class _RejectingManagedParameterLib:
+    # Stands in for the native lib: every call goes through, except that managed parameters are rejected
+    def __init__(self, lib):
+        self.lib = lib
+
+    def __getattr__(self, name):
+        return getattr(self.lib, name)
+
+    def sdls_config_add_gvcid_managed_parameter(self, *args):
+        return -1
+
+class TestKmcSdlsConfig(unittest.TestCase):
+
+    def test_config_compiles_managed_parameters_once(self):
+        config = KmcSdlsClient.KmcSdlsConfig.from_properties(cryptolib_inmemory_default_config)
+        self.assertIs(config, KmcSdlsClient.KmcSdlsConfig.from_properties(list(cryptolib_inmemory_default_config)))
+        self.assertEqual(KmcSdlsClient.GvcidManagedParameters('tc', 0, 3, 1, 1, 1, 1024),
+                         config.managed_parameters[('tc', 0, 3, 1)])
+        self.assertEqual(2, config.cryptolib.sadb_type)
+        self.assertEqual(0x3F, config.cryptolib.vcid_bitmask)
+
+    def test_config_pickles_without_native_state(self):
+        config = KmcSdlsClient.KmcSdlsConfig(kmc_mmt_inmemory_default_config)
+        copy = pickle.loads(pickle.dumps(config))
+        self.assertEqual(config, copy)
+        self.assertEqual(config.managed_parameters, copy.managed_parameters)
+
+    def test_config_diff_separates_additions_from_restarts(self):
+        config = KmcSdlsClient.KmcSdlsConfig(kmc_mmt_inmemory_default_config[:-4])
+        added = config.diff(KmcSdlsClient.KmcSdlsConfig(kmc_mmt_inmemory_default_config))
+        self.assertEqual([('tc', 0, 44, 0)], [mp[:4] for mp in added.added_managed_parameters])
+        self.assertFalse(added.requires_restart)
+        restart = config.diff(KmcSdlsClient.KmcSdlsConfig(config.properties + ('cryptolib.sadb.mariadb.port=3307',)))
+        self.assertEqual(('sadb_mariadb',), restart.restart_reasons)
+
+    def test_cached_config_checks_certificate_files_again(self):
+        with tempfile.TemporaryDirectory() as directory:
+            properties = list(cryptolib_inmemory_default_config)
+            for name in ("clientcert", "clientkey", "cacert"):
+                path = os.path.join(directory, name + ".pem")
+                open(path, "w").close()
+                section = "tls" if name == "cacert" else "mtls"
+                properties.append("cryptolib.sadb.mariadb.%s.%s=%s" % (section, name, path))
+            config = KmcSdlsClient.KmcSdlsConfig.from_properties(properties)
+            self.assertIs(config, KmcSdlsClient.KmcSdlsConfig.from_properties(properties))
+            os.remove(os.path.join(directory, "clientkey.pem"))
+            with self.assertRaises(KmcSdlsClient.SdlsClientException) as cm:
+                KmcSdlsClient.KmcSdlsConfig.from_properties(properties)
+        self.assertEqual(KmcSdlsClient.SdlsClientException.FILE_DOESNT_EXIST, cm.exception.get_error_code())
+
+    def test_mtls_without_cacert_passes_no_ca_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            properties = list(cryptolib_inmemory_default_config)
+            for name in ("clientcert", "clientkey", "ca-bundle"):
+                open(os.path.join(directory, name + ".pem"), "w").close()
+            properties.append("cryptolib.sadb.mariadb.mtls.clientcert=%s" % os.path.join(directory, "clientcert.pem"))
+            properties.append("cryptolib.sadb.mariadb.mtls.clientkey=%s" % os.path.join(directory, "clientkey.pem"))
+            with unittest.mock.patch.object(KmcSdlsClient, "_DEFAULT_CA_BUNDLE",
+                                            os.path.join(directory, "ca-bundle.pem")):
+                config = KmcSdlsClient.KmcSdlsConfig(properties)
+                os.remove(os.path.join(directory, "ca-bundle.pem"))
+                with self.assertRaises(KmcSdlsClient.SdlsClientException) as cm:
+                    KmcSdlsClient.KmcSdlsConfig(properties)
+        self.assertEqual(KmcSdlsClient.SdlsClientException.FILE_DOESNT_EXIST, cm.exception.get_error_code())
+        self.assertEqual("", config.sadb_mariadb.mysql_tls_ca)
+        self.assertTrue(config.sadb_mariadb.mysql_tls_verify_server)
+
+    def test_rejected_managed_parameters_fail_initialization(self):
+        native_interface = KmcSdlsClient.kmc_python_c_sdls_interface
+        with unittest.mock.patch.object(native_interface, "lib", _RejectingManagedParameterLib(native_interface.lib)):
+            with self.assertRaises(KmcSdlsClient.SdlsClientException) as cm:
+                KmcSdlsClient.KmcSdlsClient(cryptolib_inmemory_default_config)
+        self.assertEqual(-1, cm.exception.get_error_code())
+        self.assertIn("Unable to add managed parameters", str(cm.exception))
+
+    def test_managed_parameter_keys_match_on_their_prefix(self):
+        config = KmcSdlsClient.KmcSdlsConfig(cryptolib_inmemory_default_config +
+                                             ['cryptolib.tm.255.0.1.has_ecf.extra=true'])
+        self.assertTrue(config.managed_parameters[('tm', 1, 255, 0)].has_ecf)
+        with self.assertRaises(KmcSdlsClient.SdlsClientException) as cm:
+            KmcSdlsClient.KmcSdlsConfig(cryptolib_inmemory_default_config + ['cryptolib.tm.255.0.has_ecf=true'])
+        self.assertEqual(KmcSdlsClient.SdlsClientException.INVALID_MANAGED_PARAMETER_FORMAT,
+                         cm.exception.get_error_code())
+
+    def test_config_rejects_bad_boolean(self):
+        with self.assertRaises(KmcSdlsClient.SdlsClientException):
+            KmcSdlsClient.KmcSdlsConfig(cryptolib_inmemory_default_config + ['cryptolib.tc.has_pus_header=maybe'])
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_percentiles_keep_three_significant_figures(self):
+        h = LatencyHistogram()
+        for value in range(1, 100001):
+            h.record(value * 10)
+        self.assertEqual(100000, h.total_count)
+        for percentile, exact in ((50.0, 500000), (99.0, 990000), (99.9, 999000)):
+            self.assertAlmostEqual(exact, h.percentile_ns(percentile), delta=exact * 0.001)
+        self.assertEqual(1000000, h.percentile_ns(100.0))
+
+    def test_expected_interval_backfills_omitted_calls(self):
+        h = LatencyHistogram()
+        h.record_with_expected_interval(10000, 1000)
+        self.assertEqual(10, h.total_count)
+        self.assertEqual(1000, h.percentile_ns(0.0))
+
+class TestKmcSdlsMetrics(unittest.TestCase):
+
+    def test_metrics_group_frames_by_gvcid(self):
+        metrics = KmcSdlsMetrics()
+        tc = binascii.unhexlify("202c0408000001bd37")
+        for elapsed_ns in (1500, 3000, 100000):
+            metrics.record("apply", "tc", tc, len(tc), elapsed_ns)
+        metrics.record("apply", "tc", b"\x20", 1, 2000)
+        by_gvcid = {m.gvcid: m for m in metrics.snapshot()}
+        self.assertEqual(3, by_gvcid[(0, 44, 1)].frames)
+        self.assertEqual(27, by_gvcid[(0, 44, 1)].bytes_in)
+        self.assertEqual(1, by_gvcid[None].frames)
+        self.assertEqual((float("inf"), 3), by_gvcid[(0, 44, 1)].latency_buckets[-1])
+        self.assertIn('kmc_sdls_frames_total{operation="apply",frame_type="tc",tfvn="0",scid="44",vcid="1"} 3',
+                      metrics.prometheus_text())
+
+    def test_batch_records_frames_from_a_generator(self):
+        k = KmcSdlsClient.KmcSdlsClient(cryptolib_inmemory_default_config)
+        tc = binascii.unhexlify("202c0408000001bd37")
+        k.apply_security_tc_batch(bytearray(tc) for _ in range(2))
+        by_gvcid = {m.gvcid: m for m in k.metrics.snapshot()}
+        self.assertEqual(2, by_gvcid[(0, 44, 1)].frames)
+        self.assertEqual(18, by_gvcid[(0, 44, 1)].bytes_in)
+
+class TestKmcSdlsProfiler(unittest.TestCase):
+
+    def test_nested_calls_fold_into_outer_phases(self):
+        profiler = KmcSdlsProfiler()
+
+        def inner():
+            profiler.phase("native")
+
+        def outer():
+            profiler.phase("marshal")
+            profiler.wrap("inner", inner)()
+            profiler.phase("result")
+
+        profiler.wrap("outer", outer)()
+        profiler.wrap("outer", outer)()
+        summary = {(s.call, s.phase): s for s in profiler.summary()}
+        self.assertEqual({("outer", phase) for phase in ("validate", "marshal", "native", "result")}, set(summary))
+        self.assertEqual(2, summary[("outer", "native")].calls)
+        self.assertAlmostEqual(1.0, sum(s.share for s in summary.values()), places=6)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "trace.json")
+        profiler.write_chrome_trace(path)
+        with open(path) as f:
+            events = json.load(f)["traceEvents"]
+        self.assertEqual(2, sum(1 for e in events if e["name"] == "outer"))
+        self.assertTrue(all(e["ph"] == "X" for e in events))
+
+class TestFrameGenerator(unittest.TestCase):
+
+    def test_generated_frames_count_up_with_valid_fecf(self):
+        tc = FrameGenerator.FrameGenerator('tc', 44, 1, 9, fecf=False, payload=binascii.unhexlify("0001bd37"))
+        self.assertEqual("202c0408000001bd37", tc.next_frame().hex())
+        self.assertEqual("202c0408010001bd37", tc.next_frame().hex())
+        aos = FrameGenerator.FrameGenerator('aos', 255, 3, 128, first_count=0xFFFFFF)
+        frames = [aos.next_frame() for _ in range(2)]
+        self.assertEqual([0xFFFFFF, 0], [KmcSdlsClient.AOS_FramePrimaryHeader.from_bytes(f).vcfc for f in frames])
+        self.assertEqual((1, 255, 3), KmcSdlsClient.frame_gvcid('aos', frames[0]))
+        self.assertEqual([0, 0], [FrameGenerator.crc16(f) for f in frames])
+        buffer = bytearray(3 * 128)
+        self.assertEqual(3, FrameGenerator.FrameGenerator('aos', 255, 3, 128, first_count=0xFFFFFF).generate_into(buffer))
+        self.assertEqual(bytes(frames[1]), bytes(buffer[128:256]))
+
+class TestFrameSerialization(unittest.TestCase):
+
+    def test_primary_headers_round_trip(self):
+        for header_type, header_hex in ((KmcSdlsClient.TC_FramePrimaryHeader, "202c040800"),
+                                        (KmcSdlsClient.TM_FramePrimaryHeader, "4ff0a5c31abc"),
+                                        (KmcSdlsClient.AOS_FramePrimaryHeader, "7fc1123456a7")):
+            header = header_type.from_bytes(binascii.unhexlify(header_hex))
+            self.assertEqual(header_hex, header.hex())
+
+class TestCompactFrames(unittest.TestCase):
+
+    def test_compact_aos_reads_full_24_bit_vcfc(self):
+        ffi = KmcSdlsClient.kmc_python_c_sdls_interface.ffi
+        aos_result = ffi.new("AOS_t *")
+        aos_result.aos_header.tfvn = 1
+        aos_result.aos_header.scid = 255
+        aos_result.aos_header.vcid = 3
+        aos_result.aos_header.vcfc = -1  # 0xFFFFFF in the signed 24 bit field
+        aos_result.aos_sec_header.spi = 10
+        aos_result.aos_pdu[0:3] = b"\x01\x02\x03"
+        aos_result.aos_pdu_len = 3
+        compact = KmcSdlsClient.CompactAOS.from_struct(aos_result)
+        self.assertEqual(0xFFFFFF, compact.aos_header.vcfc)
+        self.assertEqual(0xFFFFFF, KmcSdlsClient.AOS_FrameView(aos_result).aos_header.vcfc)
+        self.assertEqual(b"\x01\x02\x03", compact.aos_pdu)
+        self.assertEqual(10, compact.aos_security_header.spi)
+        self.assertEqual(compact, pickle.loads(pickle.dumps(compact)))
+
+    def test_compact_tc_materializes_namedtuple(self):
+        ffi = KmcSdlsClient.kmc_python_c_sdls_interface.ffi
+        tc_result = ffi.new("TC_t *")
+        tc_result.tc_header.scid = 44
+        tc_result.tc_header.vcid = 1
+        tc_result.tc_header.fsn = 7
+        tc_result.tc_sec_header.spi = 1
+        tc_result.tc_sec_header.iv_field_len = 2
+        tc_result.tc_sec_header.iv[0:2] = b"\xaa\xbb"
+        tc_result.tc_pdu[0:2] = b"\x00\x01"
+        tc_result.tc_pdu_len = 2
+        compact = KmcSdlsClient.CompactTC.from_struct(tc_result)
+        tc = compact.materialize()
+        self.assertIsInstance(tc, KmcSdlsClient.TC)
+        self.assertEqual((44, 1, 7), (tc.tc_header.scid, tc.tc_header.vcid, tc.tc_header.fsn))
+        self.assertEqual(b"\xaa\xbb", tc.tc_security_header.iv)
+        self.assertEqual(b"\x00\x01", compact.tc_pdu)
+        self.assertEqual(tuple(tc), tuple(compact))
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestFrameHeaders(unittest.TestCase):
+
+    def test_decode_primary_headers_matches_namedtuple(self):
+        frames = [binascii.unhexlify(h) for h in ("4ff0a5c31abc", "4ff2000000000000", "4ff0", "4ff000000000")]
+        headers = FrameHeaders.decode_primary_headers('tm', frames)
+        self.assertEqual(tuple(KmcSdlsClient.TM_FramePrimaryHeader.from_bytes(frames[0])),
+                         tuple(int(v) for v in headers[0])[:-1])
+        self.assertEqual([6, 8, 2, 6], headers['frame_len'].tolist())
+        index = FrameHeaders.index_frames('tm', frames)
+        self.assertEqual({(1, 255, 0): [0, 3], (1, 255, 1): [1]}, {k: v.tolist() for k, v in index.items()})
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestFrameSummary(unittest.TestCase):
+
+    def test_summary_dtype_matches_native_struct(self):
+        ffi = KmcSdlsClient.kmc_python_c_sdls_interface.ffi
+        dtype = KmcSdlsClient.frame_summary_dtype()
+        self.assertEqual(ffi.sizeof("SdlsFrameSummary_t"), dtype.itemsize)
+        for name, _ in KmcSdlsClient.FRAME_SUMMARY_FIELDS:
+            self.assertEqual(ffi.offsetof("SdlsFrameSummary_t", name), dtype.fields[name][1])
+        summaries = ffi.new("SdlsFrameSummary_t[]", 1)
+        summaries[0].vcfc = 0xFFFFFF
+        summaries[0].status = -1
+        headers = numpy.frombuffer(ffi.buffer(summaries), dtype=dtype)
+        self.assertEqual(0xFFFFFF, int(headers['vcfc'][0]))
+        self.assertEqual(-1, int(headers['status'][0]))
+
+    def test_batch_summary_rejects_short_frame(self):
+        k = KmcSdlsClient.KmcSdlsClient(cryptolib_inmemory_default_config)
+        result = k.process_security_tc_batch([b"\x20\x03\x04"])
+        self.assertEqual(1, len(result.headers))
+        self.assertNotEqual(KmcSdlsClient.SUCCESS, int(result.status[0]))
+        self.assertEqual(0, int(result.pdu_lengths[0]))
+        self.assertIsNone(result.get_pdu(0))
+
+class TestKmcSdlsPool(unittest.TestCase):
+
+    def test_spi_affinity_skips_tm_secondary_header(self):
+        pool = KmcSdlsPool(cryptolib_inmemory_default_config, num_workers=2, affinity="spi")
+        self.addCleanup(pool.close)
+        spi_1 = binascii.unhexlify("4ff000000000" "0001" "00000000")
+        spi_1_after_secondary_header = binascii.unhexlify("4ff000008000" "03aabbcc" "0001" "0000")
+        spi_2 = binascii.unhexlify("4ff000000000" "0002" "00000000")
+        self.assertEqual(pool.worker_for('tm', spi_1), pool.worker_for('tm', spi_1_after_secondary_header))
+        self.assertNotEqual(pool.worker_for('tm', spi_1), pool.worker_for('tm', spi_2))
+
+    def test_rare_gvcid_frame_does_not_hold_back_results(self):
+        pool = KmcSdlsPool(cryptolib_inmemory_default_config, num_workers=2, chunk_size=8, max_in_flight=2)
+        self.addCleanup(pool.close)
+        consumed = []
+
+        def frames():
+            # One frame on VC 1, then only VC 0 frames, so VC 1's chunk never fills up
+            for idx in range(200):
+                consumed.append(idx)
+                yield binascii.unhexlify("4ff200000000" if idx == 0 else "4ff000000000") + bytes(58)
+
+        results = pool.imap("try_apply_security_tm", frames())
+        next(results)
+        self.assertLess(len(consumed), 200)
+        self.assertEqual(199, sum(1 for _ in results))
+
+class _FakeNativeClient:
+    # Stands in for the KmcSdlsClient on the native-call thread, recording every call in order
+    events = None
+    gate = None
+    stopped = None
+
+    def __init__(self, config, scratch_pool_size, metrics):
+        pass
+
+    def process_security_tc(self, frame):
+        self.events.append(bytes(frame))
+        if self.gate is not None:
+            self.gate.wait(10)
+        return bytes(frame)
+
+    def shutdown(self):
+        self.events.append("shutdown")
+        self.stopped.set()
+
+@unittest.skipIf(not hasattr(unittest, "IsolatedAsyncioTestCase"), "needs Python 3.8 or later")
+class TestAsyncKmcSdlsClient(getattr(unittest, "IsolatedAsyncioTestCase", unittest.TestCase)):
+
+    def setUp(self):
+        _FakeNativeClient.events = []
+        _FakeNativeClient.gate = None
+        _FakeNativeClient.stopped = threading.Event()
+        patcher = unittest.mock.patch.object(AsyncKmcSdlsClient, "KmcSdlsClient", _FakeNativeClient)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_aclose_completes_queued_frames_before_shutdown(self):
+        client = AsyncKmcSdlsClient.AsyncKmcSdlsClient(cryptolib_inmemory_default_config)
+        self.assertEqual(b"\x00", await client.process_security_tc(b"\x00"))
+        tasks = [asyncio.ensure_future(client.process_security_tc(bytes([i]))) for i in range(1, 4)]
+        await asyncio.sleep(0)
+        await client.aclose()
+        self.assertEqual([b"\x01", b"\x02", b"\x03"], await asyncio.gather(*tasks))
+        self.assertEqual([b"\x00", b"\x01", b"\x02", b"\x03", "shutdown"], _FakeNativeClient.events)
+        self.assertEqual(0, client.pending())
+        with self.assertRaises(KmcSdlsClient.SdlsClientException):
+            await client.process_security_tc(b"\x04")
+
+    async def test_aclose_cancels_only_frames_not_started(self):
+        _FakeNativeClient.gate = threading.Event()
+        client = AsyncKmcSdlsClient.AsyncKmcSdlsClient(cryptolib_inmemory_default_config)
+        running = asyncio.ensure_future(client.process_security_tc(b"\x00"))
+        while not _FakeNativeClient.events:
+            await asyncio.sleep(0.001)
+        queued = [asyncio.ensure_future(client.process_security_tc(bytes([i]))) for i in range(1, 3)]
+        await asyncio.sleep(0)
+        closing = asyncio.ensure_future(client.aclose(cancel_pending=True))
+        for _ in range(3):
+            await asyncio.sleep(0)
+        _FakeNativeClient.gate.set()
+        await closing
+        self.assertEqual(b"\x00", await running)
+        for task in queued:
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        self.assertEqual([b"\x00", "shutdown"], _FakeNativeClient.events)
+
+    async def test_aclose_cancels_frames_the_native_thread_takes_right_away(self):
+        _FakeNativeClient.gate = threading.Event()
+        client = AsyncKmcSdlsClient.AsyncKmcSdlsClient(cryptolib_inmemory_default_config)
+        running = asyncio.ensure_future(client.process_security_tc(b"\x00"))
+        while not _FakeNativeClient.events:
+            await asyncio.sleep(0.001)
+        queued = [asyncio.ensure_future(client.process_security_tc(bytes([i]))) for i in range(1, 3)]
+        await asyncio.sleep(0)
+        closing = asyncio.ensure_future(client.aclose(cancel_pending=True))
+        await asyncio.sleep(0)
+        # aclose has run up to its first await; let the native thread drain its queue before the loop runs again
+        _FakeNativeClient.gate.set()
+        self.assertTrue(_FakeNativeClient.stopped.wait(10))
+        await closing
+        self.assertEqual(b"\x00", await running)
+        for task in queued:
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        self.assertEqual([b"\x00", "shutdown"], _FakeNativeClient.events)
+        self.assertEqual(0, client.pending())
+
+class TestKmcSdlsBulk(unittest.TestCase):
+
+    def write_properties(self, directory, properties):
+        path = os.path.join(directory, "bulk.properties")
+        with open(path, "w") as f:
+            f.write("\n".join(properties) + "\n")
+        return path
+
+    def test_bad_properties_exit_with_error(self):
+        with tempfile.TemporaryDirectory() as directory:
+            properties = self.write_properties(directory, cryptolib_inmemory_default_config +
+                                               ['cryptolib.tc.has_pus_header=maybe'])
+            with self.assertRaises(SystemExit) as cm:
+                KmcSdlsBulk.main([os.path.join(directory, "frames.hex"), "-p", properties])
+        self.assertIn("invalid properties file", str(cm.exception.code))
+
+    def test_missing_or_malformed_frame_file_exits_with_error(self):
+        with tempfile.TemporaryDirectory() as directory:
+            properties = self.write_properties(directory, cryptolib_inmemory_default_config)
+            frames = os.path.join(directory, "frames.hex")
+            with self.assertRaises(SystemExit) as cm:
+                KmcSdlsBulk.main([frames, "-p", properties])
+            self.assertIn("frames.hex", str(cm.exception.code))
+            with open(frames, "w") as f:
+                f.write("202c0408zz\n")
+            with self.assertRaises(SystemExit) as cm:
+                KmcSdlsBulk.main([frames, "-p", properties])
+            self.assertIn("Invalid hex frame line", str(cm.exception.code))
+
+class TestFrameArchive(unittest.TestCase):
+
+    def write_archive(self, data):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "frames.bin")
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_archive_reads_back_written_frames(self):
+        frames = [binascii.unhexlify("4ff0%02x%02x1800" % (count, count)) + bytes([count]) * 58 for count in range(5)]
+        path = self.write_archive(b"HDR" + b"".join(frames))
+        with FrameArchive(path, frame_type='tm', frame_length=64, header_offset=3) as archive:
+            self.assertEqual(5, len(archive))
+            self.assertEqual(0, archive.trailing_bytes)
+            self.assertEqual(frames, [bytes(frame) for frame in archive])
+            self.assertEqual(frames[-1], bytes(archive[-1]))
+            self.assertEqual([3, 2], [len(batch) for batch in archive.batches(3)])
+            with self.assertRaises(IndexError):
+                archive[5]
+
+    def test_truncated_archive_ignores_partial_frame(self):
+        frames = [binascii.unhexlify("7fc00000%02x00" % count) + bytes(58) for count in range(3)]
+        path = self.write_archive(b"".join(frames)[:-10])
+        client = KmcSdlsClient.KmcSdlsClient(cryptolib_inmemory_default_config +
+                                             ['cryptolib.aos.255.0.1.has_ecf=true',
+                                              'cryptolib.aos.255.0.1.max_frame_length=64'])
+        with FrameArchive(path, client, frame_type='aos') as archive:
+            self.assertEqual(64, archive.frame_length)
+            self.assertEqual(2, len(archive))
+            self.assertEqual(54, archive.trailing_bytes)
+            self.assertEqual(frames[:2], [bytes(frame) for frame in archive])
+
+class _FakeTmBackend:
+    # Stands in for a KmcSdlsClient: TM frames whose last byte is 0xEE fail, the others come back as is
+    managed_parameters = {('tm', 1, 255, 0): None, ('tm', 1, 255, 1): None, ('tc', 0, 44, 1): None}
+
+    def process_security_tm(self, frame):
+        if frame[-1] == 0xEE:
+            raise KmcSdlsClient.SdlsClientException(KmcSdlsClient.SdlsClientException.PROCESS_SECURITY_EXCEPTION,
+                                                    "Fake failure")
+        return bytes(frame)
+
+class TestKmcSdlsDemux(unittest.TestCase):
+
+    vc0 = binascii.unhexlify("4ff000000000")
+    vc1 = binascii.unhexlify("4ff200000000")
+
+    def test_frames_route_to_their_gvcid_lane(self):
+        demux = KmcSdlsDemux.KmcSdlsDemux(_FakeTmBackend(), 'tm')
+        self.assertEqual({(1, 255, 0), (1, 255, 1)}, set(demux.lanes))
+        self.assertTrue(demux.submit(self.vc0))
+        self.assertTrue(demux.submit(self.vc1))
+        self.assertTrue(demux.submit(self.vc1))
+        drained = demux.drain()
+        self.assertEqual([((1, 255, 0), self.vc0, self.vc0), ((1, 255, 1), self.vc1, self.vc1),
+                          ((1, 255, 1), self.vc1, self.vc1)], drained)
+        stats = demux.stats()
+        self.assertEqual((1, 1, 0), (stats[(1, 255, 0)].enqueued, stats[(1, 255, 0)].processed,
+                                     stats[(1, 255, 0)].depth))
+        self.assertEqual(2, stats[(1, 255, 1)].processed)
+
+    def test_unknown_and_short_frames_go_to_reject_lane(self):
+        demux = KmcSdlsDemux.KmcSdlsDemux(_FakeTmBackend(), 'tm', max_rejected=1)
+        self.assertFalse(demux.submit(binascii.unhexlify("4ff400000000")))
+        self.assertEqual(KmcSdlsClient.SdlsClientException.UNKNOWN_GVCID, demux.rejected[-1][1].error_code)
+        self.assertFalse(demux.submit(b"\x4f"))
+        self.assertEqual(KmcSdlsClient.SdlsClientException.BAD_DATA_FORMAT, demux.rejected[-1][1].error_code)
+        reject = demux.stats()[KmcSdlsDemux.REJECT_LANE]
+        self.assertEqual((2, 1, 1), (reject.enqueued, reject.dropped, reject.depth))
+        self.assertEqual([], demux.drain())
+
+    def test_rounds_take_lane_batch_frames_round_robin(self):
+        demux = KmcSdlsDemux.KmcSdlsDemux(_FakeTmBackend(), 'tm', lane_batch=2)
+        for _ in range(3):
+            demux.submit(self.vc0)
+            demux.submit(self.vc1)
+        first = [gvcid[2] for gvcid, _, _ in demux.pump()]
+        second = [gvcid[2] for gvcid, _, _ in demux.pump()]
+        self.assertEqual([0, 0, 1, 1], first)
+        self.assertEqual([1, 0], second)
+        self.assertEqual([], demux.pump())
+
+    def test_frame_errors_are_counted_on_their_lane(self):
+        demux = KmcSdlsDemux.KmcSdlsDemux(_FakeTmBackend(), 'tm')
+        demux.submit(binascii.unhexlify("4ff0000000ee"))
+        demux.submit(self.vc0)
+        results = [result for _, _, result in demux.drain()]
+        self.assertIsInstance(results[0], KmcSdlsClient.SdlsClientException)
+        self.assertEqual(self.vc0, results[1])
+        stats = demux.stats()[(1, 255, 0)]
+        self.assertEqual((1, 1), (stats.processed, stats.errors))
+
+    def test_stop_delivers_every_queued_frame_to_sink(self):
+        delivered = []
+        demux = KmcSdlsDemux.KmcSdlsDemux(_FakeTmBackend(), 'tm',
+                                          sink=lambda gvcid, frame, result: delivered.append(gvcid))
+        with self.assertRaises(KmcSdlsClient.SdlsClientException):
+            KmcSdlsDemux.KmcSdlsDemux(_FakeTmBackend(), 'tm').start()
+        demux.start()
+        for _ in range(50):
+            demux.submit(self.vc0, block=True)
+            demux.submit(self.vc1, block=True)
+        demux.stop()
+        self.assertEqual(100, len(delivered))
+        self.assertEqual(0, sum(lane.depth for lane in demux.stats().values()))
+
+    def test_sink_failure_is_raised_by_stop_and_submit(self):
+        sink_called = threading.Event()
+        def failing_sink(gvcid, frame, result):
+            sink_called.set()
+            raise ValueError("Sink failure")
+        demux = KmcSdlsDemux.KmcSdlsDemux(_FakeTmBackend(), 'tm', sink=failing_sink)
+        demux.start()
+        demux.submit(self.vc0, block=True)
+        self.assertTrue(sink_called.wait(10))
+        with self.assertRaises(ValueError):
+            demux.stop()
+        with self.assertRaises(ValueError):
+            demux.submit(self.vc1)
+
+    def test_reconfigured_gvcid_gets_a_lane(self):
+        backend = _FakeTmBackend()
+        demux = KmcSdlsDemux.KmcSdlsDemux(backend, 'tm')
+        vc2 = binascii.unhexlify("4ff400000000")
+        self.assertFalse(demux.submit(vc2))
+        backend.managed_parameters = dict(_FakeTmBackend.managed_parameters)
+        backend.managed_parameters[('tm', 1, 255, 2)] = None
+        self.assertTrue(demux.submit(vc2))
+        self.assertEqual({(1, 255, 0), (1, 255, 1), (1, 255, 2)}, set(demux.lanes))
+        self.assertEqual([((1, 255, 2), vc2, vc2)], demux.drain())
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+
+#Copyright 2021, by the California Institute of Technology.
+#ALL RIGHTS RESERVED. United States Government Sponsorship acknowledged.
+#Any commercial use must be negotiated with the Office of Technology
+#Transfer at the California Institute of Technology.
+#
+#This software may be subject to U.S. export control laws. By accepting
+#this software, the user agrees to comply with all applicable U.S.
+#export laws and regulations. User has the responsibility to obtain
+#export licenses, or other export authority as may be required before
+#exporting such information to foreign countries or providing access to
+#foreign persons.
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+
+#Import the KMC SDLS Client and frame generator
+from gov.nasa.jpl.ammos.kmc.sdlsclient import KmcSdlsClient
+from gov.nasa.jpl.ammos.kmc.sdlsclient.FrameGenerator import FrameGenerator
+
+"""
+Benchmark suite for the Python SDLS client.
+
+'run' times apply and process security for TC, TM and AOS frames of several sizes, plus the TC frames of the
+kmc-resources test corpus, and writes the results as a JSON baseline. Every case is timed twice: through the
+KmcSdlsClient method, and as the bare CryptoLib call on buffers prepared up front. The difference is the cost of the
+Python layer (buffer checks, copies, result decoding). 'compare' reads two baselines and flags every case whose
+median client time grew by more than a threshold.
+"""
+
+BASELINE_SCHEMA = 1
+
+# inmemory SADB and libgcrypt, so the suite needs no MariaDB or KMC Crypto Service
+default_properties = ['cryptolib.sadb.type=inmemory', 'cryptolib.crypto.type=libgcrypt',
+                      'cryptolib.process_tc.ignore_antireplay=true', 'cryptolib.process_tc.ignore_sa_state=true',
+                      'cryptolib.process_tc.process_pdus=false', 'cryptolib.tc.vcid_bitmask=0x3F']
+
+# Unsecured frames per type: (tfvn, scid, vcid), security header space, trailer space (kmc_sdls_test_app.py). Each
+# frame size gets the next VCID up, so that every size can have managed parameters of its own.
+frame_layouts = {
+    "TC": ((0, 44, 1), 0, 0),
+    "TM": ((1, 255, 0), 14, 16),
+    "AOS": ((1, 255, 0), 14, 16),
+}
+
+corpus_frames = ("sdls-short-frame.dat", "sdls-long-frame.dat")
+
+
+def build_options_parser():
+    arg_parser=argparse.ArgumentParser(description='Benchmarks the KMC SDLS Python client against the inmemory SADB and libgcrypt, and compares stored JSON baselines')
+    subparsers = arg_parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    run_parser = subparsers.add_parser("run", help="Run the suite and write a JSON baseline")
+    run_parser.add_argument("-p", "--properties",
+                            dest="properties",
+                            help="Properties file to benchmark with instead of the built-in inmemory SADB + libgcrypt configuration",
+                            type=argparse.FileType('r'))
+    run_parser.add_argument("-o", "--output",
+                            dest="output",
+                            help="File the JSON baseline is written to (default: print it only)")
+    run_parser.add_argument("-t", "--types",
+                            dest="types",
+                            type=lambda s: [t.upper() for t in s.split(",")],
+                            default=["TC", "TM", "AOS"],
+                            help="Comma separated frame types to benchmark (default: TC,TM,AOS)")
+    run_parser.add_argument("-s", "--sizes",
+                            dest="sizes",
+                            type=lambda s: [int(v) for v in s.split(",")],
+                            default=[64, 256, 960],
+                            help="Comma separated unsecured frame sizes in bytes (default: 64,256,960)")
+    run_parser.add_argument("-n", "--iterations",
+                            dest="iterations",
+                            type=int,
+                            default=2000,
+                            help="Timed calls per case, after as many warmup calls")
+    run_parser.add_argument("-C", "--corpus",
+                            dest="corpus",
+                            default=(os.path.dirname(os.path.realpath(__file__))+"/../../../../kmc-resources/kmc-test/input"),
+                            help="Directory holding the sdls-short-frame.dat and sdls-long-frame.dat TC corpus")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare a result against a baseline")
+    compare_parser.add_argument("baseline", type=argparse.FileType('r'), help="Baseline JSON file")
+    compare_parser.add_argument("current", type=argparse.FileType('r'), help="JSON file of the run to check")
+    compare_parser.add_argument("-T", "--threshold",
+                                dest="threshold",
+                                type=float,
+                                default=10.0,
+                                help="Percent increase of the median client time flagged as a regression (default: 10)")
+    return arg_parser
+
+
+def managed_parameter(f_type, frame, max_frame_length):
+    tfvn, scid, vcid = KmcSdlsClient.frame_gvcid(f_type.lower(), frame)
+    prefix = "cryptolib.%s.%d.%d.%d." % (f_type.lower(), scid, vcid, tfvn)
+    return [prefix + "has_ecf=true", prefix + "has_segmentation_header=false",
+            prefix + "max_frame_length=%d" % max_frame_length]
+
+
+def sized_frame(f_type, size, vcid_offset=0):
+    # TC frames are secured without a FECF; TM and AOS frames carry one for CryptoLib to recompute
+    (tfvn, scid, vcid), security_header_len, trailer_len = frame_layouts[f_type]
+    try:
+        generator = FrameGenerator(f_type.lower(), scid, vcid + vcid_offset, size, tfvn=tfvn, fecf=f_type != "TC",
+                                   security_header_length=security_header_len, security_trailer_length=trailer_len)
+    except KmcSdlsClient.SdlsClientException as e:
+        raise SystemExit(str(e))
+    return generator.next_frame()
+
+
+def client_call(client, f_type, operation, frame):
+    # client.<operation>_security_<type> on a buffer allocated once, with the (untimed) setup that restores it from
+    # the template before each call, since CryptoLib may work in place on it
+    client_fn = getattr(client, "%s_security_%s" % (operation, f_type.lower()))
+    template = bytes(frame)
+    work = bytearray(template)
+
+    def setup():
+        work[:] = template
+    return setup, lambda: client_fn(work)
+
+
+def native_call(client, f_type, operation, frame):
+    # The bare CryptoLib call behind client.<operation>_security_<type>, on buffers allocated once, with the same
+    # setup as client_call
+    ffi = client.ffi
+    lib = KmcSdlsClient.kmc_python_c_sdls_interface.lib
+    template = ffi.new("uint8_t[]", bytes(frame))
+    length = len(frame)
+    work = ffi.new("uint8_t[]", length)
+
+    def setup():
+        ffi.memmove(work, template, length)
+
+    if f_type == "TC" and operation == "apply":
+        out = ffi.new("uint8_t[]", KmcSdlsClient.TC_MAX_FRAME_LENGTH)
+        out_len = ffi.new("uint16_t *")
+        return setup, lambda: lib.apply_security_tc_into(work, length, out, len(out), out_len)
+    if operation == "apply":
+        apply_fn = lib.apply_security_tm if f_type == "TM" else lib.apply_security_aos
+        return setup, lambda: apply_fn(work, length)
+    if f_type == "TC":
+        tc_len = ffi.new("int *")
+        tc_result = ffi.new("TC_t *")
+
+        def call():
+            tc_len[0] = length
+            return lib.process_security_tc(work, tc_len, tc_result)
+        return setup, call
+    process_fn = lib.process_security_tm if f_type == "TM" else lib.process_security_aos
+    result = ffi.new("TM_t *" if f_type == "TM" else "AOS_t *")
+    result_len = ffi.new("uint16_t *")
+    return setup, lambda: process_fn(work, length, result, result_len)
+
+
+def time_calls(setup, fn, iterations):
+    # Per-call samples in microseconds and the number of failed calls, after an untimed warmup. setup runs before
+    # every call, outside the timed region
+    errors = 0
+    for _ in range(iterations):
+        setup()
+        try:
+            fn()
+        except KmcSdlsClient.SdlsClientException:
+            pass
+    samples = []
+    clock = time.perf_counter
+    for _ in range(iterations):
+        setup()
+        start = clock()
+        try:
+            status = fn()
+        except KmcSdlsClient.SdlsClientException:
+            status = None
+        samples.append((clock() - start) * 1e6)
+        if status is None or (isinstance(status, int) and status != KmcSdlsClient.SUCCESS):
+            errors += 1
+    return samples, errors
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {"mean": sum(samples) / len(samples),
+            "p50": samples[len(samples) // 2],
+            "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))]}
+
+
+def bench_case(client, f_type, operation, frame, iterations):
+    client_samples, client_errors = time_calls(*client_call(client, f_type, operation, frame), iterations)
+    native_samples, native_errors = time_calls(*native_call(client, f_type, operation, frame), iterations)
+    total = summarize(client_samples)
+    native = summarize(native_samples)
+    return {"frame_type": f_type, "operation": operation, "frame_bytes": len(frame),
+            "client_us": total, "native_us": native, "marshal_us": total["p50"] - native["p50"],
+            "errors": client_errors + native_errors}
+
+
+def run_cases(client, base_properties, f_type, frames, iterations, results):
+    # frames: (case name, unsecured frame). Every frame gets managed parameters sized to it, since fixed-length TM and
+    # AOS frames must match their max_frame_length exactly, and the client is configured for all of them before any
+    # case is timed.
+    properties = list(base_properties)
+    for _, frame in frames:
+        max_frame_length = len(frame) if f_type != "TC" else KmcSdlsClient.TC_MAX_FRAME_LENGTH
+        properties.extend(p for p in managed_parameter(f_type, frame, max_frame_length) if p not in properties)
+    client.reconfigure(properties)
+    for name, frame in frames:
+        try:
+            secured = getattr(client, "apply_security_" + f_type.lower())(bytearray(frame))
+        except KmcSdlsClient.SdlsClientException as e:
+            print("  %-34s skipped, apply security failed: %s" % (name, e))
+            continue
+        for operation, case_frame in (("apply", frame), ("process", secured)):
+            case = bench_case(client, f_type, operation, case_frame, iterations)
+            case["source"] = name
+            key = "%s %s %s" % (f_type, operation, name)
+            results[key] = case
+            print("  %-34s %8.2f %8.2f %8.2f %8.2f%s" % (key, case["client_us"]["p50"], case["client_us"]["p99"],
+                                                       case["native_us"]["p50"], case["marshal_us"],
+                                                       "  (%d errors)" % case["errors"] if case["errors"] else ""))
+
+
+def run(cli_args):
+    if cli_args.properties:
+        base_properties = KmcSdlsClient.load_properties(cli_args.properties)
+    else:
+        base_properties = list(default_properties)
+    client = KmcSdlsClient.KmcSdlsClient(base_properties)
+    results = dict()
+    print("  %-34s %8s %8s %8s %8s" % ("case (us/frame)", "p50", "p99", "native", "python"))
+    try:
+        for f_type in cli_args.types:
+            frames = [("%dB" % size, sized_frame(f_type, size, idx)) for idx, size in enumerate(cli_args.sizes)]
+            if f_type == "TC":
+                for corpus_frame in corpus_frames:
+                    path = os.path.join(cli_args.corpus, corpus_frame)
+                    if os.path.exists(path):
+                        with open(path, "rb") as f:
+                            frames.append((corpus_frame, f.read()))
+                    else:
+                        print("  corpus frame %s not found, skipped" % path)
+            run_cases(client, base_properties, f_type, frames, cli_args.iterations, results)
+    finally:
+        client.shutdown()
+
+    config = KmcSdlsClient.KmcSdlsConfig.from_properties(base_properties)
+    baseline = {"schema": BASELINE_SCHEMA,
+                "created": datetime.datetime.utcnow().isoformat() + "Z",
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "sadb_type": config.cryptolib.sadb_type,
+                "cryptography_type": config.cryptolib.cryptography_type,
+                "iterations": cli_args.iterations,
+                "results": results}
+    if cli_args.output:
+        with open(cli_args.output, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print("Baseline written to %s" % cli_args.output)
+    return 0
+
+
+def compare(cli_args):
+    baseline = json.load(cli_args.baseline)
+    current = json.load(cli_args.current)
+    for doc, name in ((baseline, cli_args.baseline.name), (current, cli_args.current.name)):
+        if doc.get("schema") != BASELINE_SCHEMA:
+            raise SystemExit("%s is not a schema %d benchmark baseline" % (name, BASELINE_SCHEMA))
+
+    limit = 1.0 + cli_args.threshold / 100.0
+    regressions = 0
+    print("  %-34s %10s %10s %8s" % ("case (p50 us/frame)", "baseline", "current", "change"))
+    for key in sorted(set(baseline["results"]) | set(current["results"])):
+        if key not in current["results"] or key not in baseline["results"]:
+            print("  %-34s %s" % (key, "only in baseline" if key in baseline["results"] else "new case"))
+            continue
+        before = baseline["results"][key]["client_us"]["p50"]
+        after = current["results"][key]["client_us"]["p50"]
+        ratio = after / before if before > 0 else float("inf")
+        flag = ""
+        if ratio > limit:
+            regressions += 1
+            flag = "  REGRESSION"
+        print("  %-34s %10.2f %10.2f %+7.1f%%%s" % (key, before, after, (ratio - 1.0) * 100.0, flag))
+    print("%d regression(s) beyond %.1f%%" % (regressions, cli_args.threshold))
+    return 1 if regressions else 0
+
+
+def main():
+    cli_args = build_options_parser().parse_args()
+    if cli_args.command == "run":
+        return run(cli_args)
+    return compare(cli_args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+
+#Copyright 2021, by the California Institute of Technology.
+#ALL RIGHTS RESERVED. United States Government Sponsorship acknowledged.
+#Any commercial use must be negotiated with the Office of Technology
+#Transfer at the California Institute of Technology.
+#
+#This software may be subject to U.S. export control laws. By accepting
+#this software, the user agrees to comply with all applicable U.S.
+#export laws and regulations. User has the responsibility to obtain
+#export licenses, or other export authority as may be required before
+#exporting such information to foreign countries or providing access to
+#foreign persons.
+
+import argparse
+import binascii
+import itertools
+import os
+import random
+import time
+
+#Import the KMC SDLS Client, process pool and latency histogram
+from gov.nasa.jpl.ammos.kmc.sdlsclient import KmcSdlsClient
+from gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsPool import KmcSdlsPool
+from gov.nasa.jpl.ammos.kmc.sdlsclient.LatencyHistogram import LatencyHistogram
+
+"""
+Open-loop load generator for the KMC SDLS client.
+
+Frames are scheduled at fixed times, target rate apart, whether or not earlier frames have completed. Each frame's
+response time is measured from its scheduled send time, so time spent queued behind a slow call counts against the
+frames that waited, the way an uplink or downlink arriving at a fixed rate would see it. The service time, measured
+from when the call actually started, is what a closed-loop timer such as performance_test reports; it is shown
+both raw and with HdrHistogram's coordinated-omission correction for comparison.
+"""
+
+# Default unsecured frames, matching kmc_sdls_test_app.py
+default_frames = {
+    "TC": "202c0408000001bd37",
+    "TM": "4ff000000000" + "00" * 14 + "ff" * 60 + "00" * 16,
+    "AOS": "7fc000000000" + "00" * 14 + "ff" * 60 + "00" * 16,
+}
+
+# Uplink commands are secured, downlink telemetry is processed, unless a mix entry names the operation
+default_operations = {"TC": "apply", "TM": "process", "AOS": "process"}
+
+report_percentiles = (50.0, 90.0, 99.0, 99.9)
+
+
+def build_options_parser():
+    arg_parser=argparse.ArgumentParser(description='Drives the KMC SDLS client at a fixed frame rate and reports latency percentiles')
+    arg_parser.add_argument("-p", "--properties",
+                            dest="properties",
+                            help="The properties file that contains all the configuration needed by this application (supported properties defined in KMC SIS)",
+                            default=(os.path.dirname(os.path.realpath(__file__))+"/../etc/kmc_sdls_test_app.properties"),
+                            type=argparse.FileType('r'))
+    arg_parser.add_argument("-r", "--rate",
+                            dest="rate",
+                            type=float,
+                            default=1000.0,
+                            help="Target frames per second across the whole mix")
+    arg_parser.add_argument("-d", "--duration",
+                            dest="duration",
+                            type=float,
+                            default=10.0,
+                            help="Seconds of load to schedule")
+    arg_parser.add_argument("-m", "--mix",
+                            dest="mix",
+                            type=parse_mix,
+                            default=parse_mix("TC=1"),
+                            help="Comma separated TYPE[:apply|process]=weight entries, e.g. TC=1,TM:process=4. "
+                                 "TC defaults to apply (uplink), TM and AOS to process (downlink). Default: TC=1")
+    arg_parser.add_argument("-f", "--frame",
+                            dest="frames",
+                            action="append",
+                            default=[],
+                            help="TYPE=hex override of an unsecured frame, e.g. TM=4ff0... May be repeated")
+    arg_parser.add_argument("-w", "--workers",
+                            dest="workers",
+                            type=int,
+                            default=0,
+                            help="Drive a KmcSdlsPool of this many worker processes instead of a single KmcSdlsClient")
+    arg_parser.add_argument("-b", "--max-batch",
+                            dest="max_batch",
+                            type=int,
+                            default=64,
+                            help="With a pool, most frames handed over per round when the schedule has fallen behind")
+    arg_parser.add_argument("-s", "--seed",
+                            dest="seed",
+                            type=int,
+                            default=0,
+                            help="Seed of the random frame mix, so runs schedule the same sequence")
+    arg_parser.add_argument("-H", "--histogram",
+                            dest="histogram",
+                            help="Write the response time percentile distribution of every stream to this file")
+    return arg_parser
+
+
+def parse_mix(spec):
+    mix = []
+    for entry in spec.split(","):
+        stream, _, weight = entry.partition("=")
+        f_type, _, operation = stream.upper().partition(":")
+        operation = operation.lower() or default_operations.get(f_type)
+        if f_type not in default_operations or operation not in ("apply", "process"):
+            raise argparse.ArgumentTypeError("Unknown mix entry '%s', expected TYPE[:apply|process]=weight" % entry)
+        mix.append(((f_type, operation), float(weight or 1)))
+    return mix
+
+
+class StreamStats:
+
+    def __init__(self):
+        self.response = LatencyHistogram()  # from scheduled send time to completion
+        self.service = LatencyHistogram()  # from actual call start to completion
+        self.service_corrected = LatencyHistogram()  # service time with HdrHistogram's expected-interval correction
+        self.errors = 0
+
+
+def build_schedule(mix, rate, duration, seed):
+    # (scheduled offset in seconds, stream) for every frame of the run
+    rng = random.Random(seed)
+    streams = [stream for stream, _ in mix]
+    weights = list(itertools.accumulate(weight for _, weight in mix))
+    num_frames = int(rate * duration)
+    chosen = [streams[next(i for i, w in enumerate(weights) if pick < w)]
+              for pick in (rng.random() * weights[-1] for _ in range(num_frames))]
+    return [(i / rate, stream) for i, stream in enumerate(chosen)]
+
+
+def wait_until(deadline, clock):
+    remaining = deadline - clock()
+    if remaining > 0.002:
+        time.sleep(remaining - 0.001)
+    while clock() < deadline:
+        pass
+
+
+def run_client(client, schedule, frames, stats, intervals_ns):
+    clock = time.perf_counter
+    methods = {stream: getattr(client, "%s_security_%s" % (stream[1], stream[0].lower())) for stream in frames}
+    start = clock()
+    for offset, stream in schedule:
+        scheduled = start + offset
+        wait_until(scheduled, clock)
+        call_start = clock()
+        try:
+            methods[stream](bytearray(frames[stream]))
+        except KmcSdlsClient.SdlsClientException:
+            stats[stream].errors += 1
+        done = clock()
+        record(stats[stream], scheduled, call_start, done, intervals_ns[stream])
+    return clock() - start
+
+
+def run_pool(pool, schedule, frames, stats, intervals_ns, max_batch):
+    # Every round hands the pool all frames already due (up to max_batch), one imap() per stream
+    clock = time.perf_counter
+    start = clock()
+    next_idx = 0
+    while next_idx < len(schedule):
+        wait_until(start + schedule[next_idx][0], clock)
+        now = clock() - start
+        batch_end = next_idx + 1
+        while batch_end < len(schedule) and batch_end - next_idx < max_batch and schedule[batch_end][0] <= now:
+            batch_end += 1
+        by_stream = dict()
+        for offset, stream in schedule[next_idx:batch_end]:
+            by_stream.setdefault(stream, []).append(start + offset)
+        next_idx = batch_end
+        for stream, scheduled_times in by_stream.items():
+            call_start = clock()
+            operation = "%s_security_%s" % (stream[1], stream[0].lower())
+            results = pool.imap(operation, itertools.repeat(frames[stream], len(scheduled_times)),
+                                return_exceptions=True)
+            for scheduled, result in zip(scheduled_times, results):
+                if isinstance(result, Exception):
+                    stats[stream].errors += 1
+                record(stats[stream], scheduled, call_start, clock(), intervals_ns[stream])
+    return clock() - start
+
+
+def record(stream_stats, scheduled, call_start, done, interval_ns):
+    stream_stats.response.record((done - scheduled) * 1e9)
+    service_ns = (done - call_start) * 1e9
+    stream_stats.service.record(service_ns)
+    stream_stats.service_corrected.record_with_expected_interval(service_ns, interval_ns)
+
+
+def print_histogram_row(name, histogram):
+    percentiles = histogram.percentiles_ns(report_percentiles)
+    print("  %-26s %9d %s %10.1f" % (name, histogram.total_count,
+                                      " ".join("%10.1f" % (percentiles[p] / 1e3) for p in report_percentiles),
+                                      histogram.max_ns / 1e3))
+
+
+def main():
+    cli_args = build_options_parser().parse_args()
+    kmc_sdls_props = KmcSdlsClient.load_properties(cli_args.properties)
+    frame_hex = dict(default_frames)
+    for override in cli_args.frames:
+        f_type, _, hex_frame = override.partition("=")
+        frame_hex[f_type.upper()] = hex_frame
+
+    schedule = build_schedule(cli_args.mix, cli_args.rate, cli_args.duration, cli_args.seed)
+    streams = [stream for stream, _ in cli_args.mix]
+    stats = {stream: StreamStats() for stream in streams}
+    # Calls per stream are meant to start this often, on average, for the coordinated-omission correction
+    total_weight = sum(weight for _, weight in cli_args.mix)
+    intervals_ns = {stream: 1e9 / (cli_args.rate * weight / total_weight) for stream, weight in cli_args.mix}
+
+    if cli_args.workers > 0:
+        backend = KmcSdlsPool(kmc_sdls_props, num_workers=cli_args.workers)
+        apply_fn = lambda f_type, frame: backend.map("apply_security_" + f_type.lower(), [frame])[0]
+    else:
+        backend = KmcSdlsClient.KmcSdlsClient(kmc_sdls_props)
+        apply_fn = lambda f_type, frame: getattr(backend, "apply_security_" + f_type.lower())(frame)
+    try:
+        # Process streams run on frames secured up front
+        frames = dict()
+        for f_type, operation in streams:
+            frame = bytearray(binascii.unhexlify(frame_hex[f_type]))
+            frames[(f_type, operation)] = bytes(apply_fn(f_type, frame) if operation == "process" else frame)
+
+        print("Scheduling %d frames at %.1f frames/s over %.1f s on %s" % (
+            len(schedule), cli_args.rate, cli_args.duration,
+            "a pool of %d workers" % cli_args.workers if cli_args.workers > 0 else "one KmcSdlsClient"))
+        if cli_args.workers > 0:
+            elapsed = run_pool(backend, schedule, frames, stats, intervals_ns, cli_args.max_batch)
+        else:
+            elapsed = run_client(backend, schedule, frames, stats, intervals_ns)
+    finally:
+        if cli_args.workers > 0:
+            backend.close()
+        else:
+            backend.shutdown()
+
+    completed = sum(s.response.total_count for s in stats.values())
+    print("Achieved %.1f frames/s (target %.1f), %d frames in %.2f s, %d errors" % (
+        completed / elapsed, cli_args.rate, completed, elapsed, sum(s.errors for s in stats.values())))
+    print("  %-26s %9s %s %10s" % ("latency (us)", "count", " ".join("%10s" % ("p%g" % p) for p in report_percentiles),
+                                   "max"))
+    for stream in streams:
+        name = "%s %s" % stream
+        print_histogram_row(name + " response", stats[stream].response)
+        print_histogram_row(name + " service", stats[stream].service)
+        print_histogram_row(name + " service (CO)", stats[stream].service_corrected)
+    if cli_args.histogram:
+        with open(cli_args.histogram, "w") as f:
+            for stream in streams:
+                f.write("# %s %s response time\n%12s %14s %10s %14s\n" % (stream + ("Value(us)", "Percentile",
+                                                                                   "TotalCount", "1/(1-Percentile)")))
+                for value_ns, percentile, count in stats[stream].response.percentile_distribution():
+                    inverse = 1.0 / (1.0 - percentile / 100.0) if percentile < 100.0 else float("inf")
+                    f.write("%12.3f %14.12f %10d %14.2f\n" % (value_ns / 1e3, percentile / 100.0, count, inverse))
+        print("Response time distributions written to %s" % cli_args.histogram)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+#Copyright 2021, by the California Institute of Technology.
+#ALL RIGHTS RESERVED. United States Government Sponsorship acknowledged.
+#Any commercial use must be negotiated with the Office of Technology
+#Transfer at the California Institute of Technology.
+#
+#This software may be subject to U.S. export control laws. By accepting
+#this software, the user agrees to comply with all applicable U.S.
+#export laws and regulations. User has the responsibility to obtain
+#export licenses, or other export authority as may be required before
+#exporting such information to foreign countries or providing access to
+#foreign persons.
+
+import argparse
+import binascii
+import os
+import time
+
+#Import the KMC SDLS Client and process pool
+from gov.nasa.jpl.ammos.kmc.sdlsclient import KmcSdlsClient
+from gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsPool import KmcSdlsPool
+
+# Default unsecured frames, matching kmc_sdls_test_app.py
+default_frames = {
+    "TC": "202c0408000001bd37",
+    "TM": "4ff000000000" + "00" * 14 + "ff" * 60 + "00" * 16,
+    "AOS": "7fc000000000" + "00" * 14 + "ff" * 60 + "00" * 16,
+}
+
+
+def build_options_parser():
+    arg_parser=argparse.ArgumentParser(description='Measures KmcSdlsPool throughput (frames/s) as the worker count grows from 1 to all cores')
+    arg_parser.add_argument("-p", "--properties",
+                            dest="properties",
+                            help="The properties file that contains all the configuration needed by the KmcSdlsClient workers",
+                            default=(os.path.dirname(os.path.realpath(__file__))+"/../etc/kmc_sdls_test_app.properties"),
+                            type=argparse.FileType('r'))
+    arg_parser.add_argument("-t", "--type",
+                            dest="type",
+                            choices=["TC", "TM", "AOS"],
+                            type=str.upper,
+                            default="TC",
+                            help="Frame type, choice between TC (default), TM, and AOS")
+    arg_parser.add_argument("-f", "--frame",
+                            dest="frame",
+                            help="Hex frame string of the unsecured transfer frame to benchmark with")
+    arg_parser.add_argument("-V", "--vcids",
+                            dest="vcids",
+                            type=lambda s: [int(v) for v in s.split(",")],
+                            help="Comma separated VC IDs to spread frames over. Frames are pinned to workers by GVCID, "
+                                 "so scaling requires at least as many configured VC IDs as workers. Defaults to the frame's own VC ID")
+    arg_parser.add_argument("-n", "--num-frames",
+                            dest="num_frames",
+                            type=int,
+                            default=20000,
+                            help="Number of frames pushed through the pool per run")
+    arg_parser.add_argument("-w", "--max-workers",
+                            dest="max_workers",
+                            type=int,
+                            default=os.cpu_count() or 1,
+                            help="Largest worker count measured (default: all cores)")
+    arg_parser.add_argument("-c", "--chunk-size",
+                            dest="chunk_size",
+                            type=int,
+                            default=32,
+                            help="Frames per inter-process message")
+    arg_parser.add_argument("-P", "--process",
+                            dest="process",
+                            action='store_true',
+                            help="Benchmark process security on frames secured up front, instead of apply security")
+    return arg_parser
+
+
+def with_vcid(frame, f_type, vcid):
+    frame = bytearray(frame)
+    if f_type == "TC":
+        frame[2] = (frame[2] & 0x03) | (vcid << 2)
+    elif f_type == "TM":
+        frame[1] = (frame[1] & 0xF1) | ((vcid & 0x07) << 1)
+    else:
+        frame[1] = (frame[1] & 0xC0) | (vcid & 0x3F)
+    return frame
+
+
+def main():
+    cli_args = build_options_parser().parse_args()
+
+    kmc_sdls_props = list()
+    for line in cli_args.properties:
+        if(not line.startswith('#') and line.rstrip() != ''):
+            kmc_sdls_props.append(line.rstrip())
+
+    f_type = cli_args.type
+    frame = bytearray(binascii.unhexlify(cli_args.frame or default_frames[f_type]))
+    vcids = cli_args.vcids or [KmcSdlsClient.frame_gvcid(f_type.lower(), frame)[2]]
+    templates = [with_vcid(frame, f_type, vcid) for vcid in vcids]
+
+    operation = ("process_security_" if cli_args.process else "apply_security_") + f_type.lower()
+    if cli_args.process:
+        # Secure the frames in a throwaway pool so the SA state each worker processes against matches
+        with KmcSdlsPool(kmc_sdls_props, num_workers=1) as pool:
+            templates = pool.map("apply_security_" + f_type.lower(), templates)
+    frames = [templates[i % len(templates)] for i in range(cli_args.num_frames)]
+
+    print("Benchmarking %s on %d frames of %d bytes over VC IDs %s" % (operation, len(frames), len(frame), vcids))
+    print("%8s %14s %10s" % ("workers", "frames/s", "speedup"))
+    baseline = None
+    for num_workers in range(1, cli_args.max_workers + 1):
+        with KmcSdlsPool(kmc_sdls_props, num_workers=num_workers, chunk_size=cli_args.chunk_size) as pool:
+            # Warm up every worker's SA lookups and the inter-process queues before timing
+            pool.map(operation, frames[:num_workers * cli_args.chunk_size * 2], return_exceptions=True)
+            start = time.perf_counter()
+            results = pool.map(operation, frames, return_exceptions=True)
+            elapsed = time.perf_counter() - start
+        errors = sum(1 for r in results if isinstance(r, Exception))
+        rate = len(frames) / elapsed
+        baseline = baseline or rate
+        print("%8d %14.1f %9.2fx%s" % (num_workers, rate, rate / baseline,
+                                       "  (%d errors)" % errors if errors else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+#Copyright 2021, by the California Institute of Technology.
+#ALL RIGHTS RESERVED. United States Government Sponsorship acknowledged.
+#Any commercial use must be negotiated with the Office of Technology
+#Transfer at the California Institute of Technology.
+#
+#This software may be subject to U.S. export control laws. By accepting
+#this software, the user agrees to comply with all applicable U.S.
+#export laws and regulations. User has the responsibility to obtain
+#export licenses, or other export authority as may be required before
+#exporting such information to foreign countries or providing access to
+#foreign persons.
+
+import argparse
+import binascii
+import os
+import tracemalloc
+
+#Import the KMC SDLS Client
+from gov.nasa.jpl.ammos.kmc.sdlsclient import KmcSdlsClient
+
+# Default unsecured frames, matching kmc_sdls_test_app.py
+default_frames = {
+    "TC": "202c0408000001bd37",
+    "TM": "4ff000000000" + "00" * 14 + "ff" * 60 + "00" * 16,
+    "AOS": "7fc000000000" + "00" * 14 + "ff" * 60 + "00" * 16,
+}
+
+
+def build_options_parser():
+    arg_parser=argparse.ArgumentParser(description='Measures the bytes retained per processed frame for the compact result types and the NamedTuple tree, using tracemalloc')
+    arg_parser.add_argument("-p", "--properties",
+                            dest="properties",
+                            help="The properties file that contains all the configuration needed by this application (supported properties defined in KMC SIS)",
+                            default=(os.path.dirname(os.path.realpath(__file__))+"/../etc/kmc_sdls_test_app.properties"),
+                            type=argparse.FileType('r'))
+    arg_parser.add_argument("-t", "--type",
+                            dest="type",
+                            choices=["TC", "TM", "AOS"],
+                            type=str.upper,
+                            default="TC",
+                            help="Frame type, choice between TC (default), TM, and AOS")
+    arg_parser.add_argument("-f", "--frame",
+                            dest="frame",
+                            help="Hex frame string of the unsecured transfer frame to apply, then process")
+    arg_parser.add_argument("-n", "--num-frames",
+                            dest="num_frames",
+                            type=int,
+                            default=10000,
+                            help="Number of processed frames retained per measurement")
+    return arg_parser
+
+
+def retained_bytes(produce, num_frames):
+    '''
+    Returns the bytes still allocated after keeping num_frames results of produce() in a list.
+    '''
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    retained = [produce() for _ in range(num_frames)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    # The list's own pointer array is the same for both result types, so leave it out
+    list_bytes = retained.__sizeof__()
+    growth = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del retained
+    return growth - list_bytes
+
+
+def main():
+    cli_args = build_options_parser().parse_args()
+    f_type = cli_args.type
+    k = KmcSdlsClient.KmcSdlsClient(KmcSdlsClient.load_properties(cli_args.properties))
+
+    apply_fn = getattr(k, "apply_security_" + f_type.lower())
+    process_fn = getattr(k, "process_security_" + f_type.lower())
+    secured = apply_fn(bytearray(binascii.unhexlify(cli_args.frame or default_frames[f_type])))
+
+    compact = retained_bytes(lambda: process_fn(secured), cli_args.num_frames)
+    # Lazy views materialize into the bytearray-based NamedTuple tree process_security_* used to return
+    tree = retained_bytes(lambda: process_fn(secured, lazy=True).materialize(), cli_args.num_frames)
+
+    print("Retained bytes per %s frame over %d frames (secured frame is %d bytes):" % (f_type, cli_args.num_frames,
+                                                                                      len(secured)))
+    print("  %-28s %10.1f" % ("Compact%s" % f_type, compact / cli_args.num_frames))
+    print("  %-28s %10.1f" % ("%s NamedTuple tree" % f_type, tree / cli_args.num_frames))
+    print("  %-28s %9.1f%%" % ("reduction", 100.0 * (1 - compact / tree) if tree else 0.0))
+
+
+if __name__ == "__main__":
+    main()
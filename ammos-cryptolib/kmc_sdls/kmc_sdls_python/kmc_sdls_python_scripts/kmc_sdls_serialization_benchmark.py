@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+#Copyright 2021, by the California Institute of Technology.
+#ALL RIGHTS RESERVED. United States Government Sponsorship acknowledged.
+#Any commercial use must be negotiated with the Office of Technology
+#Transfer at the California Institute of Technology.
+#
+#This software may be subject to U.S. export control laws. By accepting
+#this software, the user agrees to comply with all applicable U.S.
+#export laws and regulations. User has the responsibility to obtain
+#export licenses, or other export authority as may be required before
+#exporting such information to foreign countries or providing access to
+#foreign persons.
+
+import argparse
+import binascii
+import os
+import timeit
+
+#Import the KMC SDLS Client
+from gov.nasa.jpl.ammos.kmc.sdlsclient import KmcSdlsClient
+
+# Default unsecured frames, matching kmc_sdls_test_app.py
+default_frames = {
+    "TM": "4ff000000000" + "00" * 14 + "ff" * 60 + "00" * 16,
+    "AOS": "7fc000000000" + "00" * 14 + "ff" * 60 + "00" * 16,
+}
+
+
+def build_options_parser():
+    arg_parser=argparse.ArgumentParser(description='Compares the struct-based frame hex()/to_bytes() serializers with the bitstring hex() they replaced')
+    arg_parser.add_argument("-p", "--properties",
+                            dest="properties",
+                            help="The properties file that contains all the configuration needed by this application (supported properties defined in KMC SIS)",
+                            default=(os.path.dirname(os.path.realpath(__file__))+"/../etc/kmc_sdls_test_app.properties"),
+                            type=argparse.FileType('r'))
+    arg_parser.add_argument("-t", "--type",
+                            dest="type",
+                            choices=["TM", "AOS"],
+                            type=str.upper,
+                            default="TM",
+                            help="Frame type, choice between TM (default) and AOS. TC frames had no bitstring hex() to compare with")
+    arg_parser.add_argument("-f", "--frame",
+                            dest="frame",
+                            help="Hex frame string of the unsecured transfer frame to apply, then process")
+    arg_parser.add_argument("-n", "--num-calls",
+                            dest="num_calls",
+                            type=int,
+                            default=20000,
+                            help="Number of hex() calls timed per serializer")
+    return arg_parser
+
+
+"""
+Copy of the bitstring serializers the frame NamedTuples used before to_bytes(), kept here as the benchmark baseline.
+The zero-filled BitArrays are built from Bits(uint=0) and overwrite() takes keyword arguments and .hex replaces .h, so the copy runs on bitstring 3, 4 and 5 alike.
+"""
+
+
+def _zeros(length):
+    from bitstring import Bits, BitArray
+    return BitArray(Bits(uint=0, length=length))
+
+
+def legacy_aos_header_hex(h):
+    from bitstring import Bits
+    header = _zeros(48)
+    header.overwrite(bs=Bits(uint=h.tfvn, length=2), pos=0)
+    header.overwrite(bs=Bits(uint=h.scid, length=8), pos=2)
+    header.overwrite(bs=Bits(uint=h.vcid, length=6), pos=10)
+    header.overwrite(bs=Bits(uint=h.vcfc, length=24), pos=16)
+    header.overwrite(bs=Bits(uint=h.replay, length=1), pos=40)
+    header.overwrite(bs=Bits(uint=h.vcflag, length=1), pos=41)
+    header.overwrite(bs=Bits(uint=h.spare, length=2), pos=42)
+    header.overwrite(bs=Bits(uint=h.vcfcc, length=4), pos=44)
+    return header.hex
+
+
+def legacy_tm_header_hex(h):
+    from bitstring import Bits
+    header = _zeros(48)
+    header.overwrite(bs=Bits(uint=h.tfvn, length=2), pos=0)
+    header.overwrite(bs=Bits(uint=h.scid, length=10), pos=2)
+    header.overwrite(bs=Bits(uint=h.vcid, length=3), pos=12)
+    header.overwrite(bs=Bits(uint=h.ocf, length=1), pos=15)
+    header.overwrite(bs=Bits(uint=h.mcfc, length=8), pos=16)
+    header.overwrite(bs=Bits(uint=h.vcfc, length=8), pos=24)
+    header.overwrite(bs=Bits(uint=h.shf, length=1), pos=32)
+    header.overwrite(bs=Bits(uint=h.sf, length=1), pos=33)
+    header.overwrite(bs=Bits(uint=h.pof, length=1), pos=34)
+    header.overwrite(bs=Bits(uint=h.slid, length=2), pos=35)
+    header.overwrite(bs=Bits(uint=h.fhp, length=11), pos=37)
+    return header.hex
+
+
+def legacy_security_header_hex(sh):
+    from bitstring import Bits
+    header = _zeros(16 + (sh.iv_field_len + sh.sn_field_len + sh.pad_field_len) * 8)
+    header.overwrite(bs=Bits(uint=sh.spi, length=16), pos=0)
+    idx = 16
+    for value, field_len in ((sh.iv, sh.iv_field_len), (sh.sn, sh.sn_field_len)):
+        if field_len > 0:
+            header.overwrite(bs=Bits(bytes(value)), pos=idx)
+            idx += field_len * 8
+    if sh.pad_field_len > 0:
+        header.overwrite(bs=Bits(uint=sh.pad, length=sh.pad_field_len * 8), pos=idx)
+    return header.hex
+
+
+def legacy_security_trailer_hex(st):
+    from bitstring import Bits
+    trailer = _zeros(16 + (st.mac_field_len + st.ocf_field_len) * 8)
+    idx = 0
+    for value, field_len in ((st.mac, st.mac_field_len), (st.ocf, st.ocf_field_len)):
+        if field_len > 0:
+            trailer.overwrite(bs=Bits(bytes(value)), pos=idx)
+            idx += field_len * 8
+    trailer.overwrite(bs=Bits(uint=st.fecf, length=16), pos=idx)
+    return trailer.hex
+
+
+def legacy_frame_hex(f_type, frame):
+    header_hex = legacy_tm_header_hex if f_type == "TM" else legacy_aos_header_hex
+    return header_hex(frame[0]) + legacy_security_header_hex(frame[1]) + bytes(frame[2]).hex() + \
+        legacy_security_trailer_hex(frame[3])
+
+
+def main():
+    cli_args = build_options_parser().parse_args()
+    f_type = cli_args.type
+    k = KmcSdlsClient.KmcSdlsClient(KmcSdlsClient.load_properties(cli_args.properties))
+
+    apply_fn = getattr(k, "apply_security_" + f_type.lower())
+    process_fn = getattr(k, "process_security_" + f_type.lower())
+    secured = apply_fn(bytearray(binascii.unhexlify(cli_args.frame or default_frames[f_type])))
+    frame = process_fn(secured).materialize()
+    k.shutdown()
+
+    timings = [("to_bytes()", lambda: frame.to_bytes()),
+               ("hex()", lambda: frame.hex())]
+    try:
+        import bitstring
+        if legacy_frame_hex(f_type, frame) != frame.hex():
+            print("WARNING: bitstring and struct serializers disagree on this frame")
+        timings.append(("bitstring hex() %s" % bitstring.__version__, lambda: legacy_frame_hex(f_type, frame)))
+    except ImportError:
+        print("bitstring is not installed, only timing the struct-based serializers")
+
+    print("Serializing a processed %s frame of %d bytes, %d calls each:" % (f_type, len(secured), cli_args.num_calls))
+    print("  %-28s %12s" % ("serializer", "us/call"))
+    for name, fn in timings:
+        seconds = min(timeit.repeat(fn, number=cli_args.num_calls, repeat=3))
+        print("  %-28s %12.2f" % (name, seconds / cli_args.num_calls * 1e6))
+
+
+if __name__ == "__main__":
+    main()
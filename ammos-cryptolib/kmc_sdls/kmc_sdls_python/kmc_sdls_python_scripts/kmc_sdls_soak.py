@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+
+#Copyright 2021, by the California Institute of Technology.
+#ALL RIGHTS RESERVED. United States Government Sponsorship acknowledged.
+#Any commercial use must be negotiated with the Office of Technology
+#Transfer at the California Institute of Technology.
+#
+#This software may be subject to U.S. export control laws. By accepting
+#this software, the user agrees to comply with all applicable U.S.
+#export laws and regulations. User has the responsibility to obtain
+#export licenses, or other export authority as may be required before
+#exporting such information to foreign countries or providing access to
+#foreign persons.
+
+import argparse
+import binascii
+import json
+import resource
+import sys
+import time
+import tracemalloc
+
+#Import the KMC SDLS Client and frame generator
+from gov.nasa.jpl.ammos.kmc.sdlsclient import KmcSdlsClient
+from gov.nasa.jpl.ammos.kmc.sdlsclient.FrameGenerator import FrameGenerator
+
+"""
+Soak test for the KMC SDLS client.
+
+Every apply and process security method is run over millions of frames, and the client is constructed and shut down
+over and over the way services do on configuration changes. The process RSS and the memory traced by tracemalloc are
+sampled at intervals once a warmup has filled the caches and scratch pools. The growth rate is the least squares slope
+of the samples, so a one-off allocation does not fail a run but steady growth does. A case fails when its rate goes
+over the threshold; the allocation sites that grew most are then printed from tracemalloc.
+"""
+
+# inmemory SADB and libgcrypt, so the soak needs no MariaDB or KMC Crypto Service
+default_properties = ['cryptolib.sadb.type=inmemory', 'cryptolib.crypto.type=libgcrypt',
+                      'cryptolib.process_tc.ignore_antireplay=true', 'cryptolib.process_tc.ignore_sa_state=true',
+                      'cryptolib.process_tc.process_pdus=false', 'cryptolib.tc.vcid_bitmask=0x3F']
+
+# Default unsecured frames, matching kmc_sdls_test_app.py
+default_frames = {
+    "TC": "202c0408000001bd37",
+    "TM": "4ff000000000" + "00" * 14 + "ff" * 60 + "00" * 16,
+    "AOS": "7fc000000000" + "00" * 14 + "ff" * 60 + "00" * 16,
+}
+
+# Security header and trailer space of generated TM and AOS frames, as in the default frames
+generated_security_lengths = {"TC": (0, 0), "TM": (14, 16), "AOS": (14, 16)}
+
+# Generated frames written at a time, each apply call then taking the next one
+generated_block_frames = 1024
+
+page_size = resource.getpagesize()
+
+
+def build_options_parser():
+    arg_parser=argparse.ArgumentParser(description='Runs the KMC SDLS client over millions of frames and construct/shutdown cycles, failing when RSS or traced Python memory keeps growing')
+    arg_parser.add_argument("-p", "--properties",
+                            dest="properties",
+                            help="Properties file to soak with instead of the built-in inmemory SADB + libgcrypt configuration",
+                            type=argparse.FileType('r'))
+    arg_parser.add_argument("-t", "--types",
+                            dest="types",
+                            type=lambda s: [t.upper() for t in s.split(",")],
+                            default=["TC", "TM", "AOS"],
+                            help="Comma separated frame types to soak (default: TC,TM,AOS)")
+    arg_parser.add_argument("-o", "--operations",
+                            dest="operations",
+                            type=lambda s: s.lower().split(","),
+                            default=["apply", "process"],
+                            help="Comma separated operations to soak (default: apply,process)")
+    arg_parser.add_argument("-n", "--num-frames",
+                            dest="num_frames",
+                            type=int,
+                            default=1000000,
+                            help="Frames run through each method after the warmup (default: 1000000)")
+    arg_parser.add_argument("-w", "--warmup",
+                            dest="warmup",
+                            type=int,
+                            default=50000,
+                            help="Frames run through each method before the first sample (default: 50000)")
+    arg_parser.add_argument("-i", "--interval",
+                            dest="interval",
+                            type=int,
+                            default=50000,
+                            help="Frames between samples (default: 50000)")
+    arg_parser.add_argument("-c", "--cycles",
+                            dest="cycles",
+                            type=int,
+                            default=500,
+                            help="Client construct/shutdown cycles, 0 to skip them (default: 500)")
+    arg_parser.add_argument("--rss-threshold",
+                            dest="rss_threshold",
+                            type=float,
+                            default=1024.0,
+                            help="Largest RSS growth allowed, in KiB per million frames or per thousand cycles (default: 1024)")
+    arg_parser.add_argument("--traced-threshold",
+                            dest="traced_threshold",
+                            type=float,
+                            default=256.0,
+                            help="Largest tracemalloc growth allowed, in KiB per million frames or per thousand cycles (default: 256)")
+    arg_parser.add_argument("--no-tracemalloc",
+                            dest="tracemalloc",
+                            action="store_false",
+                            help="Only sample RSS. tracemalloc slows every Python allocation down")
+    arg_parser.add_argument("-f", "--frame",
+                            dest="frames",
+                            action="append",
+                            default=[],
+                            help="TYPE=hex override of an unsecured frame, e.g. TM=4ff0... May be repeated")
+    arg_parser.add_argument("-l", "--frame-length",
+                            dest="frame_length",
+                            type=int,
+                            help="Apply security to generated frames of this length, on the GVCIDs of the default frames, "
+                                 "each with the next frame count and a valid FECF (TM and AOS), instead of one frame over and over")
+    arg_parser.add_argument("-j", "--json",
+                            dest="json",
+                            help="File the samples and growth rates of every case are written to")
+    return arg_parser
+
+
+def managed_parameter(f_type, frame):
+    # TM and AOS frames are fixed length, so their max_frame_length must match the soaked frame
+    tfvn, scid, vcid = KmcSdlsClient.frame_gvcid(f_type.lower(), frame)
+    max_frame_length = KmcSdlsClient.TC_MAX_FRAME_LENGTH if f_type == "TC" else len(frame)
+    prefix = "cryptolib.%s.%d.%d.%d." % (f_type.lower(), scid, vcid, tfvn)
+    return [prefix + "has_ecf=true", prefix + "has_segmentation_header=false",
+            prefix + "max_frame_length=%d" % max_frame_length]
+
+
+def current_rss():
+    # Resident pages from /proc; ru_maxrss only ever grows, so it is the fallback on systems without /proc
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * page_size
+    except (OSError, IndexError, ValueError):
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+
+
+def sample(count, samples):
+    traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+    samples.append((count, current_rss(), traced))
+
+
+def growth_rate(samples, column, per):
+    # Least squares slope of one sampled column against the frame (or cycle) count, in bytes per `per` units
+    if len(samples) < 2:
+        return 0.0
+    xs = [s[0] for s in samples]
+    ys = [s[column] for s in samples]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    if variance == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance * per
+
+
+def soak(name, step, warmup, total, interval, per, cli_args):
+    '''
+    Runs step(n) (which runs n frames or cycles) for warmup units, then total units sampling every interval, and
+    returns the case report.
+    '''
+    step(warmup)
+    before = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+    samples = []
+    sample(0, samples)
+    start = time.perf_counter()
+    done = 0
+    while done < total:
+        count = min(interval, total - done)
+        errors = step(count)
+        done += count
+        sample(done, samples)
+        if errors:
+            raise SystemExit("%s: %d of the last %d calls failed" % (name, errors, count))
+    elapsed = time.perf_counter() - start
+    rss_rate = growth_rate(samples, 1, per) / 1024.0
+    traced_rate = growth_rate(samples, 2, per) / 1024.0
+    failed = rss_rate > cli_args.rss_threshold or traced_rate > cli_args.traced_threshold
+    print("  %-24s %10d %10.1f %10.1f %12.1f %12.1f %s" % (name, total, elapsed, samples[-1][1] / 2 ** 20,
+                                                          rss_rate, traced_rate, "FAIL" if failed else "ok"))
+    if failed and before is not None:
+        for stat in tracemalloc.take_snapshot().compare_to(before, 'lineno')[:5]:
+            print("      %s" % stat)
+    return {"name": name, "units": total, "seconds": elapsed, "samples": samples,
+            "rss_kib_rate": rss_rate, "traced_kib_rate": traced_rate, "failed": failed}
+
+
+def frame_step(method, frame):
+    def step(count):
+        errors = 0
+        for _ in range(count):
+            status, _ = method(frame)
+            if status != KmcSdlsClient.SUCCESS:
+                errors += 1
+        return errors
+    return step
+
+
+def generated_frame_step(method, generator):
+    # Frames are generated a block at a time into one buffer, so the soak itself allocates nothing per frame
+    frame_length = generator.frame_length
+    block = bytearray(frame_length * generated_block_frames)
+    view = memoryview(block)
+    frames = [view[idx * frame_length:(idx + 1) * frame_length] for idx in range(generated_block_frames)]
+
+    def step(count):
+        errors = 0
+        while count > 0:
+            num_frames = generator.generate_into(block, min(count, generated_block_frames))
+            for frame in frames[:num_frames]:
+                status, _ = method(frame)
+                if status != KmcSdlsClient.SUCCESS:
+                    errors += 1
+            count -= num_frames
+        return errors
+    return step
+
+
+def cycle_step(properties, tc_frame):
+    # Every cycle secures one frame, so a client that initializes but cannot serve would not pass unnoticed
+    def step(count):
+        errors = 0
+        for _ in range(count):
+            client = KmcSdlsClient.KmcSdlsClient(properties)
+            try:
+                status, _ = client.try_apply_security_tc(tc_frame)
+                if status != KmcSdlsClient.SUCCESS:
+                    errors += 1
+            finally:
+                client.shutdown()
+        return errors
+    return step
+
+
+def main():
+    cli_args = build_options_parser().parse_args()
+    frame_hex = dict(default_frames)
+    for override in cli_args.frames:
+        f_type, _, hex_frame = override.partition("=")
+        frame_hex[f_type.upper()] = hex_frame
+    frames = {f_type: bytearray(binascii.unhexlify(frame_hex[f_type])) for f_type in cli_args.types}
+    generators = dict()
+    if cli_args.frame_length:
+        for f_type in cli_args.types:
+            tfvn, scid, vcid = KmcSdlsClient.frame_gvcid(f_type.lower(), frames[f_type])
+            security_header_length, security_trailer_length = generated_security_lengths[f_type]
+            generators[f_type] = FrameGenerator(f_type.lower(), scid, vcid, cli_args.frame_length, tfvn=tfvn,
+                                                fecf=f_type != "TC", security_header_length=security_header_length,
+                                                security_trailer_length=security_trailer_length)
+            frames[f_type] = generators[f_type].next_frame()
+    if cli_args.properties:
+        properties = KmcSdlsClient.load_properties(cli_args.properties)
+    else:
+        properties = list(default_properties)
+        for f_type, frame in frames.items():
+            properties += managed_parameter(f_type, frame)
+
+    if cli_args.tracemalloc:
+        tracemalloc.start()
+    reports = []
+    print("  %-24s %10s %10s %10s %12s %12s" % ("case", "units", "seconds", "rss (MiB)", "rss growth",
+                                                "traced growth"))
+    client = KmcSdlsClient.KmcSdlsClient(properties)
+    try:
+        for f_type, frame in frames.items():
+            secured = getattr(client, "apply_security_" + f_type.lower())(frame)
+            for operation in cli_args.operations:
+                method = getattr(client, "try_%s_security_%s" % (operation, f_type.lower()))
+                if operation == "apply" and f_type in generators:
+                    step = generated_frame_step(method, generators[f_type])
+                else:
+                    step = frame_step(method, frame if operation == "apply" else bytearray(secured))
+                reports.append(soak("%s %s" % (f_type, operation), step, cli_args.warmup, cli_args.num_frames,
+                                    cli_args.interval, 1e6, cli_args))
+    finally:
+        client.shutdown()
+
+    if cli_args.cycles > 0:
+        tc_frame = frames.get("TC", bytearray(binascii.unhexlify(default_frames["TC"])))
+        reports.append(soak("construct/shutdown", cycle_step(properties, tc_frame), max(1, cli_args.cycles // 10),
+                            cli_args.cycles, max(1, cli_args.cycles // 20), 1e3, cli_args))
+        print("  KmcSdlsClient.global_dict holds %d entries after %d cycles" % (
+            len(KmcSdlsClient.KmcSdlsClient.global_dict), cli_args.cycles))
+    print("Growth rates are KiB per million frames, or per thousand construct/shutdown cycles; thresholds %.1f KiB "
+          "RSS, %.1f KiB traced" % (cli_args.rss_threshold, cli_args.traced_threshold))
+
+    if cli_args.json:
+        with open(cli_args.json, "w") as f:
+            json.dump({"tracemalloc": cli_args.tracemalloc, "rss_threshold_kib": cli_args.rss_threshold,
+                       "traced_threshold_kib": cli_args.traced_threshold, "cases": reports}, f, indent=2)
+        print("Samples written to %s" % cli_args.json)
+    failures = [report["name"] for report in reports if report["failed"]]
+    if failures:
+        print("Memory kept growing in: %s" % ", ".join(failures))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+#Copyright 2021, by the California Institute of Technology.
+#ALL RIGHTS RESERVED. United States Government Sponsorship acknowledged.
+#Any commercial use must be negotiated with the Office of Technology
+#Transfer at the California Institute of Technology.
+#
+#This software may be subject to U.S. export control laws. By accepting
+#this software, the user agrees to comply with all applicable U.S.
+#export laws and regulations. User has the responsibility to obtain
+#export licenses, or other export authority as may be required before
+#exporting such information to foreign countries or providing access to
+#foreign persons.
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+#Import the KMC SDLS Client
+from gov.nasa.jpl.ammos.kmc.sdlsclient import KmcSdlsClient
+
+# Run in a fresh interpreter, so nothing is imported yet. Prints seconds spent importing, then whether CryptoLib loaded.
+import_timer = """
+import sys, time
+start = time.perf_counter()
+import %s
+print(time.perf_counter() - start)
+print('kmc_python_c_sdls_interface' in sys.modules)
+"""
+
+
+def build_options_parser():
+    arg_parser=argparse.ArgumentParser(description='Measures KmcSdlsClient import time, configuration compile time and client construction time')
+    arg_parser.add_argument("-p", "--properties",
+                            dest="properties",
+                            help="The properties file that contains all the configuration needed by this application (supported properties defined in KMC SIS)",
+                            default=(os.path.dirname(os.path.realpath(__file__))+"/../etc/kmc_sdls_test_app.properties"),
+                            type=argparse.FileType('r'))
+    arg_parser.add_argument("-n", "--num-runs",
+                            dest="num_runs",
+                            type=int,
+                            default=20,
+                            help="Number of times each step is timed, the fastest run is reported")
+    return arg_parser
+
+
+def time_import(module):
+    fastest = None
+    for _ in range(3):
+        output = subprocess.run([sys.executable, "-c", import_timer % module], stdout=subprocess.PIPE,
+                                check=True, universal_newlines=True).stdout.split()
+        seconds = float(output[0])
+        fastest = seconds if fastest is None else min(fastest, seconds)
+    return fastest, output[1] == "True"
+
+
+def time_runs(fn, num_runs):
+    fastest = None
+    for _ in range(num_runs):
+        start = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - start
+        fastest = seconds if fastest is None else min(fastest, seconds)
+    return fastest
+
+
+def construct_and_shutdown(config):
+    KmcSdlsClient.KmcSdlsClient(config).shutdown()
+
+
+def main():
+    cli_args = build_options_parser().parse_args()
+    properties = KmcSdlsClient.load_properties(cli_args.properties)
+    compiled = KmcSdlsClient.KmcSdlsConfig(properties)
+
+    print("Startup costs, fastest of %d runs:" % cli_args.num_runs)
+    print("  %-44s %12s" % ("step", "ms"))
+    for module in ("gov.nasa.jpl.ammos.kmc.sdlsclient.KmcSdlsClient", "kmc_python_c_sdls_interface"):
+        seconds, loaded_cryptolib = time_import(module)
+        print("  %-44s %12.3f%s" % ("import " + module.rsplit(".", 1)[-1], seconds * 1e3,
+                                    "  (loads CryptoLib)" if loaded_cryptolib else ""))
+
+    steps = [("compile KmcSdlsConfig", lambda: KmcSdlsClient.KmcSdlsConfig(properties)),
+             ("construct + shutdown, uncompiled properties",
+              lambda: construct_and_shutdown(KmcSdlsClient.KmcSdlsConfig(properties))),
+             ("construct + shutdown, compiled KmcSdlsConfig", lambda: construct_and_shutdown(compiled))]
+    for name, fn in steps:
+        print("  %-44s %12.3f" % (name, time_runs(fn, cli_args.num_runs) * 1e3))
+
+
+if __name__ == "__main__":
+    main()
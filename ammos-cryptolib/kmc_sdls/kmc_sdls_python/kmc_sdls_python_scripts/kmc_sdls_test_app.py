@@ -103,6 +103,10 @@ tm_defaults = {
     "fhp": "00000000000"                # 11 bit first header pointer
 }
 
+def bin_to_hex(bits):
+    # Keeps the leading zero nibbles that format(int(bits, 2), 'x') would drop
+    return '{0:0{1}x}'.format(int(bits, 2), len(bits) // 4)
+
 class Frame(ABC):
     sc_id = None
     vc_id = None
@@ -154,7 +158,7 @@ class TC(Frame):
             return self.default_frame_hex
         else:
             frame_header_bin = "{}{}{}{}{}{}{}{}".format(self.version, self.bypass_flag, self.ctrl_cmd_flag, self.spare, self.sc_id, self.vc_id, self.frame_length, self.frame_sequence_number)
-            frame_header_hex = format(int(frame_header_bin, 2), 'x')
+            frame_header_hex = bin_to_hex(frame_header_bin)
             frame_hex = "{}{}".format(frame_header_hex, self.frame_body_hex)
             return frame_hex
 
@@ -173,8 +177,8 @@ class TM(Frame):
         elif not self.override:
             return self.default_frame_hex
         else:
-            frame_header_bin = ""
-            frame_header_hex = format(int(frame_header_bin, 2), 'x')
+            frame_header_bin = "{}{}{}{}{}{}{}{}{}{}{}".format(tm_defaults["version"], self.sc_id, self.vc_id, tm_defaults["ocf_flag"], tm_defaults["mcfc"], tm_defaults["vcfc"], tm_defaults["shf"], tm_defaults["synch"], tm_defaults["pof"], tm_defaults["sl_id"], tm_defaults["fhp"])
+            frame_header_hex = bin_to_hex(frame_header_bin)
             frame_hex = "{}{}".format(frame_header_hex, self.frame_body_hex)
             return frame_hex
 
@@ -189,7 +193,7 @@ class AOS(Frame):
 
     def __init__(self):
         self.vc_id = "000000"   #  6 bit virtual channel id
-        self.sc_id = "111111111" # 8 bit spacecraft id (255)
+        self.sc_id = "11111111" # 8 bit spacecraft id (255)
         self.frame_body_hex = "00000000000000000000000000001111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111100000000000000000000000000000000"
         self.frame_header_hex = "7fc000000000"
         self.default_frame_hex = "{}{}".format(self.frame_header_hex, self.frame_body_hex)
@@ -200,8 +204,8 @@ class AOS(Frame):
         elif not self.override:
             return self.default_frame_hex
         else:
-            frame_header_bin = ""
-            frame_header_hex = format(int(frame_header_bin, 2), 'x')
+            frame_header_bin = "{}{}{}{}{}{}{}{}".format(self.version, self.sc_id, self.vc_id, aos_defaults["vcfc"], aos_defaults["replay_flag"], aos_defaults["vcfc_flag"], aos_defaults["reserved_spare"], aos_defaults["vcfc_cycle"])
+            frame_header_hex = bin_to_hex(frame_header_bin)
             frame_hex = "{}{}".format(frame_header_hex, self.frame_body_hex)
             return frame_hex
 
@@ -232,7 +236,7 @@ def main():
     if cli_args.scid:
         fmt = "{0:010b}"
         if f_type == "TM":
-            fmt = '{0:10b}'
+            fmt = '{0:010b}'
         elif f_type == "AOS":
             fmt = '{0:08b}'
 
@@ -254,10 +258,7 @@ def main():
         frame_hex = cli_args.frame
         frame.override_hex(frame_hex)
 
-    kmc_sdls_props = list()
-    for line in cli_args.properties:
-        if(not line.startswith('#') and line.rstrip() != ''):
-            kmc_sdls_props.append(line.rstrip())
+    kmc_sdls_props = KmcSdlsClient.load_properties(cli_args.properties)
 
     # Initialize the KmcSdlsClient object with configuration
     k = KmcSdlsClient.KmcSdlsClient(kmc_sdls_props)
@@ -14,6 +14,7 @@
 
 #include "kmc_sdls.h"
 #include <crypto.h>
+#include <string.h>
 
 extern CryptoConfig_t crypto_config;
 
@@ -64,6 +65,250 @@ int32_t process_security_tm(uint8_t *ptBuffer, uint16_t length, TM_t* p_enc_fram
     return Crypto_TM_ProcessSecurity(ptBuffer, length, p_enc_frame, p_enc_frame_len);
 }
 
+int32_t apply_security_tc_into(const uint8_t* p_in_frame, const uint16_t in_frame_length, uint8_t* p_out_frame,
+                               const uint16_t out_frame_capacity, uint16_t* p_out_frame_len)
+{
+    uint8_t* p_enc_frame = NULL;
+    uint16_t enc_frame_len = 0;
+    int32_t status;
+
+    if (p_out_frame == NULL || p_out_frame_len == NULL)
+    {
+        return CRYPTO_LIB_ERR_NULL_BUFFER;
+    }
+
+    *p_out_frame_len = 0;
+    status = Crypto_TC_ApplySecurity(p_in_frame, in_frame_length, &p_enc_frame, &enc_frame_len);
+    if (status == CRYPTO_LIB_SUCCESS)
+    {
+        if (enc_frame_len > out_frame_capacity)
+        {
+            status = SDLS_OUTPUT_BUFFER_TOO_SHORT;
+        }
+        else
+        {
+            memcpy(p_out_frame, p_enc_frame, enc_frame_len);
+            *p_out_frame_len = enc_frame_len;
+        }
+    }
+    // Crypto_TC_ApplySecurity allocates the secured frame, the caller only ever sees the copy.
+    if (p_enc_frame != NULL)
+    {
+        free(p_enc_frame);
+    }
+    return status;
+}
+
+int32_t apply_security_tc_batch(const uint8_t* p_in_frames, const uint32_t* p_in_offsets, const uint16_t* p_in_lengths,
+                                uint32_t num_frames, uint8_t* p_out_frames, uint32_t out_frames_capacity,
+                                uint32_t* p_out_offsets, uint16_t* p_out_lengths, int32_t* p_status)
+{
+    uint32_t out_offset = 0;
+
+    if (p_in_frames == NULL || p_in_offsets == NULL || p_in_lengths == NULL || p_out_frames == NULL ||
+        p_out_offsets == NULL || p_out_lengths == NULL || p_status == NULL)
+    {
+        return CRYPTO_LIB_ERR_NULL_BUFFER;
+    }
+
+    for (uint32_t i = 0; i < num_frames; i++)
+    {
+        uint32_t remaining = out_frames_capacity - out_offset;
+
+        p_out_offsets[i] = out_offset;
+        p_status[i] = apply_security_tc_into(p_in_frames + p_in_offsets[i], p_in_lengths[i], p_out_frames + out_offset,
+                                             remaining > UINT16_MAX ? UINT16_MAX : (uint16_t)remaining, &p_out_lengths[i]);
+        out_offset += p_out_lengths[i];
+    }
+    return CRYPTO_LIB_SUCCESS;
+}
+
+int32_t apply_security_tm_batch(uint8_t* p_frames, const uint32_t* p_offsets, const uint16_t* p_lengths,
+                                uint32_t num_frames, int32_t* p_status)
+{
+    if (p_frames == NULL || p_offsets == NULL || p_lengths == NULL || p_status == NULL)
+    {
+        return CRYPTO_LIB_ERR_NULL_BUFFER;
+    }
+
+    for (uint32_t i = 0; i < num_frames; i++)
+    {
+        p_status[i] = Crypto_TM_ApplySecurity(p_frames + p_offsets[i], p_lengths[i]);
+    }
+    return CRYPTO_LIB_SUCCESS;
+}
+
+int32_t apply_security_aos_batch(uint8_t* p_frames, const uint32_t* p_offsets, const uint16_t* p_lengths,
+                                 uint32_t num_frames, int32_t* p_status)
+{
+    if (p_frames == NULL || p_offsets == NULL || p_lengths == NULL || p_status == NULL)
+    {
+        return CRYPTO_LIB_ERR_NULL_BUFFER;
+    }
+
+    for (uint32_t i = 0; i < num_frames; i++)
+    {
+        p_status[i] = Crypto_AOS_ApplySecurity(p_frames + p_offsets[i], p_lengths[i]);
+    }
+    return CRYPTO_LIB_SUCCESS;
+}
+
+static int32_t sdls_copy_batch_pdu(SdlsFrameSummary_t* p_summary, uint8_t* p_pdus, uint32_t pdus_capacity,
+                                   uint32_t* p_pdus_offset, const uint8_t* p_pdu, uint16_t pdu_len)
+{
+    p_summary->pdu_offset = *p_pdus_offset;
+    if (pdu_len > pdus_capacity - *p_pdus_offset)
+    {
+        p_summary->pdu_len = 0;
+        return SDLS_OUTPUT_BUFFER_TOO_SHORT;
+    }
+    memcpy(p_pdus + *p_pdus_offset, p_pdu, pdu_len);
+    p_summary->pdu_len = pdu_len;
+    *p_pdus_offset += pdu_len;
+    return CRYPTO_LIB_SUCCESS;
+}
+
+int32_t process_security_tc_batch(uint8_t* p_frames, const uint32_t* p_offsets, const uint16_t* p_lengths,
+                                  uint32_t num_frames, SdlsFrameSummary_t* p_summaries, uint8_t* p_pdus,
+                                  uint32_t pdus_capacity)
+{
+    uint32_t pdus_offset = 0;
+    TC_t* p_tc;
+
+    if (p_frames == NULL || p_offsets == NULL || p_lengths == NULL || p_summaries == NULL || p_pdus == NULL)
+    {
+        return CRYPTO_LIB_ERR_NULL_BUFFER;
+    }
+    p_tc = malloc(sizeof(TC_t));
+    if (p_tc == NULL)
+    {
+        return CRYPTO_LIB_ERROR;
+    }
+
+    for (uint32_t i = 0; i < num_frames; i++)
+    {
+        SdlsFrameSummary_t* p_summary = &p_summaries[i];
+        int frame_len = p_lengths[i];
+
+        memset(p_tc, 0, sizeof(TC_t));
+        memset(p_summary, 0, sizeof(SdlsFrameSummary_t));
+        p_summary->pdu_offset = pdus_offset;
+        p_summary->status = Crypto_TC_ProcessSecurity(p_frames + p_offsets[i], &frame_len, p_tc);
+        if (p_summary->status != CRYPTO_LIB_SUCCESS)
+        {
+            continue;
+        }
+        p_summary->tfvn = p_tc->tc_header.tfvn;
+        p_summary->scid = p_tc->tc_header.scid;
+        p_summary->vcid = p_tc->tc_header.vcid;
+        p_summary->vcfc = p_tc->tc_header.fsn;
+        p_summary->spi = p_tc->tc_sec_header.spi;
+        p_summary->iv_field_len = p_tc->tc_sec_header.iv_field_len;
+        p_summary->sn_field_len = p_tc->tc_sec_header.sn_field_len;
+        p_summary->pad_field_len = p_tc->tc_sec_header.pad_field_len;
+        p_summary->mac_field_len = p_tc->tc_sec_trailer.mac_field_len;
+        p_summary->fecf = p_tc->tc_sec_trailer.fecf;
+        p_summary->status = sdls_copy_batch_pdu(p_summary, p_pdus, pdus_capacity, &pdus_offset, p_tc->tc_pdu, p_tc->tc_pdu_len);
+    }
+    free(p_tc);
+    return CRYPTO_LIB_SUCCESS;
+}
+
+int32_t process_security_tm_batch(uint8_t* p_frames, const uint32_t* p_offsets, const uint16_t* p_lengths,
+                                  uint32_t num_frames, SdlsFrameSummary_t* p_summaries, uint8_t* p_pdus,
+                                  uint32_t pdus_capacity)
+{
+    uint32_t pdus_offset = 0;
+    uint16_t tm_len = 0;
+    TM_t* p_tm;
+
+    if (p_frames == NULL || p_offsets == NULL || p_lengths == NULL || p_summaries == NULL || p_pdus == NULL)
+    {
+        return CRYPTO_LIB_ERR_NULL_BUFFER;
+    }
+    p_tm = malloc(sizeof(TM_t));
+    if (p_tm == NULL)
+    {
+        return CRYPTO_LIB_ERROR;
+    }
+
+    for (uint32_t i = 0; i < num_frames; i++)
+    {
+        SdlsFrameSummary_t* p_summary = &p_summaries[i];
+
+        memset(p_tm, 0, sizeof(TM_t));
+        memset(p_summary, 0, sizeof(SdlsFrameSummary_t));
+        p_summary->pdu_offset = pdus_offset;
+        p_summary->status = Crypto_TM_ProcessSecurity(p_frames + p_offsets[i], p_lengths[i], p_tm, &tm_len);
+        if (p_summary->status != CRYPTO_LIB_SUCCESS)
+        {
+            continue;
+        }
+        p_summary->tfvn = p_tm->tm_header.tfvn;
+        p_summary->scid = p_tm->tm_header.scid;
+        p_summary->vcid = p_tm->tm_header.vcid;
+        p_summary->mcfc = p_tm->tm_header.mcfc;
+        p_summary->vcfc = p_tm->tm_header.vcfc;
+        p_summary->spi = p_tm->tm_sec_header.spi;
+        p_summary->iv_field_len = p_tm->tm_sec_header.iv_field_len;
+        p_summary->sn_field_len = p_tm->tm_sec_header.sn_field_len;
+        p_summary->pad_field_len = p_tm->tm_sec_header.pad_field_len;
+        p_summary->mac_field_len = p_tm->tm_sec_trailer.mac_field_len;
+        p_summary->ocf_field_len = p_tm->tm_sec_trailer.ocf_field_len;
+        p_summary->fecf = p_tm->tm_sec_trailer.fecf;
+        p_summary->status = sdls_copy_batch_pdu(p_summary, p_pdus, pdus_capacity, &pdus_offset, p_tm->tm_pdu, p_tm->tm_pdu_len);
+    }
+    free(p_tm);
+    return CRYPTO_LIB_SUCCESS;
+}
+
+int32_t process_security_aos_batch(uint8_t* p_frames, const uint32_t* p_offsets, const uint16_t* p_lengths,
+                                   uint32_t num_frames, SdlsFrameSummary_t* p_summaries, uint8_t* p_pdus,
+                                   uint32_t pdus_capacity)
+{
+    uint32_t pdus_offset = 0;
+    uint16_t aos_len = 0;
+    AOS_t* p_aos;
+
+    if (p_frames == NULL || p_offsets == NULL || p_lengths == NULL || p_summaries == NULL || p_pdus == NULL)
+    {
+        return CRYPTO_LIB_ERR_NULL_BUFFER;
+    }
+    p_aos = malloc(sizeof(AOS_t));
+    if (p_aos == NULL)
+    {
+        return CRYPTO_LIB_ERROR;
+    }
+
+    for (uint32_t i = 0; i < num_frames; i++)
+    {
+        SdlsFrameSummary_t* p_summary = &p_summaries[i];
+
+        memset(p_aos, 0, sizeof(AOS_t));
+        memset(p_summary, 0, sizeof(SdlsFrameSummary_t));
+        p_summary->pdu_offset = pdus_offset;
+        p_summary->status = Crypto_AOS_ProcessSecurity(p_frames + p_offsets[i], p_lengths[i], p_aos, &aos_len);
+        if (p_summary->status != CRYPTO_LIB_SUCCESS)
+        {
+            continue;
+        }
+        p_summary->tfvn = p_aos->aos_header.tfvn;
+        p_summary->scid = p_aos->aos_header.scid;
+        p_summary->vcid = p_aos->aos_header.vcid;
+        p_summary->vcfc = p_aos->aos_header.vcfc & 0xFFFFFF;
+        p_summary->spi = p_aos->aos_sec_header.spi;
+        p_summary->iv_field_len = p_aos->aos_sec_header.iv_field_len;
+        p_summary->sn_field_len = p_aos->aos_sec_header.sn_field_len;
+        p_summary->pad_field_len = p_aos->aos_sec_header.pad_field_len;
+        p_summary->mac_field_len = p_aos->aos_sec_trailer.mac_field_len;
+        p_summary->ocf_field_len = p_aos->aos_sec_trailer.ocf_field_len;
+        p_summary->fecf = p_aos->aos_sec_trailer.fecf;
+        p_summary->status = sdls_copy_batch_pdu(p_summary, p_pdus, pdus_capacity, &pdus_offset, p_aos->aos_pdu, p_aos->aos_pdu_len);
+    }
+    free(p_aos);
+    return CRYPTO_LIB_SUCCESS;
+}
+
 int32_t sdls_config_cryptolib(uint8_t sadb_type, uint8_t cryptography_type, uint8_t crypto_create_fecf, uint8_t process_sdls_pdus, uint8_t has_pus_hdr, uint8_t ignore_sa_state, uint8_t ignore_anti_replay, uint8_t unique_sa_per_mapid, uint8_t crypto_check_fecf, uint8_t vcid_bitmask, uint8_t crypto_increment_nontransmitted_iv)
 {
     return Crypto_Config_CryptoLib(KEY_TYPE_KMC, MC_TYPE_DISABLED, sadb_type, cryptography_type, IV_INTERNAL, crypto_create_fecf, process_sdls_pdus, has_pus_hdr, ignore_sa_state, ignore_anti_replay, unique_sa_per_mapid, crypto_check_fecf, vcid_bitmask, crypto_increment_nontransmitted_iv);